@@ -0,0 +1,261 @@
+import os
+import pickle
+import sqlite3
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Small thread-safe LRU cache with per-entry expiry.
+    Used for process-local caches (scraped products, lookups) that must stay memory-bounded.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = 600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+_MISSING = object()
+
+
+# --- Shared cache backends ----------------------------------------------------------------
+#
+# Caches whose entries must be seen by every worker process (scraped products, catalog rows,
+# user rows and their invalidations, memoized recommendations) are SharedCache instances.
+# The backend is chosen once per process by configure_cache() (see Settings.CACHE_BACKEND):
+#   memory - a TTLCache per process (single worker)
+#   sqlite - one SQLite file shared by the workers of a host (CACHE_URL = file path)
+#   redis  - a Redis-compatible server shared by all hosts (CACHE_URL = redis://...)
+# Non-memory backends pickle values, so cached objects are copies, never shared references.
+
+_backend = {"name": "memory", "url": None}
+# One connection pool per Redis URL, shared by all RedisCache namespaces
+_redis_clients: dict = {}
+
+
+def configure_cache(backend: str, url: Optional[str] = None) -> None:
+    """Selects the backend for shared caches created (or first used) after this call."""
+    if backend not in ("memory", "sqlite", "redis"):
+        raise ValueError(f"Unknown cache backend: {backend}")
+    if backend == "redis":
+        # Fail at startup, not on the first cache access inside a request
+        try:
+            import redis  # noqa: F401
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis needs the redis package (pip install redis)") from None
+    _backend.update(name=backend, url=url)
+
+
+class SQLiteCache:
+    """
+    TTL cache in a SQLite file, shared by the processes of one host. Eviction beyond
+    `maxsize` is oldest-write-first and runs every few hundred writes, so the table can
+    briefly exceed it. One connection per thread; WAL lets readers run during writes.
+    """
+
+    PRUNE_EVERY = 256
+
+    def __init__(self, path: str, namespace: str, maxsize: int = 1024, ttl: Optional[float] = 600):
+        self.path = path
+        self.namespace = namespace
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._local = threading.local()
+        self._writes = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache (namespace TEXT NOT NULL, key TEXT NOT NULL, value BLOB, "
+                "expires_at REAL, written_at REAL NOT NULL, PRIMARY KEY (namespace, key)) WITHOUT ROWID"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_written ON cache (namespace, written_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?", (self.namespace, repr(key))
+        ).fetchone()
+        if row is None:
+            return default
+        # Wall clock, not monotonic: expiry times are compared across processes
+        now = time.time()
+        if row[1] is not None and row[1] <= now:
+            # Drop it now rather than waiting for the next prune; the expiry check keeps a
+            # fresh value written by another process in the meantime
+            conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ? AND expires_at <= ?",
+                         (self.namespace, repr(key), now))
+            return default
+        return pickle.loads(row[0])
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at, written_at) VALUES (?, ?, ?, ?, ?)",
+            (self.namespace, repr(key), pickle.dumps(value, pickle.HIGHEST_PROTOCOL), now + ttl if ttl else None, now),
+        )
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            self._prune(conn, now)
+
+    def _prune(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM cache WHERE namespace = ? AND expires_at <= ?", (self.namespace, now))
+        conn.execute(
+            "DELETE FROM cache WHERE namespace = ? AND key IN (SELECT key FROM cache WHERE namespace = ? "
+            "ORDER BY written_at DESC LIMIT -1 OFFSET ?)",
+            (self.namespace, self.namespace, self.maxsize),
+        )
+
+    def delete(self, key: Hashable) -> None:
+        self._connect().execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, repr(key)))
+
+    def clear(self) -> None:
+        self._connect().execute("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM cache WHERE namespace = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (self.namespace, time.time()),
+        ).fetchone()[0]
+
+
+class RedisCache:
+    """
+    TTL cache on a Redis-compatible server (Redis, Valkey, KeyDB...), shared by every
+    process that uses the same URL. Expiry is Redis's own; `maxsize` is not enforced
+    here, size the server's maxmemory with an LRU eviction policy instead.
+    Needs the `redis` package; values are pickled, so only point it at a trusted server.
+    """
+
+    def __init__(self, url: str, namespace: str, maxsize: int = 1024, ttl: Optional[float] = 600):
+        import redis
+
+        self.client = _redis_clients.get(url) or _redis_clients.setdefault(url, redis.Redis.from_url(url))
+        self.namespace = namespace
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._prefix = f"fitable:{namespace}:"
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        value = self.client.get(self._prefix + repr(key))
+        return default if value is None else pickle.loads(value)
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        self.client.set(self._prefix + repr(key), pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                        px=max(1, int(ttl * 1000)) if ttl else None)
+
+    def delete(self, key: Hashable) -> None:
+        self.client.delete(self._prefix + repr(key))
+
+    def clear(self) -> None:
+        keys = list(self.client.scan_iter(match=self._prefix + "*", count=1000))
+        for i in range(0, len(keys), 1000):
+            self.client.delete(*keys[i:i + 1000])
+
+    def __contains__(self, key: Hashable) -> bool:
+        return bool(self.client.exists(self._prefix + repr(key)))
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.client.scan_iter(match=self._prefix + "*", count=1000))
+
+
+class SharedCache:
+    """
+    Cache visible to all worker processes when a shared backend is configured. The backend
+    is picked on first use, so module- and class-level caches can be declared at import
+    time, before configure_cache() has run.
+    """
+
+    def __init__(self, namespace: str, maxsize: int = 1024, ttl: Optional[float] = 600):
+        self.namespace = namespace
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._cache = None
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        if self._cache is None:
+            with self._lock:
+                if self._cache is None:
+                    name, url = _backend["name"], _backend["url"]
+                    if name == "sqlite":
+                        self._cache = SQLiteCache(url, self.namespace, self.maxsize, self.ttl)
+                    elif name == "redis":
+                        self._cache = RedisCache(url, self.namespace, self.maxsize, self.ttl)
+                    else:
+                        self._cache = TTLCache(self.maxsize, self.ttl)
+        return self._cache
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        return self.backend.get(key, default)
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        self.backend.set(key, value, ttl)
+
+    def delete(self, key: Hashable) -> None:
+        self.backend.delete(key)
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.backend
+
+    def __len__(self) -> int:
+        return len(self.backend)
+
@@ -1,13 +1,91 @@
+import logging
+import os
 from typing import Optional
 from functools import lru_cache
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from supabase import create_client, Client
+from supabase import Client
+from app.core.cache import configure_cache
+from app.core.logging import setup_logging
+from app.core.supabase_client import build_client_factory
+
+logger = logging.getLogger(__name__)
 
 class Settings(BaseSettings):
     SUPABASE_URL: str
     SUPABASE_KEY: str
     SUPABASE_SERVICE_KEY: Optional[str] = None # Key to bypass RLS
 
+    # Shared HTTP connection pool used by every Supabase client (seconds for expiry/timeouts)
+    SUPABASE_HTTP2: bool = True
+    SUPABASE_MAX_CONNECTIONS: int = 50
+    SUPABASE_MAX_KEEPALIVE: int = 20
+    SUPABASE_KEEPALIVE_EXPIRY: float = 30.0
+    SUPABASE_TIMEOUT: float = 10.0
+    SUPABASE_CONNECT_TIMEOUT: float = 5.0
+
+    # Local access token verification: the project's JWT secret (HS256) and/or its JWKS
+    # (asymmetric keys; defaults to <SUPABASE_URL>/auth/v1/.well-known/jwks.json).
+    # AUTH_REMOTE_FALLBACK asks the auth server when no local key can check a token.
+    # Projects still signing with the legacy HS256 secret need SUPABASE_JWT_SECRET (or the
+    # fallback): without either their tokens get 401, and the app refuses to start.
+    SUPABASE_JWT_SECRET: Optional[str] = None
+    AUTH_JWKS_URL: Optional[str] = None
+    AUTH_JWKS_TIMEOUT: float = 5.0
+    AUTH_JWT_AUDIENCE: str = "authenticated"
+    AUTH_JWT_LEEWAY: int = 30
+    AUTH_REMOTE_FALLBACK: bool = False
+    # Opt-in for local development: let user routes run without a bearer token (a token that
+    # is sent is still verified). Account deletion needs a token either way.
+    AUTH_ALLOW_ANONYMOUS: bool = False
+
+    # Logging: base level for app loggers, per-module overrides
+    # ("app.services.scraper=DEBUG,app.routers=WARNING") and the share of traces whose DEBUG output is kept
+    LOG_LEVEL: str = "INFO"
+    LOG_LEVELS: str = ""
+    LOG_DEBUG_SAMPLE_RATE: float = 1.0
+
+    # Write-behind history inserts: rows are spooled here and flushed in bulk by size or time
+    HISTORY_SPOOL_PATH: str = "data/history_spool.jsonl"
+    HISTORY_BATCH_SIZE: int = 100
+    HISTORY_FLUSH_INTERVAL: float = 2.0
+    # Rows buffered while the DB is unreachable before /history/add starts refusing (503)
+    HISTORY_MAX_PENDING: int = 10000
+
+    # Distinct product URLs one /recommend-batch call may scrape; cached products don't count
+    BATCH_MAX_SCRAPES: int = 20
+
+    # Background health probe of the DB and the scraper browser (seconds between probes / per DB ping)
+    HEALTH_PROBE_INTERVAL: float = 15.0
+    HEALTH_PROBE_TIMEOUT: float = 5.0
+
+    # Responses at least this large (bytes) are gzip-compressed for clients that accept it
+    GZIP_MINIMUM_SIZE: int = 1000
+    GZIP_LEVEL: int = 6
+
+    # Token-bucket rate limits per user (bearer token) and per client IP. "scrape" covers the
+    # endpoints that scrape a product page, "default" everything else; IP buckets are
+    # RATE_LIMIT_IP_MULTIPLIER times larger. RATE_LIMIT_PROXY_HOPS: proxies in front of the app
+    # whose X-Forwarded-For entry identifies the client (unset: 1 on Render, else 0).
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_SCRAPE_PER_MINUTE: float = 10
+    RATE_LIMIT_SCRAPE_BURST: int = 5
+    RATE_LIMIT_DEFAULT_PER_MINUTE: float = 120
+    RATE_LIMIT_DEFAULT_BURST: int = 30
+    RATE_LIMIT_IP_MULTIPLIER: float = 3.0
+    RATE_LIMIT_MAX_BUCKETS: int = 100_000
+    RATE_LIMIT_PROXY_HOPS: Optional[int] = None
+
+    # Server (app/server.py): uvicorn worker processes, bind address. WEB_CONCURRENCY is also
+    # what `uvicorn --workers` defaults to.
+    HOST: str = "0.0.0.0"
+    PORT: int = 10000
+    WEB_CONCURRENCY: int = 1
+
+    # Backend of the caches shared by workers (app/core/cache.py): memory, sqlite, redis, or
+    # auto (memory for one worker, sqlite for several). CACHE_URL: SQLite file or redis:// URL.
+    CACHE_BACKEND: str = "auto"
+    CACHE_URL: Optional[str] = None
+
     model_config = SettingsConfigDict(env_file=".env", case_sensitive=True, extra="ignore")
 
 @lru_cache()
@@ -17,18 +95,36 @@ def get_settings():
 # Initialize Supabase Client
 # Initialize Clients
 settings = get_settings()
+setup_logging(settings.LOG_LEVEL, settings.LOG_LEVELS, settings.LOG_DEBUG_SAMPLE_RATE)
+
+# Shared caches: one worker can keep them in memory, several need a store they all see
+cache_backend = settings.CACHE_BACKEND
+if cache_backend == "auto":
+    cache_backend = "sqlite" if settings.WEB_CONCURRENCY > 1 else "memory"
+cache_url = settings.CACHE_URL or ("data/cache.sqlite3" if cache_backend == "sqlite" else None)
+if cache_backend == "redis" and not cache_url:
+    raise ValueError("CACHE_BACKEND=redis needs CACHE_URL (redis://host:port/db)")
+configure_cache(cache_backend, cache_url)
+if settings.WEB_CONCURRENCY > 1 and cache_backend == "memory":
+    logger.warning("Running %s workers with in-memory caches; cache invalidations will not reach other workers.",
+                   settings.WEB_CONCURRENCY)
+
+# Render runs every service behind its proxy and sets RENDER in the environment
+rate_limit_proxy_hops = settings.RATE_LIMIT_PROXY_HOPS
+if rate_limit_proxy_hops is None:
+    rate_limit_proxy_hops = 1 if os.getenv("RENDER") else 0
+
+# All clients share one pooled HTTP client (see app/core/supabase_client.py). Clients are
+# created on first use rather than at import, which keeps cold starts short.
+client_factory = build_client_factory(settings)
 
 # Anon Client (For Auth/Login)
-supabase_anon: Client = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+supabase_anon: Client = client_factory.lazy(settings.SUPABASE_KEY, "supabase_anon")
 
 # Admin/Service Client (For DB Ops / Admin Auth)
 supabase_admin: Optional[Client] = None
 if settings.SUPABASE_SERVICE_KEY:
-    try:
-        supabase_admin = create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
-        print("DEBUG: Initialized supabase_admin with Service Key.")
-    except Exception as e:
-        print(f"WARNING: Failed to init supabase_admin: {e}")
+    supabase_admin = client_factory.lazy(settings.SUPABASE_SERVICE_KEY, "supabase_admin (Service Key)")
 
 # Default 'supabase' client: Use Admin if available (for backend DB access), else Anon
 # This preserves existing behavior for recommendation/scraper logic that uses 'supabase' variable.
@@ -36,5 +132,5 @@ if supabase_admin:
     # print("DEBUG: Using SUPABASE_SERVICE_KEY for default 'supabase' client.")
     supabase = supabase_admin
 else:
-    print("WARNING: Using SUPABASE_KEY (Anon) for default 'supabase' client. RLS may apply.")
+    logger.warning("Using SUPABASE_KEY (Anon) for default 'supabase' client. RLS may apply.")
     supabase = supabase_anon
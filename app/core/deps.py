@@ -0,0 +1,99 @@
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+from fastapi import Depends, HTTPException, Request
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from app.core.config import settings, supabase_anon
+from app.core.security import SERVICE_ROLE, AuthError, SigningKeyUnavailable, build_token_verifier, claims_from_user
+from app.services.history_writer import HistoryWriter
+from app.services.recommendation import SizeRecommender
+from app.services.scraper import ProductScraper
+
+logger = logging.getLogger(__name__)
+
+# App-scoped service instances, created in the lifespan (app/main.py) and injected via Depends
+
+
+def get_recommender(request: Request) -> SizeRecommender:
+    return request.app.state.recommender
+
+
+def get_scraper(request: Request) -> ProductScraper:
+    return request.app.state.scraper
+
+
+def get_history_writer(request: Request) -> HistoryWriter:
+    return request.app.state.history_writer
+
+
+# Authentication: tokens are verified locally (JWT secret / cached JWKS) and their claims cached
+
+token_verifier = build_token_verifier(settings)
+bearer = HTTPBearer(auto_error=False)
+
+
+async def verify_access_token(token: str) -> Dict[str, Any]:
+    """Claims of a valid access token; the auth server is only asked if AUTH_REMOTE_FALLBACK is set."""
+    claims = token_verifier.cached(token)
+    if claims is not None:
+        return claims
+    try:
+        # May fetch the JWKS, which blocks; keep it off the event loop
+        return await asyncio.to_thread(token_verifier.verify, token)
+    except SigningKeyUnavailable as e:
+        if not settings.AUTH_REMOTE_FALLBACK:
+            logger.warning("Token cannot be verified locally: %s", e)
+            raise HTTPException(status_code=401, detail="Invalid token")
+        logger.debug("Falling back to remote token check: %s", e)
+        try:
+            response = await asyncio.to_thread(supabase_anon.auth.get_user, token)
+        except Exception as e:
+            raise HTTPException(status_code=401, detail=str(e))
+        if not response or not response.user:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        claims = claims_from_user(response.user)
+        token_verifier.remember(token, claims)
+        return claims
+    except AuthError as e:
+        raise HTTPException(status_code=401, detail=str(e))
+
+
+def raise_not_authenticated() -> None:
+    raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+
+
+async def get_current_user(credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer)) -> Optional[Dict[str, Any]]:
+    """
+    Claims of the caller, or None for anonymous calls if AUTH_ALLOW_ANONYMOUS is set.
+    A token that is sent is always verified.
+    """
+    if credentials is None:
+        if not settings.AUTH_ALLOW_ANONYMOUS:
+            raise_not_authenticated()
+        return None
+    return await verify_access_token(credentials.credentials)
+
+
+def is_user_caller(caller: Optional[Dict[str, Any]]) -> bool:
+    """An authenticated end user, i.e. not anonymous and not a backend using the service key."""
+    return caller is not None and caller.get("role") != SERVICE_ROLE
+
+
+def ensure_user(caller: Optional[Dict[str, Any]], user_id: str) -> None:
+    """Authenticated users may only act on their own user_id; the service role may act on any."""
+    if is_user_caller(caller) and caller.get("sub") != user_id:
+        raise HTTPException(status_code=403, detail="Bu kullanıcı için yetkiniz yok.")
+
+
+async def authorize_user_id(user_id: str, caller: Optional[Dict[str, Any]] = Depends(get_current_user)) -> Optional[Dict[str, Any]]:
+    """Dependency for routes with a {user_id} path parameter."""
+    ensure_user(caller, user_id)
+    return caller
+
+
+async def authorize_account_owner(user_id: str, caller: Optional[Dict[str, Any]] = Depends(get_current_user)) -> Dict[str, Any]:
+    """Like authorize_user_id, but a verified token is needed even with AUTH_ALLOW_ANONYMOUS."""
+    if caller is None:
+        raise_not_authenticated()
+    ensure_user(caller, user_id)
+    return caller
@@ -0,0 +1,60 @@
+import hashlib
+from typing import Any, Optional
+from fastapi import Request, Response
+from supabase import Client
+from app.core.cache import SharedCache
+
+# How long a computed version tag is trusted. Writes made through this process drop it
+# right away; the TTL only bounds staleness from writes made elsewhere.
+DATA_VERSION_TTL = 30
+
+
+def make_etag(*parts: Any) -> str:
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True if the request's If-None-Match covers `etag` (weak comparison)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    bare = etag[2:] if etag.startswith("W/") else etag
+    return any(tag.strip().removeprefix("W/") == bare for tag in header.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
+
+
+class DataVersions:
+    """
+    Version tags of a user's rows in a table: row count plus the max of an
+    always-increasing column (updated_at, created_at or a serial id).
+    Computed with one single-row query and cached per (table, user).
+    """
+
+    def __init__(self, ttl: float = DATA_VERSION_TTL):
+        self._cache = SharedCache("data_versions", maxsize=50_000, ttl=ttl)
+
+    def get(self, client: Client, table: str, user_id: str, column: str) -> str:
+        key = (table, user_id)
+        version: Optional[str] = self._cache.get(key)
+        if version is None:
+            response = client.table(table).select(column, count="exact") \
+                .eq("user_id", user_id) \
+                .order(column, desc=True) \
+                .limit(1) \
+                .execute()
+            latest = response.data[0][column] if response.data else None
+            version = f"{response.count}:{latest}"
+            self._cache.set(key, version)
+        return version
+
+    def invalidate(self, table: str, user_id: str) -> None:
+        self._cache.delete((table, user_id))
+
+
+data_versions = DataVersions()
@@ -0,0 +1,82 @@
+import logging
+import queue
+import random
+import sys
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+# All application loggers live under this name (logging.getLogger(__name__) inside app/)
+APP_LOGGER = "app"
+
+LOG_FORMAT = "%(asctime)s %(levelname)s [%(name)s] %(message)s"
+
+_listener: Optional[QueueListener] = None
+_debug_sample_rate = 1.0
+# Whether DEBUG records of the current trace (one recommendation, one scrape) are kept
+_trace_sampled: ContextVar[bool] = ContextVar("trace_sampled", default=True)
+
+
+class DebugSampleFilter(logging.Filter):
+    """Drops DEBUG records of traces that were not sampled; other levels always pass."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > logging.DEBUG or _trace_sampled.get()
+
+
+def sample_debug_trace() -> bool:
+    """
+    Decides once per trace whether its debug output is kept, so sampled traces stay complete.
+    Call at the start of a unit of work; the decision follows the current context.
+    """
+    sampled = _debug_sample_rate >= 1.0 or random.random() < _debug_sample_rate
+    _trace_sampled.set(sampled)
+    return sampled
+
+
+def parse_levels(spec: str) -> Dict[str, str]:
+    """'app.services.scraper=DEBUG,app.routers=WARNING' -> {logger name: level}"""
+    levels = {}
+    for item in (spec or "").split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging(level: str = "INFO", module_levels: str = "", debug_sample_rate: float = 1.0) -> None:
+    """
+    Routes the `app` loggers through a queue so request threads never block on I/O;
+    a background listener thread writes the records to stderr.
+    """
+    global _listener, _debug_sample_rate
+    if _listener is not None:
+        return
+
+    _debug_sample_rate = debug_sample_rate
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(DebugSampleFilter())
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    app_logger = logging.getLogger(APP_LOGGER)
+    app_logger.setLevel(level.upper())
+    app_logger.handlers = [queue_handler]
+    app_logger.propagate = False
+
+    for name, module_level in parse_levels(module_levels).items():
+        logging.getLogger(name).setLevel(module_level)
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Flushes queued records; call on application shutdown."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
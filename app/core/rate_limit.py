@@ -0,0 +1,198 @@
+import asyncio
+import logging
+import math
+import time
+from typing import Any, Dict, Optional, Tuple
+import orjson
+from app.core.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Paths that never count against a budget
+EXEMPT_PATHS = ("/health", "/docs", "/redoc", "/openapi.json")
+# Paths that scrape a product page (slow, share one browser); everything else is "default"
+SCRAPE_PATHS = ("/recommendation/recommend", "/scraper/")
+# Scrapes one product per distinct item URL, so it is charged per URL instead of per request
+BATCH_PATH = "/recommendation/recommend-batch"
+
+
+class Budget:
+    """A token bucket size: `burst` requests at once, refilled at `per_minute` requests per minute."""
+
+    def __init__(self, per_minute: float, burst: int):
+        self.rate = per_minute / 60.0
+        self.capacity = float(burst)
+
+
+class RateLimiter:
+    """
+    Token buckets per (scope, key, tier), e.g. ("user", <sub>, "scrape") or ("ip", <addr>, "default").
+
+    Buckets live in a bounded TTLCache. A bucket's entry expires once it would have
+    refilled completely, so dropping it loses nothing; under memory pressure the least
+    recently used buckets are evicted first. Only called from the event loop, so a
+    check-and-take needs no lock beyond the cache's own.
+    """
+
+    def __init__(self, budgets: Dict[str, Budget], ip_multiplier: float = 3.0, max_buckets: int = 100_000):
+        self.budgets = budgets
+        self.ip_multiplier = ip_multiplier
+        self._buckets = TTLCache(maxsize=max_buckets, ttl=None)
+
+    def _capacity_and_rate(self, scope: str, tier: str) -> Tuple[float, float]:
+        budget = self.budgets[tier]
+        # One IP can be many users (NAT, mobile carriers), so its bucket is larger
+        factor = self.ip_multiplier if scope == "ip" else 1.0
+        return budget.capacity * factor, budget.rate * factor
+
+    def _level(self, key: Tuple[str, str, str], now: float) -> float:
+        capacity, rate = self._capacity_and_rate(key[0], key[2])
+        state = self._buckets.get(key)
+        if state is None:
+            return capacity
+        tokens, updated_at = state
+        return min(capacity, tokens + (now - updated_at) * rate)
+
+    def acquire(self, tier: str, user_id: Optional[str], ip: Optional[str], cost: float = 1.0) -> float:
+        """
+        Takes `cost` tokens from the user's and the IP's bucket for `tier`.
+        Returns 0 if allowed, otherwise the seconds until the request would be allowed
+        (no tokens are taken from any bucket then).
+
+        A cost above a bucket's capacity is allowed once the bucket is full and leaves it
+        in debt, so a large batch waits out its whole cost afterwards instead of never fitting.
+        """
+        now = time.monotonic()
+        keys = []
+        if user_id:
+            keys.append(("user", user_id, tier))
+        if ip:
+            keys.append(("ip", ip, tier))
+
+        levels = [self._level(key, now) for key in keys]
+        wait = 0.0
+        for key, level in zip(keys, levels):
+            capacity, rate = self._capacity_and_rate(key[0], tier)
+            needed = min(cost, capacity)
+            if level < needed:
+                wait = max(wait, (needed - level) / rate)
+        if wait:
+            return wait
+
+        for key, level in zip(keys, levels):
+            capacity, rate = self._capacity_and_rate(key[0], tier)
+            tokens = level - cost
+            self._buckets.set(key, (tokens, now), ttl=(capacity - tokens) / rate)
+        return 0.0
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+def _header(scope: Dict[str, Any], name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+async def _read_body(receive) -> Tuple[bytes, list]:
+    """The whole request body, plus the messages read, so they can be replayed to the app."""
+    messages, chunks = [], []
+    while True:
+        message = await receive()
+        messages.append(message)
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            break
+    return b"".join(chunks), messages
+
+
+def _replay(messages: list, receive):
+    pending = list(messages)
+
+    async def replay():
+        return pending.pop(0) if pending else await receive()
+    return replay
+
+
+def _batch_cost(body: bytes) -> float:
+    # Distinct product URLs of a batch; a malformed body costs 1 and is rejected by the route
+    try:
+        items = orjson.loads(body).get("items")
+        return float(max(1, len({str(item.get("url")) for item in items})))
+    except Exception:
+        return 1.0
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware applying RateLimiter before a request reaches the routers.
+    The user is the `sub` of a valid bearer token (checked with the shared, cached
+    TokenVerifier); requests without one are limited by client IP only.
+    A batch recommendation costs one scrape token per distinct product URL.
+    """
+
+    def __init__(self, app, limiter: RateLimiter, token_verifier: Any = None, proxy_hops: int = 0):
+        self.app = app
+        self.limiter = limiter
+        self.token_verifier = token_verifier
+        self.proxy_hops = proxy_hops
+
+    def _client_ip(self, scope: Dict[str, Any]) -> Optional[str]:
+        # Behind N proxies, the client is the Nth address from the right of X-Forwarded-For
+        # (entries further left are supplied by the client and can be forged)
+        if self.proxy_hops:
+            forwarded = _header(scope, b"x-forwarded-for")
+            if forwarded:
+                hops = [hop.strip() for hop in forwarded.split(",")]
+                return hops[-min(self.proxy_hops, len(hops))]
+        client = scope.get("client")
+        return client[0] if client else None
+
+    async def _user_id(self, scope: Dict[str, Any]) -> Optional[str]:
+        authorization = _header(scope, b"authorization")
+        if not authorization or not authorization.lower().startswith("bearer ") or self.token_verifier is None:
+            return None
+        token = authorization[7:].strip()
+        claims = self.token_verifier.cached(token)
+        if claims is None:
+            try:
+                # May fetch the JWKS; the claims are cached for the route's own check
+                claims = await asyncio.to_thread(self.token_verifier.verify, token)
+            except Exception:
+                return None  # rejected later by the route's auth dependency; counted by IP here
+        return claims.get("sub")
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "")
+        if scope["type"] != "http" or path == "/" or path.startswith(EXEMPT_PATHS):
+            await self.app(scope, receive, send)
+            return
+
+        tier = "scrape" if path.startswith(SCRAPE_PATHS) else "default"
+        cost = 1.0
+        if path == BATCH_PATH and scope.get("method") == "POST":
+            body, messages = await _read_body(receive)
+            cost = _batch_cost(body)
+            receive = _replay(messages, receive)
+        wait = self.limiter.acquire(tier, await self._user_id(scope), self._client_ip(scope), cost)
+        if not wait:
+            await self.app(scope, receive, send)
+            return
+
+        retry_after = math.ceil(wait)
+        logger.info("Rate limited %s (%s tier, cost %s), retry after %ss", path, tier, cost, retry_after)
+        body = orjson.dumps({"detail": f"Çok fazla istek. Lütfen {retry_after} saniye sonra tekrar deneyin."})
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
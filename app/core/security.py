@@ -0,0 +1,173 @@
+import hashlib
+import logging
+import time
+from typing import Any, Dict, Optional
+import jwt
+from jwt import PyJWKClient
+from app.core.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Algorithms Supabase signs access tokens with: the legacy shared secret or asymmetric JWKS keys
+SECRET_ALGORITHMS = ["HS256"]
+JWKS_ALGORITHMS = ["RS256", "ES256", "EdDSA"]
+
+# Role claim of the project's service key (backend callers acting for any user)
+SERVICE_ROLE = "service_role"
+
+# Upper bound for how long verified claims are reused (tokens are also dropped at their exp)
+MAX_CLAIMS_TTL = 10 * 60
+# Claims confirmed by the auth server (remote fallback) are trusted this long
+REMOTE_CLAIMS_TTL = 60
+JWKS_CACHE_LIFESPAN = 60 * 60
+# After a failed JWKS fetch (or an unknown key id) no new fetch is tried for this long
+JWKS_RETRY_COOLDOWN = 30
+
+
+class AuthError(Exception):
+    """The token was rejected; the message is safe to return to the client."""
+
+
+class SigningKeyUnavailable(Exception):
+    """No local key can check this token (no secret configured, JWKS unreachable or key unknown)."""
+
+
+class TokenVerifier:
+    """
+    Verifies Supabase access tokens locally against the project's JWT secret (HS256)
+    or its JWKS (asymmetric keys, fetched once and cached), with `leeway` seconds of clock skew.
+    Decoded claims are kept in a small LRU until the token expires, so repeated requests
+    with the same token cost a dict lookup.
+
+    verify() may fetch the JWKS (blocking, up to `jwks_timeout` seconds), so async callers
+    run it in a thread unless cached() already has the claims. A failed fetch or an unknown
+    key id blocks further fetches for `jwks_cooldown` seconds; keys already fetched keep working.
+    """
+
+    def __init__(self, jwt_secret: Optional[str] = None, jwks_url: Optional[str] = None,
+                 audience: Optional[str] = "authenticated", leeway: int = 30,
+                 cache_size: int = 1024, jwks_headers: Optional[Dict[str, str]] = None,
+                 jwks_timeout: float = 5.0, jwks_cooldown: float = JWKS_RETRY_COOLDOWN):
+        self.jwt_secret = jwt_secret
+        self.audience = audience
+        self.leeway = leeway
+        self.jwks_cooldown = jwks_cooldown
+        self._jwks = PyJWKClient(jwks_url, lifespan=JWKS_CACHE_LIFESPAN, headers=jwks_headers,
+                                 timeout=jwks_timeout) if jwks_url else None
+        self._keys = TTLCache(maxsize=32, ttl=JWKS_CACHE_LIFESPAN)
+        self._jwks_retry_at = 0.0
+        self._jwks_error: Optional[str] = None
+        self._claims = TTLCache(maxsize=cache_size, ttl=MAX_CLAIMS_TTL)
+
+    @staticmethod
+    def _cache_key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def remember(self, token: str, claims: Dict[str, Any], ttl: float = REMOTE_CLAIMS_TTL) -> None:
+        """Caches claims verified elsewhere (the auth server) for a short time."""
+        self._claims.set(self._cache_key(token), claims, ttl=ttl)
+
+    def cached(self, token: str) -> Optional[Dict[str, Any]]:
+        """Claims of a token verified earlier and not yet expired; never does I/O."""
+        return self._claims.get(self._cache_key(token))
+
+    def prefetch(self) -> Optional[int]:
+        """
+        Fetches the JWKS now (blocking) so the first request does not wait for it.
+        Returns the number of signing keys, or None if the JWKS could not be fetched.
+        """
+        if self._jwks is None:
+            return None
+        try:
+            jwks = self._jwks.get_signing_keys(refresh=True)
+        except jwt.PyJWKClientConnectionError as e:
+            self._jwks_failed(e)
+            return None
+        except (jwt.PyJWKSetError, jwt.PyJWKClientError):
+            return 0  # reachable but no signing keys: the project signs with the HS256 secret only
+        for jwk in jwks:
+            self._keys.set(jwk.key_id, jwk.key)
+        return len(jwks)
+
+    def _jwks_failed(self, error: Exception) -> None:
+        self._jwks_error = str(error)
+        self._jwks_retry_at = time.monotonic() + self.jwks_cooldown
+        logger.warning("JWKS fetch failed, not retrying for %ss: %s", self.jwks_cooldown, error)
+
+    def _signing_key(self, kid: Optional[str]) -> Any:
+        key = self._keys.get(kid)
+        if key is not None:
+            return key
+        if time.monotonic() < self._jwks_retry_at:
+            raise SigningKeyUnavailable(f"JWKS unavailable: {self._jwks_error}")
+        try:
+            key = self._jwks.get_signing_key(kid).key
+        except jwt.PyJWKClientError as e:
+            self._jwks_failed(e)
+            raise SigningKeyUnavailable(str(e))
+        self._keys.set(kid, key)
+        return key
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        """Claims of a valid token. Raises AuthError or SigningKeyUnavailable."""
+        key = self._cache_key(token)
+        claims = self._claims.get(key)
+        if claims is not None:
+            return claims
+
+        try:
+            header = jwt.get_unverified_header(token)
+        except jwt.PyJWTError as e:
+            raise AuthError(f"Invalid token: {e}")
+
+        alg = header.get("alg")
+        if alg in SECRET_ALGORITHMS:
+            if not self.jwt_secret:
+                raise SigningKeyUnavailable("SUPABASE_JWT_SECRET is not configured")
+            signing_key, algorithms = self.jwt_secret, SECRET_ALGORITHMS
+        elif alg in JWKS_ALGORITHMS:
+            if self._jwks is None:
+                raise SigningKeyUnavailable("No JWKS URL configured")
+            signing_key, algorithms = self._signing_key(header.get("kid")), [alg]
+        else:
+            raise AuthError(f"Unsupported token algorithm: {alg}")
+
+        try:
+            # The service key is a JWT with role=service_role and neither sub nor aud; it is
+            # accepted once its signature checks out (see deps.ensure_user)
+            unverified = jwt.decode(token, options={"verify_signature": False})
+            if unverified.get("role") == SERVICE_ROLE:
+                claims = jwt.decode(token, signing_key, algorithms=algorithms, leeway=self.leeway,
+                                    options={"require": ["exp"], "verify_aud": False})
+            else:
+                claims = jwt.decode(token, signing_key, algorithms=algorithms, audience=self.audience,
+                                    leeway=self.leeway, options={"require": ["exp", "sub"]})
+        except jwt.PyJWTError as e:
+            raise AuthError(f"Invalid token: {e}")
+
+        ttl = min(MAX_CLAIMS_TTL, claims["exp"] + self.leeway - time.time())
+        if ttl > 0:
+            self._claims.set(key, claims, ttl=ttl)
+        return claims
+
+
+def claims_from_user(user: Any) -> Dict[str, Any]:
+    """Claims-shaped dict for a user returned by the auth server (remote verification)."""
+    return {
+        "sub": user.id,
+        "email": user.email,
+        "user_metadata": user.user_metadata or {},
+        "role": getattr(user, "role", None),
+    }
+
+
+def build_token_verifier(settings: Any) -> TokenVerifier:
+    jwks_url = settings.AUTH_JWKS_URL or f"{settings.SUPABASE_URL.rstrip('/')}/auth/v1/.well-known/jwks.json"
+    return TokenVerifier(
+        jwt_secret=settings.SUPABASE_JWT_SECRET,
+        jwks_url=jwks_url,
+        audience=settings.AUTH_JWT_AUDIENCE or None,
+        leeway=settings.AUTH_JWT_LEEWAY,
+        jwks_headers={"apikey": settings.SUPABASE_KEY},
+        jwks_timeout=settings.AUTH_JWKS_TIMEOUT,
+    )
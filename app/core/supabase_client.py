@@ -0,0 +1,150 @@
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+import httpx
+from supabase import Client, create_client
+from supabase.lib.client_options import SyncClientOptions
+
+logger = logging.getLogger(__name__)
+
+
+class MeteredTransport(httpx.HTTPTransport):
+    """HTTPTransport that counts requests, in-flight requests and transport errors."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.errors = 0
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            return super().handle_request(request)
+        except httpx.TransportError:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    @property
+    def connections(self) -> list:
+        return getattr(self._pool, "connections", [])
+
+
+class SupabaseClientFactory:
+    """
+    Creates every Supabase client of the process on one shared httpx.Client, so the
+    anon, admin and any other clients reuse the same keep-alive (optionally HTTP/2)
+    connection pool. Auth headers are sent per request, so sharing the pool between
+    clients with different keys is safe.
+
+    Nothing is built until the first client is used: creating the pool loads the TLS
+    context (~100ms), which should not sit on the import path.
+    """
+
+    def __init__(self, url: str, http2: bool = True, max_connections: int = 50,
+                 max_keepalive: int = 20, keepalive_expiry: float = 30.0,
+                 timeout: float = 10.0, connect_timeout: float = 5.0):
+        self.url = url
+        self.http2 = http2
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.transport: Optional[MeteredTransport] = None
+        self._http_client: Optional[httpx.Client] = None
+        self._lock = threading.Lock()
+
+    @property
+    def http_client(self) -> httpx.Client:
+        with self._lock:
+            if self._http_client is None:
+                self.transport = MeteredTransport(
+                    http2=self.http2,
+                    limits=httpx.Limits(max_connections=self.max_connections,
+                                        max_keepalive_connections=self.max_keepalive,
+                                        keepalive_expiry=self.keepalive_expiry),
+                )
+                self._http_client = httpx.Client(
+                    transport=self.transport,
+                    timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+                    follow_redirects=True,
+                )
+                logger.debug("Shared Supabase HTTP pool: http2=%s max_connections=%s",
+                             self.http2, self.max_connections)
+            return self._http_client
+
+    def create(self, key: str) -> Client:
+        return create_client(self.url, key, options=SyncClientOptions(httpx_client=self.http_client))
+
+    def lazy(self, key: str, name: str) -> "LazyClient":
+        return LazyClient(lambda: self.create(key), name)
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool usage: request counters plus the connections currently held by the pool."""
+        transport = self.transport
+        connections = transport.connections if transport else []
+        idle = sum(1 for c in connections if c.is_idle())
+        return {
+            "http2": self.http2,
+            "max_connections": self.max_connections,
+            "connections": len(connections),
+            "idle_connections": idle,
+            "active_connections": len(connections) - idle,
+            "requests": transport.requests if transport else 0,
+            "in_flight": transport.in_flight if transport else 0,
+            "peak_in_flight": transport.peak_in_flight if transport else 0,
+            "transport_errors": transport.errors if transport else 0,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._http_client is not None:
+                self._http_client.close()
+                self._http_client = None
+                self.transport = None
+
+
+class LazyClient:
+    """
+    Stands in for a Supabase client and creates it on first attribute access, so
+    modules can keep importing `supabase` / `supabase_admin` as plain globals.
+    """
+
+    def __init__(self, create: Callable[[], Client], name: str):
+        self._create = create
+        self._name = name
+        self._client: Optional[Client] = None
+        self._lock = threading.Lock()
+
+    def _get(self) -> Client:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._create()
+                    logger.info("Initialized %s client.", self._name)
+        return self._client
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._get(), name)
+
+
+def build_client_factory(settings: Any) -> SupabaseClientFactory:
+    return SupabaseClientFactory(
+        settings.SUPABASE_URL,
+        http2=settings.SUPABASE_HTTP2,
+        max_connections=settings.SUPABASE_MAX_CONNECTIONS,
+        max_keepalive=settings.SUPABASE_MAX_KEEPALIVE,
+        keepalive_expiry=settings.SUPABASE_KEEPALIVE_EXPIRY,
+        timeout=settings.SUPABASE_TIMEOUT,
+        connect_timeout=settings.SUPABASE_CONNECT_TIMEOUT,
+    )
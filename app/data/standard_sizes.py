@@ -0,0 +1,55 @@
+# Built-in gender-based size charts, used when a brand has no chart of its own.
+
+# Erkek Beden Tablosu - Daha geniş omuz/göğüs, düz kalça
+MALE_SIZE_CHART = [
+    # Tops - Erkek (Büyük göğüs, omuz genişliği)
+    {"size_label": "XS", "category": "top", "min_chest": 84, "max_chest": 90, "min_waist": 70, "max_waist": 76},
+    {"size_label": "S", "category": "top", "min_chest": 90, "max_chest": 96, "min_waist": 76, "max_waist": 82},
+    {"size_label": "M", "category": "top", "min_chest": 96, "max_chest": 102, "min_waist": 82, "max_waist": 88},
+    {"size_label": "L", "category": "top", "min_chest": 102, "max_chest": 108, "min_waist": 88, "max_waist": 94},
+    {"size_label": "XL", "category": "top", "min_chest": 108, "max_chest": 116, "min_waist": 94, "max_waist": 102},
+    {"size_label": "XXL", "category": "top", "min_chest": 116, "max_chest": 124, "min_waist": 102, "max_waist": 110},
+    # Bottoms - Erkek (Bel ön planda, düz kalça)
+    {"size_label": "XS", "category": "bottom", "min_waist": 70, "max_waist": 76, "min_hip": 88, "max_hip": 94},
+    {"size_label": "S", "category": "bottom", "min_waist": 76, "max_waist": 82, "min_hip": 94, "max_hip": 100},
+    {"size_label": "M", "category": "bottom", "min_waist": 82, "max_waist": 88, "min_hip": 100, "max_hip": 106},
+    {"size_label": "L", "category": "bottom", "min_waist": 88, "max_waist": 94, "min_hip": 106, "max_hip": 112},
+    {"size_label": "XL", "category": "bottom", "min_waist": 94, "max_waist": 102, "min_hip": 112, "max_hip": 120},
+    {"size_label": "XXL", "category": "bottom", "min_waist": 102, "max_waist": 110, "min_hip": 120, "max_hip": 128},
+]
+
+# Kadın Beden Tablosu - Daha dar omuz, belirgin kalça
+FEMALE_SIZE_CHART = [
+    # Tops - Kadın (Küçük omuz, göğüs çevresi farklı hesap)
+    {"size_label": "XXS", "category": "top", "min_chest": 76, "max_chest": 80, "min_waist": 58, "max_waist": 62},
+    {"size_label": "XS", "category": "top", "min_chest": 80, "max_chest": 84, "min_waist": 62, "max_waist": 66},
+    {"size_label": "S", "category": "top", "min_chest": 84, "max_chest": 88, "min_waist": 66, "max_waist": 70},
+    {"size_label": "M", "category": "top", "min_chest": 88, "max_chest": 94, "min_waist": 70, "max_waist": 76},
+    {"size_label": "L", "category": "top", "min_chest": 94, "max_chest": 100, "min_waist": 76, "max_waist": 82},
+    {"size_label": "XL", "category": "top", "min_chest": 100, "max_chest": 108, "min_waist": 82, "max_waist": 90},
+    {"size_label": "XXL", "category": "top", "min_chest": 108, "max_chest": 116, "min_waist": 90, "max_waist": 98},
+    # Bottoms - Kadın (Kalça ön planda, bel ikincil)
+    {"size_label": "XXS", "category": "bottom", "min_waist": 58, "max_waist": 62, "min_hip": 84, "max_hip": 88},
+    {"size_label": "XS", "category": "bottom", "min_waist": 62, "max_waist": 66, "min_hip": 88, "max_hip": 92},
+    {"size_label": "S", "category": "bottom", "min_waist": 66, "max_waist": 70, "min_hip": 92, "max_hip": 96},
+    {"size_label": "M", "category": "bottom", "min_waist": 70, "max_waist": 76, "min_hip": 96, "max_hip": 102},
+    {"size_label": "L", "category": "bottom", "min_waist": 76, "max_waist": 82, "min_hip": 102, "max_hip": 108},
+    {"size_label": "XL", "category": "bottom", "min_waist": 82, "max_waist": 90, "min_hip": 108, "max_hip": 116},
+    {"size_label": "XXL", "category": "bottom", "min_waist": 90, "max_waist": 98, "min_hip": 116, "max_hip": 124},
+]
+
+# Fallback for unknown gender (average of male/female)
+UNIVERSAL_SIZE_CHART = [
+    {"size_label": "XS", "category": "top", "min_chest": 80, "max_chest": 88, "min_waist": 66, "max_waist": 74},
+    {"size_label": "S", "category": "top", "min_chest": 88, "max_chest": 94, "min_waist": 74, "max_waist": 80},
+    {"size_label": "M", "category": "top", "min_chest": 94, "max_chest": 100, "min_waist": 80, "max_waist": 86},
+    {"size_label": "L", "category": "top", "min_chest": 100, "max_chest": 108, "min_waist": 86, "max_waist": 94},
+    {"size_label": "XL", "category": "top", "min_chest": 108, "max_chest": 116, "min_waist": 94, "max_waist": 102},
+    {"size_label": "XXL", "category": "top", "min_chest": 116, "max_chest": 124, "min_waist": 102, "max_waist": 110},
+    # Bottoms
+    {"size_label": "XS", "category": "bottom", "min_waist": 66, "max_waist": 74, "min_hip": 88, "max_hip": 96},
+    {"size_label": "S", "category": "bottom", "min_waist": 74, "max_waist": 80, "min_hip": 96, "max_hip": 102},
+    {"size_label": "M", "category": "bottom", "min_waist": 80, "max_waist": 86, "min_hip": 102, "max_hip": 108},
+    {"size_label": "L", "category": "bottom", "min_waist": 86, "max_waist": 94, "min_hip": 108, "max_hip": 116},
+    {"size_label": "XL", "category": "bottom", "min_waist": 94, "max_waist": 102, "min_hip": 116, "max_hip": 124},
+]
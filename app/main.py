@@ -1,22 +1,109 @@
 import sys
 import asyncio
+import logging
 # Fix for "NotImplementedError" in asyncio on Windows with Playwright
 if sys.platform.startswith("win"):
     asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+from fastapi.datastructures import Default
 from fastapi.middleware.cors import CORSMiddleware
-from app.core.config import supabase
+from fastapi.middleware.gzip import GZipMiddleware
+from app.core.config import supabase, settings, client_factory, rate_limit_proxy_hops
+from app.core.deps import token_verifier
+from app.core.logging import shutdown_logging
+from app.core.rate_limit import Budget, RateLimiter, RateLimitMiddleware
+from app.core.responses import FastJSONResponse
 from app.routers import scraper, recommendation, user, auth
+from app.services.health import HealthMonitor
+from app.services.history_writer import HistoryWriter
+from app.services.recommendation import SizeRecommender
+from app.services.scraper import ProductScraper
+
+logger = logging.getLogger(__name__)
+
+async def check_auth_keys():
+    """
+    Unless AUTH_ALLOW_ANONYMOUS is set, with neither SUPABASE_JWT_SECRET nor AUTH_REMOTE_FALLBACK, only JWKS-signed
+    tokens can be verified. Refuse to start if the project's JWKS has no keys (it signs with the
+    HS256 secret), since every request would get 401.
+    """
+    if settings.AUTH_ALLOW_ANONYMOUS or settings.SUPABASE_JWT_SECRET or settings.AUTH_REMOTE_FALLBACK:
+        return
+    keys = await asyncio.to_thread(token_verifier.prefetch)
+    if keys == 0:
+        raise RuntimeError("Tokens are required but the project's JWKS has no signing keys; "
+                           "set SUPABASE_JWT_SECRET (HS256 tokens) or AUTH_REMOTE_FALLBACK")
+    if keys is None:
+        logger.warning("JWKS unreachable at startup; only JWKS-signed tokens can be verified without SUPABASE_JWT_SECRET.")
+
+async def warm_up(app: FastAPI):
+    # Preload brands/charts, signing keys and launch the browser; the app reports ready afterwards
+    await asyncio.to_thread(app.state.recommender.warm_up)
+    await asyncio.to_thread(token_verifier.prefetch)
+    try:
+        await app.state.scraper.start()
+    except Exception as e:
+        logger.warning("Browser warm-up failed: %s", e)
+    app.state.health.warmed_up = True
+    await app.state.health.probe()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await check_auth_keys()
+    # One recommender and one scraper per process, so their caches and browser survive between requests
+    app.state.recommender = SizeRecommender(supabase)
+    app.state.scraper = ProductScraper(persistent=True)
+    app.state.history_writer = HistoryWriter(
+        supabase, settings.HISTORY_SPOOL_PATH, settings.HISTORY_BATCH_SIZE, settings.HISTORY_FLUSH_INTERVAL,
+        settings.HISTORY_MAX_PENDING,
+    )
+    await app.state.history_writer.start()
+    app.state.health = HealthMonitor(
+        supabase, app.state.scraper, app.state.recommender, settings.HEALTH_PROBE_INTERVAL, settings.HEALTH_PROBE_TIMEOUT
+    )
+    await app.state.health.start()
+    warm_up_task = asyncio.create_task(warm_up(app))
+    yield
+    await app.state.health.close()
+    await app.state.history_writer.close()
+    # Cancelling a browser launch half-way leaves the Playwright driver running, so let warm-up finish
+    await asyncio.gather(warm_up_task, return_exceptions=True)
+    await app.state.scraper.close()
+    client_factory.close()
+    shutdown_logging()
 
 app = FastAPI(
     title="FitableV2 API",
     description="Backend API for FitableV2 with Supabase integration",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    # orjson for untyped endpoints; Default() keeps FastAPI's Pydantic fast path for typed ones
+    default_response_class=Default(FastJSONResponse),
 )
 
+# Per-user / per-IP token buckets; innermost, so 429s still get CORS headers
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(
+        RateLimitMiddleware,
+        limiter=RateLimiter(
+            {
+                "scrape": Budget(settings.RATE_LIMIT_SCRAPE_PER_MINUTE, settings.RATE_LIMIT_SCRAPE_BURST),
+                "default": Budget(settings.RATE_LIMIT_DEFAULT_PER_MINUTE, settings.RATE_LIMIT_DEFAULT_BURST),
+            },
+            ip_multiplier=settings.RATE_LIMIT_IP_MULTIPLIER,
+            max_buckets=settings.RATE_LIMIT_MAX_BUCKETS,
+        ),
+        token_verifier=token_verifier,
+        proxy_hops=rate_limit_proxy_hops,
+    )
+
+# Compress larger responses (recommend/history payloads shrink ~3-35x); small ones are not worth it
+app.add_middleware(GZipMiddleware, minimum_size=settings.GZIP_MINIMUM_SIZE, compresslevel=settings.GZIP_LEVEL)
+
 # Add CORS Middleware to allow Flutter Web to communicate with Backend
 app.add_middleware(
     CORSMiddleware,
@@ -28,8 +115,9 @@ app.add_middleware(
 
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
-    print(f"Validation Error: {exc.errors()}")
-    print(f"Body: {await request.body()}")
+    logger.warning("Validation Error: %s", exc.errors())
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Body: %s", await request.body())
     return JSONResponse(
         status_code=422,
         content={"detail": exc.errors(), "body": str(exc)},
@@ -40,14 +128,21 @@ app.include_router(recommendation.router)
 app.include_router(user.router)
 app.include_router(auth.router)
 
+# Health endpoints are served from the background probe (app/services/health.py), never from the DB
+
 @app.get("/")
 def health_check():
-    try:
-        # Simple query to verify connection
-        # Check if the 'profiles' table exists or is accessible
-        response = supabase.table("profiles").select("*").limit(1).execute()
-        return {"status": "active", "db": "connected"}
-    except Exception as e:
-        # Log error in a real app
-        print(f"Health check DB error: {e}")
-        return {"status": "active", "db": "disconnected", "error": str(e)}
+    status = app.state.health.status()
+    return {"status": "active", "db": status["db"], "ready": status["ready"]}
+
+@app.get("/health/live")
+def liveness():
+    # The process is up and serving requests
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+def readiness(response: Response):
+    status = app.state.health.status()
+    if not status["ready"]:
+        response.status_code = 503
+    return {**status, "http_pool": client_factory.stats()}
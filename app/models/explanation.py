@@ -0,0 +1,61 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+# Internal (non-API) explanation of a recommendation. Lines are kept as
+# (str.format template, args) pairs and only turned into text when a client asks for it.
+
+Line = Tuple[str, Tuple[Any, ...]]
+
+PREFERENCE_TEMPLATE = "💡 Giyim Tercihi: Tam oturan istiyorsanız {}, daha rahat/bol istiyorsanız {} bedenini tercih edebilirsiniz."
+
+
+def _render(line: Line) -> str:
+    template, args = line
+    return template.format(*args) if args else template
+
+
+@dataclass(slots=True)
+class Explanation:
+    reasons: List[Line] = field(default_factory=list)   # body of detailed_report
+    steps: List[Line] = field(default_factory=list)     # pant size calculation; structured output only
+    advice: List[Line] = field(default_factory=list)    # "Özel Tavsiye" paragraphs after the body
+    preference: Optional[Tuple[Any, Any]] = None        # (fitted size, looser size)
+
+    def add(self, template: str, *args: Any) -> None:
+        self.reasons.append((template, args))
+
+    def step(self, template: str, *args: Any) -> None:
+        self.steps.append((template, args))
+
+    def advise(self, template: str, *args: Any) -> None:
+        self.advice.append((template, args))
+
+    def render_report(self) -> str:
+        """The Turkish `detailed_report` text."""
+        report = "\n".join(_render(line) for line in self.reasons)
+        for line in self.advice:
+            report += "\n\n" + _render(line)
+        if self.preference:
+            report += "\n\n" + PREFERENCE_TEMPLATE.format(*self.preference)
+        return report
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "reasons": [_render(line) for line in self.reasons],
+            "steps": [_render(line) for line in self.steps],
+            "advice": [_render(line) for line in self.advice],
+            "preference": (
+                {"fitted": str(self.preference[0]), "relaxed": str(self.preference[1])}
+                if self.preference else None
+            ),
+        }
+
+
+def render_fit_message(size_percentages: Dict[str, int]) -> str:
+    """'L beden için %96 uyumlusunuz (M: %3, XL: %1)'"""
+    items = list(size_percentages.items())
+    top_size, top_pct = items[0]
+    message = f"{top_size} beden için %{top_pct} uyumlusunuz"
+    if len(items) > 1:
+        message += " (" + ", ".join(f"{s}: %{p}" for s, p in items[1:]) + ")"
+    return message
@@ -0,0 +1,150 @@
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from app.services.scoring import ChartMatrix
+from app.services.size_labels import chart_scale, parse_size_label, size_ordinal
+
+# Internal (non-API) types used by the recommender's scoring loops.
+# Everything derivable from the raw rows is computed once at construction.
+
+
+@dataclass(frozen=True, slots=True)
+class SizeEntry:
+    label: str
+    ordinal: int
+    ranges: Dict[str, Tuple[float, float]]   # metric -> (min, max), only complete ranges
+    midpoints: Dict[str, float]               # metric -> (min + max) / 2
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any], ordinal: int) -> "SizeEntry":
+        ranges = {}
+        for key, min_v in row.items():
+            if not key.startswith("min_") or min_v is None:
+                continue
+            max_v = row.get(f"max_{key[4:]}")
+            if max_v is not None:
+                ranges[key[4:]] = (min_v, max_v)
+        midpoints = {m: (lo + hi) / 2 for m, (lo, hi) in ranges.items()}
+        return cls(row.get("size_label") or "", ordinal, ranges, midpoints)
+
+
+@dataclass(frozen=True, slots=True)
+class SizeChart:
+    entries: Tuple[SizeEntry, ...]            # sorted by ordinal (stable)
+    matrix: ChartMatrix                       # same order as entries
+    _by_label: Dict[str, SizeEntry] = field(repr=False)
+    _by_key: Dict[str, SizeEntry] = field(repr=False)
+    _by_ordinal: Dict[int, str] = field(repr=False)
+
+    @classmethod
+    def from_rows(cls, rows: List[Dict[str, Any]],
+                  order_fn: Callable[[str, Optional[str]], int] = size_ordinal) -> "SizeChart":
+        # Bare numbers are read as inches or EU sizes for the whole chart, not label by label
+        labels = [row.get("size_label") or "" for row in rows]
+        scale = chart_scale(labels)
+        entries = [SizeEntry.from_row(row, order_fn(label, scale)) for row, label in zip(rows, labels)]
+
+        # Label lookups resolve to the first row in source order (case-insensitive),
+        # then by canonical key so "S" finds "S (36)"
+        by_label: Dict[str, SizeEntry] = {}
+        by_key: Dict[str, SizeEntry] = {}
+        for entry in entries:
+            by_label.setdefault(entry.label.lower(), entry)
+            by_key.setdefault(parse_size_label(entry.label).key, entry)
+
+        order = sorted(range(len(rows)), key=lambda i: entries[i].ordinal)
+        entries = tuple(entries[i] for i in order)
+        matrix = ChartMatrix.from_rows([rows[i] for i in order])
+
+        by_ordinal: Dict[int, str] = {}
+        for entry in entries:
+            by_ordinal.setdefault(entry.ordinal, entry.label)
+
+        return cls(entries, matrix, by_label, by_key, by_ordinal)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def find(self, label: str) -> Optional[SizeEntry]:
+        entry = self._by_label.get(label.lower())
+        if entry is None:
+            entry = self._by_key.get(parse_size_label(label).key)
+        return entry
+
+    def clamp_ordinal(self, ordinal: int) -> int:
+        """Clamp `ordinal` to the chart's own smallest and largest parsed ordinals."""
+        known = [o for o in self._by_ordinal if o >= 0]
+        if not known:
+            return ordinal
+        return max(min(known), min(max(known), ordinal))
+
+    def label_for(self, ordinal: int) -> Optional[str]:
+        """Label at `ordinal`, or of the nearest parsed size (the larger on a tie); None for no parsed sizes."""
+        label = self._by_ordinal.get(ordinal)
+        if label is not None:
+            return label
+        known = [o for o in self._by_ordinal if o >= 0]
+        if not known:
+            return None
+        return self._by_ordinal[min(known, key=lambda o: (abs(o - ordinal), -o))]
+
+    def first_fitting_ordinal(self, value: float, metric: str, tolerance: float = 0.0) -> int:
+        """
+        Ordinal of the first (smallest) size whose max for `metric`, plus `tolerance`,
+        accommodates `value`. Falls back to the largest size; -1 for an empty chart.
+        """
+        for entry in self.entries:
+            rng = entry.ranges.get(metric)
+            if rng is not None and value <= rng[1] + tolerance:
+                return entry.ordinal
+        return self.entries[-1].ordinal if self.entries else -1
+
+
+@dataclass(frozen=True, slots=True)
+class UserBody:
+    gender: str
+    height: float
+    weight: float
+    shoulder: float
+    chest: float
+    waist: float
+    hips: float
+    arm_length: float
+    inseam: float
+    hand_span: float
+    garment_spans: float
+    body_shape: Optional[str]
+    ref_brand: Optional[str]
+    ref_size: Optional[str]
+
+    @classmethod
+    def from_measurements(cls, m: Dict[str, Any]) -> "UserBody":
+        return cls(
+            gender=m.get("gender", "other"),
+            height=m.get("height") or 175,
+            weight=m.get("weight") or 75,
+            shoulder=m.get("shoulder") or 0,
+            chest=m.get("chest") or 0,
+            waist=m.get("waist") or 0,
+            hips=m.get("hips") or 0,
+            arm_length=m.get("arm_length") or 0,
+            inseam=m.get("inseam") or 0,
+            hand_span=m.get("hand_span_cm") or 0,
+            garment_spans=m.get("garment_width_spans") or 0,
+            body_shape=m.get("body_shape", "regular"),
+            ref_brand=m.get("reference_brand"),
+            ref_size=m.get("reference_size_label"),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class ProductSignals:
+    brand: str
+    product_name: str
+    description: str              # lowercased description + name
+    fabric: Optional[str]
+    category: Optional[str]       # 'top', 'bottom' or None for non-clothing
+    fit_type: str                 # 'slim', 'regular' or 'oversize'
+    available_sizes: Any          # as scraped (list or space-joined string)
+    model_height: Optional[str]
+    model_size: str
+    fit_advice: str
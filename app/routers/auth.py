@@ -1,6 +1,11 @@
+import logging
+from typing import Any, Dict
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel, EmailStr
 from app.core.config import supabase, settings, supabase_admin as admin_client, supabase_anon
+from app.core.deps import authorize_account_owner, is_user_caller, verify_access_token
+
+logger = logging.getLogger(__name__)
 
 # Use the centralized admin client from config
 # Use the centralized admin client from config
@@ -69,7 +74,7 @@ async def signup(user: UserRegister):
              return {"status": "success", "message": "User registered. Please login manually."}
 
     except Exception as e:
-        print(f"Signup Error: {e}")
+        logger.error("Signup Error: %s", e)
         # Extract meaningful error message if possible
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -97,7 +102,7 @@ async def login(user: UserLogin):
              raise HTTPException(status_code=401, detail="Invalid credentials or email not confirmed")
 
     except Exception as e:
-        print(f"Login Error: {e}")
+        logger.error("Login Error: %s", e)
         raise HTTPException(status_code=401, detail=str(e))
 
     except Exception as e:
@@ -111,22 +116,23 @@ security = HTTPBearer()
 @router.get("/me")
 async def get_user_me(credentials: HTTPAuthorizationCredentials = Depends(security)):
     try:
-        token = credentials.credentials
-        response = supabase_anon.auth.get_user(token)
-        
-        if response.user:
-            return {
-                "status": "success",
-                "user": {
-                    "id": response.user.id,
-                    "email": response.user.email,
-                    "user_metadata": response.user.user_metadata
-                }
+        claims = await verify_access_token(credentials.credentials)
+        user_id = claims.get("sub")
+        # Service-role tokens are valid but belong to no user
+        if not is_user_caller(claims) or not user_id:
+            raise HTTPException(status_code=403, detail="Bu uç nokta yalnızca kullanıcı oturumlarıyla çağrılabilir.")
+        return {
+            "status": "success",
+            "user": {
+                "id": user_id,
+                "email": claims.get("email"),
+                "user_metadata": claims.get("user_metadata") or {}
             }
-        else:
-             raise HTTPException(status_code=401, detail="Invalid token")
+        }
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Get Me Error: {e}")
+        logger.error("Get Me Error: %s", e)
         raise HTTPException(status_code=401, detail=str(e))
 
 class UserGoogleLogin(BaseModel):
@@ -157,17 +163,17 @@ async def google_login(data: UserGoogleLogin):
              raise HTTPException(status_code=401, detail="Google authentication failed")
 
     except Exception as e:
-        print(f"Google Login Error: {e}")
+        logger.error("Google Login Error: %s", e)
         raise HTTPException(status_code=401, detail=str(e))
 
 @router.delete("/delete/{user_id}")
-async def delete_user(user_id: str):
+async def delete_user(user_id: str, caller: Dict[str, Any] = Depends(authorize_account_owner)):
     try:
         # Use Supabase Admin API to delete user
-        print(f"DEBUG: Attempting to delete user {user_id}")
+        logger.debug("Attempting to delete user %s", user_id)
         response = supabase_admin.auth.admin.delete_user(user_id)
-        print(f"DEBUG: Delete User Response: {response}")
+        logger.debug("Delete User Response: %s", response)
         return {"status": "success", "message": "User deleted successfully"}
     except Exception as e:
-        print(f"Delete User Error: {e}")
+        logger.error("Delete User Error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
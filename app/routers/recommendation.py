@@ -1,33 +1,130 @@
-from typing import Dict, Any
-from fastapi import APIRouter, HTTPException, Depends
-from pydantic import BaseModel, HttpUrl
+import asyncio
+import json
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+from fastapi import APIRouter, HTTPException, Depends, Query
+from pydantic import BaseModel, HttpUrl, Field
 
-from app.core.config import supabase
+from app.core.config import settings
+from app.core.responses import FastJSONResponse
+from app.core.deps import get_recommender, get_scraper, get_history_writer, get_current_user, ensure_user
+from app.models.schemas import HistoryItemCreate
+from app.services.history_writer import HistoryWriter, HistoryBufferFull
 from app.services.scraper import ProductScraper
-from app.services.recommendation import SizeRecommender
+from app.services.recommendation import (
+    SizeRecommender, RECOMMENDATION_FIELDS, COMPACT_FIELDS, EXTRA_FIELDS
+)
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/recommendation",
     tags=["Recommendation"]
 )
 
+# Product keys kept in compact responses
+PRODUCT_SUMMARY_FIELDS = ("brand", "product_name", "price", "image_url", "product_url")
+
+FIELDS_DESCRIPTION = (
+    "Virgülle ayrılmış alanlar: " + ", ".join(("product",) + RECOMMENDATION_FIELDS + EXTRA_FIELDS)
+    + ". Verilmezse tüm alanlar döner."
+)
+COMPACT_DESCRIPTION = "Liste görünümü için sadece beden, uyum yüzdeleri ve ürün özeti döner."
+
+# Recommendation keys a history row is built from
+HISTORY_FIELDS = ("recommended_size", "size_percentages")
+
+
+def _response_fields(fields: Optional[str], compact: bool) -> Tuple[Optional[Tuple[str, ...]], Optional[Tuple[str, ...]]]:
+    """
+    (recommendation fields, product fields) for a request; None means "everything".
+    An empty product tuple leaves the product out of the response.
+    """
+    if fields:
+        names = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+        unknown = [n for n in names if n != "product" and n not in RECOMMENDATION_FIELDS + EXTRA_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Geçersiz alan(lar): {', '.join(unknown)}")
+        return tuple(n for n in names if n != "product"), (None if "product" in names else ())
+    if compact:
+        return COMPACT_FIELDS, PRODUCT_SUMMARY_FIELDS
+    return None, None
+
+
+def _trim_product(product: Dict[str, Any], product_fields: Optional[Tuple[str, ...]]) -> Dict[str, Any]:
+    if product_fields is None:
+        return product
+    return {k: product[k] for k in product_fields if k in product}
+
+
+def _with_history_fields(rec_fields: Optional[Tuple[str, ...]]) -> Optional[Tuple[str, ...]]:
+    if rec_fields is None:
+        return None
+    return rec_fields + tuple(f for f in HISTORY_FIELDS if f not in rec_fields)
+
+
+def _select_fields(recommendation: Dict[str, Any], rec_fields: Optional[Tuple[str, ...]]) -> Dict[str, Any]:
+    if rec_fields is None:
+        return recommendation
+    return {k: v for k, v in recommendation.items() if k in rec_fields or k in ("error", "detail")}
+
+
+def _history_row(user_id: str, url: str, product: Dict[str, Any],
+                 recommendation: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """The row the app would post to /history/add; None if there is no size to record."""
+    percentages = recommendation.get("size_percentages")
+    if recommendation.get("error") or not percentages:
+        return None
+    return HistoryItemCreate(
+        user_id=user_id,
+        product_name=product.get("product_name") or "",
+        brand=product.get("brand") or "",
+        product_url=url,
+        image_url=product.get("image_url") or "",
+        price=product.get("price") or "",
+        recommended_size=recommendation["recommended_size"],
+        confidence_score=next(iter(percentages.values())) / 100.0,
+        size_percentages=json.dumps(percentages, ensure_ascii=False),
+    ).model_dump()
+
+
+def _record_history(writer: HistoryWriter, row: Dict[str, Any]) -> None:
+    # A full history buffer (DB down) must not fail the recommendation itself
+    try:
+        writer.enqueue(row)
+    except HistoryBufferFull as e:
+        logger.warning("History row dropped: %s", e)
+
+
 class RecommendationRequest(BaseModel):
     user_id: str
     url: str 
+    # Also save the result to the user's history (replaces a separate /history/add call)
+    record_history: bool = False
     
     class Config:
         json_schema_extra = {
             "example": {
                 "user_id": "123e4567-e89b-12d3-a456-426614174000",
-                "url": "https://www.zara.com/tr/tr/ornek-urun-linki.html"
+                "url": "https://www.zara.com/tr/tr/ornek-urun-linki.html",
+                "record_history": False
             }
         }
 
 @router.post("/recommend")
-async def get_recommendation(request: RecommendationRequest) -> Dict[str, Any]:
+async def get_recommendation(
+    request: RecommendationRequest,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    compact: bool = Query(False, description=COMPACT_DESCRIPTION),
+    scraper: ProductScraper = Depends(get_scraper),
+    recommender: SizeRecommender = Depends(get_recommender),
+    history_writer: HistoryWriter = Depends(get_history_writer),
+    caller: Optional[Dict[str, Any]] = Depends(get_current_user),
+) -> Dict[str, Any]:
+    ensure_user(caller, request.user_id)
+    rec_fields, product_fields = _response_fields(fields, compact)
     try:
         # 1. Scrape Product Data
-        scraper = ProductScraper()
         url_str = str(request.url)
         product_data = await scraper.scrape_product(url_str)
         
@@ -36,16 +133,93 @@ async def get_recommendation(request: RecommendationRequest) -> Dict[str, Any]:
              # For now, if no brand detected, recommendation might fail.
              pass
 
-        # 2. Get Recommendation
-        recommender = SizeRecommender(supabase)
-        recommendation = recommender.get_recommendation(request.user_id, product_data)
+        # 2. Get Recommendation (DB lookups are blocking, keep them off the event loop)
+        query_fields = _with_history_fields(rec_fields) if request.record_history else rec_fields
+        recommendation = await asyncio.to_thread(
+            recommender.get_recommendation, request.user_id, product_data, query_fields
+        )
+
+        # 3. Record History (buffered, written in bulk by the history writer)
+        if request.record_history:
+            row = _history_row(request.user_id, url_str, product_data, recommendation)
+            if row:
+                _record_history(history_writer, row)
+            recommendation = _select_fields(recommendation, rec_fields)
         
         # 4. Combine Response
-        return {
-            "product": product_data,
-            "recommendation": recommendation
-        }
+        response = {"recommendation": recommendation}
+        if product_fields != ():
+            response = {"product": _trim_product(product_data, product_fields), **response}
+        # Rendered straight to JSON bytes; the payload is plain JSON types already
+        return FastJSONResponse(response)
     except Exception as e:
-        print(f"CRITICAL ROUTER ERROR: {e}")
+        logger.error("CRITICAL ROUTER ERROR: %s", e)
         # Return a clean JSON error that ApiService can parse
         raise HTTPException(status_code=500, detail=f"Sunucu Hatası: {str(e)}")
+
+class BatchRecommendationRequest(BaseModel):
+    # Either many products for one user or one product for many users (or any mix)
+    items: List[RecommendationRequest] = Field(..., min_length=1, max_length=5000)
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "items": [
+                    {"user_id": "123e4567-e89b-12d3-a456-426614174000", "url": "https://www.zara.com/tr/tr/ornek-urun-1.html"},
+                    {"user_id": "123e4567-e89b-12d3-a456-426614174000", "url": "https://www.zara.com/tr/tr/ornek-urun-2.html"}
+                ]
+            }
+        }
+
+@router.post("/recommend-batch")
+async def get_recommendations_batch(
+    request: BatchRecommendationRequest,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    compact: bool = Query(False, description=COMPACT_DESCRIPTION),
+    scraper: ProductScraper = Depends(get_scraper),
+    recommender: SizeRecommender = Depends(get_recommender),
+    history_writer: HistoryWriter = Depends(get_history_writer),
+    caller: Optional[Dict[str, Any]] = Depends(get_current_user),
+) -> Dict[str, Any]:
+    for user_id in {item.user_id for item in request.items}:
+        ensure_user(caller, user_id)
+    rec_fields, product_fields = _response_fields(fields, compact)
+    record_history = any(item.record_history for item in request.items)
+    # Scrapes run one at a time, so a batch may only bring a bounded number of new products
+    urls = list(dict.fromkeys(str(item.url) for item in request.items))
+    uncached = sum(1 for url in urls if scraper.get_cached(url) is None)
+    if uncached > settings.BATCH_MAX_SCRAPES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Tek istekte en fazla {settings.BATCH_MAX_SCRAPES} yeni ürün sorgulanabilir ({uncached} gönderildi)."
+        )
+    try:
+        # 1. Scrape each distinct product once (cached products are not scraped again)
+        scraped = await asyncio.gather(*(scraper.scrape_product(url) for url in urls))
+        products = dict(zip(urls, scraped))
+
+        # 2. Score all pairs with shared user/brand/chart lookups
+        pairs = [(item.user_id, products[str(item.url)]) for item in request.items]
+        query_fields = _with_history_fields(rec_fields) if record_history else rec_fields
+        recommendations = await asyncio.to_thread(recommender.get_recommendations_batch, pairs, query_fields)
+
+        if record_history:
+            for item, rec in zip(request.items, recommendations):
+                row = _history_row(item.user_id, str(item.url), products[str(item.url)], rec) if item.record_history else None
+                if row:
+                    _record_history(history_writer, row)
+            recommendations = [_select_fields(rec, rec_fields) for rec in recommendations]
+
+        # 3. Results in input order; products are returned once per URL
+        response = {
+            "results": [
+                {"user_id": item.user_id, "url": str(item.url), "recommendation": rec}
+                for item, rec in zip(request.items, recommendations)
+            ]
+        }
+        if product_fields != ():
+            response = {"products": {url: _trim_product(p, product_fields) for url, p in products.items()}, **response}
+        return FastJSONResponse(response)
+    except Exception as e:
+        logger.error("CRITICAL ROUTER ERROR (batch): %s", e)
+        raise HTTPException(status_code=500, detail=f"Sunucu Hatası: {str(e)}")
@@ -1,5 +1,7 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel, HttpUrl
+from app.core.deps import get_scraper
+from app.core.responses import FastJSONResponse
 from app.services.scraper import ProductScraper
 
 router = APIRouter(
@@ -18,8 +20,7 @@ class ScrapeRequest(BaseModel):
         }
 
 @router.post("/scrape")
-async def scrape_product(request: ScrapeRequest):
-    scraper = ProductScraper()
+async def scrape_product(request: ScrapeRequest, scraper: ProductScraper = Depends(get_scraper)):
     # Convert HttpUrl to string
     url_str = str(request.url)
     
@@ -32,4 +33,4 @@ async def scrape_product(request: ScrapeRequest):
         # For now, return what we got.
         pass
         
-    return data
+    return FastJSONResponse(data)
@@ -1,27 +1,69 @@
-from fastapi import APIRouter, HTTPException
-from app.core.config import supabase, settings
+import asyncio
+import base64
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Query, Request, Response
+from app.core.config import supabase, supabase_admin as admin_client
+from app.core.deps import get_recommender, get_history_writer, get_current_user, authorize_user_id, ensure_user, is_user_caller
+from app.core.etag import data_versions, etag_matches, make_etag, not_modified
+from app.core.responses import FastJSONResponse
 from app.models.schemas import UserMeasurementCreate, HistoryItemCreate, UserReferenceCreate
-from supabase import create_client
-import os
+from app.services.history_writer import HistoryWriter, HistoryBufferFull
+from app.services.recommendation import SizeRecommender
 
-# Create a dedicated admin client for privileged operations like DELETE
-# We must use settings to get the key because os.environ might not be populated if load_dotenv isn't called globally
-service_key = settings.SUPABASE_SERVICE_KEY
-supabase_url = settings.SUPABASE_URL
-supabase_admin = create_client(supabase_url, service_key) if service_key else supabase
+logger = logging.getLogger(__name__)
+
+# Admin client for privileged operations like DELETE (falls back to the default client)
+supabase_admin = admin_client or supabase
 
 router = APIRouter(
     prefix="", # Root level to match /update-measurements requirement
     tags=["User"]
 )
 
+# Columns the history list view needs (no percentages or score)
+HISTORY_LIST_COLUMNS = "id,created_at,product_name,brand,image_url,price,recommended_size"
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 200
+
+def _encode_history_cursor(row: Dict[str, Any]) -> str:
+    # Opaque cursor: position of the last returned row in (created_at, id) order
+    raw = json.dumps([row["created_at"], row["id"]]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+def _decode_history_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        created_at, item_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        created_at, item_id = str(created_at), str(item_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Geçersiz cursor.")
+    # Values are embedded in a PostgREST filter, so they must not be able to close the quotes
+    if any(c in value for value in (created_at, item_id) for c in '"\\'):
+        raise HTTPException(status_code=400, detail="Geçersiz cursor.")
+    return created_at, item_id
+
+async def on_user_data_changed(recommender: SizeRecommender, user_id: str, background_tasks: BackgroundTasks):
+    # Drop cached/memoized data and recompute the reference-based virtual body. Both refreshes
+    # assign a new data version when they finish, so results computed in between are not reused.
+    recommender.invalidate_user(user_id)
+    data_versions.invalidate("user_measurements", user_id)
+    data_versions.invalidate("user_references", user_id)
+    await asyncio.to_thread(recommender.refresh_virtual_bodies, user_id)
+    # The per-brand fit matrix takes longer; rebuild it after the response is sent
+    background_tasks.add_task(recommender.refresh_fit_matrix, user_id)
+
 @router.post("/update-measurements")
-async def update_measurements(measurements: UserMeasurementCreate):
+async def update_measurements(measurements: UserMeasurementCreate, background_tasks: BackgroundTasks,
+                              recommender: SizeRecommender = Depends(get_recommender),
+                              caller: Optional[Dict[str, Any]] = Depends(get_current_user)):
+    ensure_user(caller, measurements.user_id)
     try:
         data = measurements.model_dump(exclude_unset=True)
         
         # DEBUG: Print data being sent
-        print(f"DEBUG: Upserting user measurements: {data}")
+        logger.debug("Upserting user measurements: %s", data)
 
         # FIX 22P02: smallint columns cannot accept "175.0" (float strings). Cast to int.
         # Iterate over known numeric keys and cast them if present
@@ -68,74 +110,120 @@ async def update_measurements(measurements: UserMeasurementCreate):
         # If frontend sent a shape, ignore it? Or overwrite? 
         # User requested "Automatic determination". So we overwrite.
         data["body_shape"] = calc_shape
-        print(f"DEBUG: Auto-Calculated Body Shape: {calc_shape}")
+        logger.debug("Auto-Calculated Body Shape: %s", calc_shape)
+        # Drives the measurements ETag, so every save must move it
+        data["updated_at"] = datetime.now(timezone.utc).isoformat()
 
-        # Check if user measurements already exist (get all to handle duplicates)
-        existing = supabase.table("user_measurements").select("id").eq("user_id", data["user_id"]).order("updated_at", desc=True).execute()
-        
-        if existing.data and len(existing.data) > 0:
-            # Use the most recent one as the source of truth.
-            record_id = existing.data[0]['id']
-            
-            # If there are duplicates (more than 1 row), delete old ones to enforce "one line per user"
-            if len(existing.data) > 1:
-                print(f"DEBUG: Found {len(existing.data)} records for user {data['user_id']}. Cleaning up duplicates.")
-                for i in range(1, len(existing.data)):
-                    dup_id = existing.data[i]['id']
-                    # Delete duplicate
-                    supabase.table("user_measurements").delete().eq("id", dup_id).execute()
-            
-            # Update the latest record
-            response = supabase.table("user_measurements").update(data).eq("id", record_id).execute()
-        else:
-            # Insert new
-            response = supabase.table("user_measurements").insert(data).execute()
+        # One row per user (unique user_id, see scripts/migration_user_measurements_unique.sql):
+        # insert or update in a single round trip, safe under concurrent saves
+        response = supabase.table("user_measurements").upsert(data, on_conflict="user_id").execute()
         
+        await on_user_data_changed(recommender, data["user_id"], background_tasks)
         return {"status": "success", "data": response.data}
     except Exception as e:
-        print(f"Error updating measurements: {e}")
+        logger.error("Error updating measurements: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/measurements/{user_id}")
-async def get_measurements(user_id: str):
+async def get_measurements(user_id: str, request: Request, response: Response,
+                           caller: Optional[Dict[str, Any]] = Depends(authorize_user_id)):
     try:
+        # Conditional GET: unchanged data costs at most a one-row version query
+        version = await asyncio.to_thread(data_versions.get, supabase, "user_measurements", user_id, "updated_at")
+        etag = make_etag("measurements", user_id, version)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        response.headers["ETag"] = etag
+
         # Get the latest updated measurement
-        response = supabase.table("user_measurements").select("*").eq("user_id", user_id).order("updated_at", desc=True).limit(1).execute()
+        result = supabase.table("user_measurements").select("*").eq("user_id", user_id).order("updated_at", desc=True).limit(1).execute()
         
-        if not response.data:
+        if not result.data:
             return {"status": "success", "data": None}
             
-        return {"status": "success", "data": response.data[0]}
+        return {"status": "success", "data": result.data[0]}
     except Exception as e:
-        print(f"Error fetching measurements: {e}")
+        logger.error("Error fetching measurements: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
+@router.get("/fit-matrix/{user_id}")
+async def get_fit_matrix(user_id: str, brand: Optional[str] = None, category: Optional[str] = None,
+                         recommender: SizeRecommender = Depends(get_recommender),
+                         caller: Optional[Dict[str, Any]] = Depends(authorize_user_id)):
+    # Precomputed size per brand/category (closet screen, brand-level queries)
+    try:
+        rows = await asyncio.to_thread(recommender.get_fit_matrix, user_id, brand, category)
+        return {"status": "success", "data": rows}
+    except Exception as e:
+        logger.error("Error fetching fit matrix: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/history/{user_id}")
-async def get_user_history(user_id: str):
+async def get_user_history(
+    user_id: str,
+    request: Request,
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=HISTORY_MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="Önceki sayfanın next_cursor değeri"),
+    view: str = Query("full", pattern="^(full|list)$", description="list: sadece liste görünümü alanları"),
+    count: bool = Query(False, description="Bu cursor'dan itibaren toplam kayıt sayısını da döndür"),
+    caller: Optional[Dict[str, Any]] = Depends(authorize_user_id),
+):
+    # Keyset pagination on (created_at, id), newest first; the cost of a page does not grow with history
+    position = _decode_history_cursor(cursor) if cursor else None
     try:
-        response = supabase.table("recommendation_history").select("*").eq("user_id", user_id).order("created_at", desc=True).execute()
-        return {"status": "success", "data": response.data}
+        version = await asyncio.to_thread(data_versions.get, supabase, "recommendation_history", user_id, "created_at")
+        etag = make_etag("history", user_id, version, limit, cursor, view, count)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+        columns = HISTORY_LIST_COLUMNS if view == "list" else "*"
+        query = supabase.table("recommendation_history") \
+            .select(columns, count="exact" if count else None) \
+            .eq("user_id", user_id)
+        if position:
+            created_at, item_id = position
+            query = query.or_(f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt."{item_id}")')
+        # One extra row tells whether another page exists
+        page = query.order("created_at", desc=True).order("id", desc=True).limit(limit + 1).execute()
+
+        rows = page.data or []
+        next_cursor = _encode_history_cursor(rows[limit - 1]) if len(rows) > limit else None
+        result = {"status": "success", "data": rows[:limit], "next_cursor": next_cursor}
+        if count:
+            result["total"] = page.count
+        # Rendered straight to JSON bytes (DB rows are plain JSON types)
+        return FastJSONResponse(result, headers={"ETag": etag})
     except Exception as e:
-        print(f"Error fetching history: {e}")
+        logger.error("Error fetching history: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 @router.post("/history/add")
-async def add_history(item: HistoryItemCreate):
+async def add_history(item: HistoryItemCreate, writer: HistoryWriter = Depends(get_history_writer),
+                      caller: Optional[Dict[str, Any]] = Depends(get_current_user)):
+    ensure_user(caller, item.user_id)
     try:
-        data = item.model_dump()
-        response = supabase.table("recommendation_history").insert(data).execute()
-        return {"status": "success", "data": response.data}
+        # Buffered and written in bulk (see HistoryWriter); the row is durable once spooled
+        row = writer.enqueue(item.model_dump())
+        return {"status": "success", "data": [row]}
+    except HistoryBufferFull as e:
+        logger.error("Error adding history: %s", e)
+        raise HTTPException(status_code=503, detail="Geçmiş şu anda kaydedilemiyor. Lütfen daha sonra tekrar deneyin.")
     except Exception as e:
-        print(f"Error adding history: {e}")
+        logger.error("Error adding history: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
 
 @router.delete("/history/{item_id}")
-async def delete_history_item(item_id: str):
-    print(f"DEBUG: Attempting to delete history item: '{item_id}'")
+async def delete_history_item(item_id: str, caller: Optional[Dict[str, Any]] = Depends(get_current_user)):
+    logger.debug("Attempting to delete history item: '%s'", item_id)
     try:
-        # Use supabase_admin to ensure we bypass RLS
-        response = supabase_admin.table("recommendation_history").delete().eq("id", item_id).execute()
-        print(f"DEBUG: Delete response data: {response.data}")
+        # Use supabase_admin to ensure we bypass RLS; authenticated callers can only delete their own items
+        query = supabase_admin.table("recommendation_history").delete().eq("id", item_id)
+        if is_user_caller(caller):
+            query = query.eq("user_id", caller["sub"])
+        response = query.execute()
+        logger.debug("Delete response data: %s", response.data)
+        for user_id in {row.get("user_id") for row in response.data or []}:
+            data_versions.invalidate("recommendation_history", user_id)
         
         # NOTE: Sometimes delete returns empty list even if successful if no 'returning' header is sent or handled differently.
         # Since we use admin client and verified ID exists, we'll assume success if no exception.
@@ -143,33 +231,52 @@ async def delete_history_item(item_id: str):
             
         return {"status": "success", "data": response.data}
     except Exception as e:
-        print(f"Error deleting history item: {e}")
+        logger.error("Error deleting history item: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/references/{user_id}")
-async def get_user_references(user_id: str):
+async def get_user_references(user_id: str, request: Request, response: Response,
+                              caller: Optional[Dict[str, Any]] = Depends(authorize_user_id)):
     try:
-        response = supabase.table("user_references").select("*").eq("user_id", user_id).order("brand", desc=False).execute()
-        return {"status": "success", "data": response.data}
+        # References are only inserted or deleted, so count + max(id) identifies a version
+        version = await asyncio.to_thread(data_versions.get, supabase, "user_references", user_id, "id")
+        etag = make_etag("references", user_id, version)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        response.headers["ETag"] = etag
+
+        result = supabase.table("user_references").select("*").eq("user_id", user_id).order("brand", desc=False).execute()
+        return {"status": "success", "data": result.data}
     except Exception as e:
-        print(f"Error fetching references: {e}")
+        logger.error("Error fetching references: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/references")
-async def add_reference(ref: UserReferenceCreate):
+async def add_reference(ref: UserReferenceCreate, background_tasks: BackgroundTasks,
+                        recommender: SizeRecommender = Depends(get_recommender),
+                        caller: Optional[Dict[str, Any]] = Depends(get_current_user)):
+    ensure_user(caller, ref.user_id)
     try:
         data = ref.model_dump()
         response = supabase.table("user_references").insert(data).execute()
+        await on_user_data_changed(recommender, data["user_id"], background_tasks)
         return {"status": "success", "data": response.data}
     except Exception as e:
-        print(f"Error adding reference: {e}")
+        logger.error("Error adding reference: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("/references/{ref_id}")
-async def delete_reference(ref_id: int):
+async def delete_reference(ref_id: int, background_tasks: BackgroundTasks,
+                           recommender: SizeRecommender = Depends(get_recommender),
+                           caller: Optional[Dict[str, Any]] = Depends(get_current_user)):
     try:
-        response = supabase.table("user_references").delete().eq("id", ref_id).execute()
+        query = supabase.table("user_references").delete().eq("id", ref_id)
+        if is_user_caller(caller):
+            query = query.eq("user_id", caller["sub"])
+        response = query.execute()
+        for user_id in {row["user_id"] for row in response.data or []}:
+            await on_user_data_changed(recommender, user_id, background_tasks)
         return {"status": "success", "data": response.data}
     except Exception as e:
-        print(f"Error deleting reference: {e}")
+        logger.error("Error deleting reference: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
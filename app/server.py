@@ -0,0 +1,35 @@
+import logging
+import os
+import uvicorn
+from app.core.config import settings, cache_backend, cache_url
+
+logger = logging.getLogger(__name__)
+
+# Production entry point: `python -m app.server`.
+# uvicorn supervises WEB_CONCURRENCY worker processes (restarting any that die); each worker
+# runs its own lifespan, so every worker has its own browser, history spool and rate limit
+# buckets, while the caches in app/core/cache.py are shared through CACHE_BACKEND.
+
+
+def main():
+    workers = max(1, settings.WEB_CONCURRENCY)
+    if cache_backend == "sqlite":
+        # The SQLite cache lives as long as one deployment; start every run from an empty file
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                os.remove(cache_url + suffix)
+            except FileNotFoundError:
+                pass
+    logger.info("Starting %s worker(s) on %s:%s with %s caches.", workers, settings.HOST, settings.PORT, cache_backend)
+    uvicorn.run(
+        "app.main:app",
+        host=settings.HOST,
+        port=settings.PORT,
+        workers=workers,
+        # Let in-flight scrapes and the history flush finish on shutdown
+        timeout_graceful_shutdown=30,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+from app.data import standard_sizes, zara_sizes
+from app.models.sizing import SizeChart
+
+# Key used for the brand-independent gender charts
+STANDARD = "standard"
+
+GENDER_ALIASES = {
+    "male": "male", "erkek": "male", "man": "male",
+    "female": "female", "kadın": "female", "kadin": "female", "woman": "female",
+}
+
+ChartKey = Tuple[str, str, str]  # (brand, gender, category)
+
+
+def normalize_brand(brand_name: Optional[str]) -> str:
+    return (brand_name or "").lower().replace(".com", "").strip()
+
+
+def normalize_gender(gender: Optional[str]) -> str:
+    """'male', 'female' or 'other' (anything unrecognized)."""
+    return GENDER_ALIASES.get((gender or "").lower(), "other")
+
+
+def _validate(key: ChartKey, rows: List[Dict[str, Any]]) -> None:
+    if not rows:
+        raise ValueError(f"Empty built-in size chart: {key}")
+    for row in rows:
+        if not row.get("size_label"):
+            raise ValueError(f"Size chart {key} has a row without size_label: {row}")
+        for field, min_v in row.items():
+            if field.startswith("min_") and min_v is not None:
+                max_v = row.get(f"max_{field[4:]}")
+                if max_v is not None and min_v > max_v:
+                    raise ValueError(f"Size chart {key}, {row['size_label']}: {field} > max_{field[4:]}")
+
+
+class ChartRegistry:
+    """
+    Read-only index of the size charts bundled with the app, keyed by (brand, gender, category).
+    Charts are validated and pre-sorted once when the registry is built; lookups are dict reads.
+    """
+
+    def __init__(self, sources: Dict[ChartKey, List[Dict[str, Any]]]):
+        charts: Dict[ChartKey, SizeChart] = {}
+        for key, chart_rows in sources.items():
+            _validate(key, chart_rows)
+            charts[key] = SizeChart.from_rows(chart_rows)
+
+        self._charts: Mapping[ChartKey, SizeChart] = MappingProxyType(charts)
+        self.brands = frozenset(brand for brand, _, _ in charts if brand != STANDARD)
+
+    def __contains__(self, key: ChartKey) -> bool:
+        return key in self._charts
+
+    def __len__(self) -> int:
+        return len(self._charts)
+
+    def get(self, brand_name: Optional[str], gender: Optional[str], category: str) -> Optional[SizeChart]:
+        """Bundled chart for a brand, or None if the brand/gender/category is not bundled."""
+        return self._charts.get((normalize_brand(brand_name), normalize_gender(gender), category))
+
+    def standard(self, gender: Optional[str], category: str) -> Optional[SizeChart]:
+        """Gender-based fallback chart ('other' gets the universal chart)."""
+        return self._charts.get((STANDARD, normalize_gender(gender), category))
+
+
+def _build_sources() -> Dict[ChartKey, List[Dict[str, Any]]]:
+    sources: Dict[ChartKey, List[Dict[str, Any]]] = {}
+
+    for gender, chart in (("male", standard_sizes.MALE_SIZE_CHART),
+                          ("female", standard_sizes.FEMALE_SIZE_CHART),
+                          ("other", standard_sizes.UNIVERSAL_SIZE_CHART)):
+        for category in ("top", "bottom"):
+            sources[(STANDARD, gender, category)] = [r for r in chart if r["category"] == category]
+
+    # Kids' charts are height-based and not part of the adult recommendation flow
+    sources[("zara", "male", "top")] = zara_sizes.ZARA_MEN_TOPS
+    sources[("zara", "male", "bottom")] = zara_sizes.ZARA_MEN_BOTTOMS
+    sources[("zara", "female", "top")] = zara_sizes.ZARA_WOMEN_TOPS
+    sources[("zara", "female", "bottom")] = zara_sizes.ZARA_WOMEN_BOTTOMS
+    return sources
+
+
+STATIC_CHARTS = ChartRegistry(_build_sources())
@@ -0,0 +1,74 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+from supabase import Client
+from app.services.recommendation import SizeRecommender
+from app.services.scraper import ProductScraper
+
+logger = logging.getLogger(__name__)
+
+
+class HealthMonitor:
+    """
+    Probes the database and the scraper's browser every `interval` seconds in the
+    background and keeps the result in memory, so health endpoints never touch the DB.
+    A probe that takes longer than `timeout` seconds counts as a failure. The app is not
+    ready until the recommender has preloaded its catalog.
+    """
+
+    def __init__(self, supabase_client: Client, scraper: ProductScraper, recommender: SizeRecommender,
+                 interval: float = 15.0, timeout: float = 5.0):
+        self.supabase = supabase_client
+        self.scraper = scraper
+        self.recommender = recommender
+        self.interval = interval
+        self.timeout = timeout
+        self.warmed_up = False
+        self._status: Dict[str, Any] = {"db": "unknown", "browser": "unknown", "checked_at": None}
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return (self.warmed_up and self.recommender.ready
+                and self._status["db"] == "connected" and self._status["browser"] == "connected")
+
+    def status(self) -> Dict[str, Any]:
+        recommender = "ready" if self.recommender.ready else "warming_up"
+        return {"ready": self.ready, "warmed_up": self.warmed_up, "recommender": recommender, **self._status}
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def probe(self) -> None:
+        status: Dict[str, Any] = {}
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.to_thread(self._ping_db), timeout=self.timeout)
+            status["db"] = "connected"
+        except asyncio.TimeoutError:
+            status["db"] = "timeout"
+        except Exception as e:
+            logger.error("Health check DB error: %s", e)
+            status["db"] = "disconnected"
+        status["db_latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        status["browser"] = "connected" if self.scraper.browser_connected else "disconnected"
+        status["checked_at"] = time.time()
+
+        if status["db"] != self._status["db"] or status["browser"] != self._status["browser"]:
+            logger.info("Health changed: db=%s browser=%s", status["db"], status["browser"])
+        self._status = status
+
+    def _ping_db(self) -> None:
+        self.supabase.table("profiles").select("id").limit(1).execute()
+
+    async def _run(self) -> None:
+        while True:
+            await self.probe()
+            await asyncio.sleep(self.interval)
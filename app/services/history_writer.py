@@ -0,0 +1,229 @@
+import asyncio
+import glob
+import json
+import logging
+import os
+import re
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from postgrest.exceptions import APIError
+from supabase import Client
+from app.core.etag import data_versions
+
+try:
+    import fcntl
+except ImportError:  # Windows: single worker only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+def _pid_alive(pid: int) -> bool:
+    if fcntl is None:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+# Postgres error classes that reject the row itself (22 data exception, 23 integrity
+# constraint, 42 undefined column / syntax) and PostgREST request/schema errors:
+# retrying the same row can never succeed
+PERMANENT_PG_CLASSES = ("22", "23", "42")
+PERMANENT_PGRST_PREFIXES = ("PGRST1", "PGRST2")
+
+
+def _is_permanent(error: Exception) -> bool:
+    if not isinstance(error, APIError) or not error.code:
+        return False  # network errors, timeouts, 5xx without a PG code: transient
+    code = str(error.code)
+    return code[:2] in PERMANENT_PG_CLASSES or code.startswith(PERMANENT_PGRST_PREFIXES)
+
+
+class HistoryBufferFull(RuntimeError):
+    """Raised by enqueue when `max_pending` rows are already waiting for the DB."""
+
+
+class HistoryWriter:
+    """
+    Write-behind buffer for recommendation_history inserts.
+
+    Rows are appended to a local spool file (JSON lines) and an in-memory buffer, and
+    written to the DB in bulk when the buffer reaches `batch_size` or every `flush_interval`
+    seconds. The spool is rewritten after each successful flush, and rows still in it are
+    replayed on start, so a crash loses nothing. A crash between an insert and the spool
+    rewrite can replay that batch once more (at-least-once).
+
+    Each worker process spools to its own file (`<spool>.<pid>.jsonl`). On start a worker
+    takes over the spools of processes that are no longer running, under a file lock so
+    two workers never replay the same file.
+
+    A batch the DB rejects is split in halves until the offending rows are isolated;
+    those go to a dead-letter file (`<spool>.dead.jsonl`) with the error, and the rest
+    are written. Transient errors (network, timeouts, 5xx) keep the rows for the next
+    flush. At most `max_pending` rows are buffered; beyond that enqueue raises
+    HistoryBufferFull instead of acknowledging rows that may never be written.
+    """
+
+    TABLE = "recommendation_history"
+
+    def __init__(self, supabase_client: Client, spool_path: str,
+                 batch_size: int = 100, flush_interval: float = 2.0, max_pending: int = 10_000):
+        self.supabase = supabase_client
+        self._spool_root, self._spool_ext = os.path.splitext(spool_path)
+        self.spool_path = f"{self._spool_root}.{os.getpid()}{self._spool_ext}"
+        self.dead_letter_path = f"{self._spool_root}.dead{self._spool_ext}"
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.dead_lettered = 0
+        self._buffer: List[Dict[str, Any]] = []
+        self._spool = None
+        self._flush_lock = asyncio.Lock()
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    async def start(self) -> None:
+        """Replays rows left in spools by previous runs and starts the flush loop."""
+        os.makedirs(os.path.dirname(os.path.abspath(self.spool_path)), exist_ok=True)
+        with open(f"{self._spool_root}.lock", "w") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            orphans = self._orphaned_spools()
+            for path in orphans:
+                replayed = len(self._buffer)
+                with open(path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            self._buffer.append(json.loads(line))
+                        except ValueError:
+                            pass  # torn last line of a crashed write
+                if len(self._buffer) > replayed:
+                    logger.info("Replaying %s unflushed history rows from %s.", len(self._buffer) - replayed, path)
+            # Rows are in this worker's spool before the old files go away
+            self._rewrite_spool()
+            for path in orphans:
+                if path != self.spool_path:
+                    os.remove(path)
+        self._task = asyncio.create_task(self._run())
+
+    def _orphaned_spools(self) -> List[str]:
+        """Spool files of this base path whose process is gone (or is this one, from a previous run)."""
+        pattern = re.compile(re.escape(self._spool_root) + r"(?:\.(\d+))?" + re.escape(self._spool_ext) + "$")
+        orphans = []
+        for path in glob.glob(f"{glob.escape(self._spool_root)}*{glob.escape(self._spool_ext)}"):
+            match = pattern.match(path)
+            if not match:
+                continue
+            pid = int(match.group(1)) if match.group(1) else None
+            if pid is None or pid == os.getpid() or not _pid_alive(pid):
+                orphans.append(path)
+        return orphans
+
+    async def close(self) -> None:
+        """Stops the flush loop and writes everything still buffered."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+        if self._buffer:
+            logger.warning("%s history rows could not be written; kept in %s.", len(self._buffer), self.spool_path)
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
+
+    def enqueue(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Buffers a history row and returns it as it will be stored.
+        created_at is set here so ordering follows request time, not flush time.
+        """
+        if self._spool is None:
+            raise RuntimeError("HistoryWriter.start() has not been called")
+        if len(self._buffer) >= self.max_pending:
+            self._wake.set()
+            raise HistoryBufferFull(f"{len(self._buffer)} history rows are waiting for the DB")
+        row = {**row, "created_at": row.get("created_at") or datetime.now(timezone.utc).isoformat()}
+        self._spool.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self._spool.flush()
+        self._buffer.append(row)
+        if len(self._buffer) >= self.batch_size:
+            self._wake.set()
+        return row
+
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            while self._buffer:
+                batch = self._buffer[:self.batch_size]
+                dead: List[Dict[str, Any]] = []
+                done = await asyncio.to_thread(self._write, batch, dead)
+                if dead:
+                    self._dead_letter(dead)
+                if done:
+                    del self._buffer[:done]
+                    self._rewrite_spool()
+                    for user_id in {row.get("user_id") for row in batch[:done]}:
+                        data_versions.invalidate(self.TABLE, user_id)
+                if done < len(batch):
+                    return  # transient error: the rest stays buffered and spooled for the next flush
+
+    def _write(self, rows: List[Dict[str, Any]], dead: List[Dict[str, Any]]) -> int:
+        """
+        Inserts `rows`, bisecting around rows the DB rejects (appended to `dead`).
+        Returns how many leading rows are settled (written or dead); stops at a transient error.
+        """
+        try:
+            self._insert(rows)
+            return len(rows)
+        except Exception as e:
+            if not _is_permanent(e):
+                logger.error("Error flushing %s history rows (will retry): %s", len(rows), e)
+                return 0
+            if len(rows) == 1:
+                logger.error("History row rejected by the DB, moved to %s: %s", self.dead_letter_path, e)
+                dead.append({"row": rows[0], "error": str(e),
+                             "failed_at": datetime.now(timezone.utc).isoformat()})
+                return 1
+        mid = len(rows) // 2
+        done = self._write(rows[:mid], dead)
+        if done < mid:
+            return done
+        return mid + self._write(rows[mid:], dead)
+
+    def _insert(self, rows: List[Dict[str, Any]]) -> None:
+        self.supabase.table(self.TABLE).insert(rows).execute()
+
+    def _dead_letter(self, entries: List[Dict[str, Any]]) -> None:
+        # Shared by all workers; one write per line in append mode keeps lines whole
+        with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self.dead_lettered += len(entries)
+
+    def _rewrite_spool(self) -> None:
+        # Spool = exactly the rows not yet in the DB; replaced atomically
+        if self._spool is not None:
+            self._spool.close()
+        tmp_path = f"{self.spool_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for row in self._buffer:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.spool_path)
+        self._spool = open(self.spool_path, "a", encoding="utf-8")
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
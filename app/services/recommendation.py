@@ -1,61 +1,77 @@
-from typing import Dict, List, Optional, Any
+import hashlib
+import itertools
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Any, Tuple
 from supabase import Client
-from app.data import zara_sizes
+from app.core.cache import SharedCache, TTLCache
+from app.core.logging import sample_debug_trace
+from app.data import standard_sizes
+from app.services.scoring import normalize_percentages, numeric_size_scores
+from app.services.size_labels import size_ordinal
+from app.services.chart_registry import STATIC_CHARTS, STANDARD, normalize_brand
+from app.models.sizing import SizeChart, UserBody, ProductSignals
+from app.models.explanation import Explanation, render_fit_message
+
+logger = logging.getLogger(__name__)
+
+# Cached "not found" results are stored as None, so cache misses need their own marker
+_MISSING = object()
+
+# Keys of a full recommendation response, in response order
+RECOMMENDATION_FIELDS = ("recommended_size", "size_percentages", "fit_message", "detailed_report", "warning")
+# What list views need: the size and its confidence
+COMPACT_FIELDS = ("recommended_size", "size_percentages")
+# Fields that can be requested on top of RECOMMENDATION_FIELDS
+EXTRA_FIELDS = ("explanation",)
+
+
+@dataclass(frozen=True, slots=True)
+class _PendingScore:
+    """A recommendation decided up to its chart percentages, which batches score in bulk."""
+    chart: SizeChart
+    metric: str
+    value: float
+    final_label: str
+    warning: str
+    explanation: Explanation
+
+
+def render_recommendation(result: Dict[str, Any], fields: Optional[Tuple[str, ...]] = None) -> Dict[str, Any]:
+    """
+    Turns a computed recommendation into its response dict, rendering text only for
+    the requested fields (None = RECOMMENDATION_FIELDS). Error keys are always kept.
+    """
+    explanation = result.get("explanation")
+    if explanation is None:
+        # Errors and early exits are plain text already
+        if fields is None:
+            return dict(result)
+        return {k: v for k, v in result.items() if k in fields or k in ("error", "detail")}
+
+    response = {}
+    for name in fields or RECOMMENDATION_FIELDS:
+        if name == "fit_message":
+            response[name] = render_fit_message(result["size_percentages"])
+        elif name == "detailed_report":
+            response[name] = explanation.render_report()
+        elif name == "explanation":
+            response[name] = explanation.to_dict()
+        elif name == "size_percentages":
+            response[name] = dict(result["size_percentages"])
+        elif name in result:
+            response[name] = result[name]
+    return response
 
 class SizeRecommender:
-    # Erkek Beden Tablosu - Daha geniş omuz/göğüs, düz kalça
-    MALE_SIZE_CHART = [
-        # Tops - Erkek (Büyük göğüs, omuz genişliği)
-        {"size_label": "XS", "category": "top", "min_chest": 84, "max_chest": 90, "min_waist": 70, "max_waist": 76},
-        {"size_label": "S", "category": "top", "min_chest": 90, "max_chest": 96, "min_waist": 76, "max_waist": 82},
-        {"size_label": "M", "category": "top", "min_chest": 96, "max_chest": 102, "min_waist": 82, "max_waist": 88},
-        {"size_label": "L", "category": "top", "min_chest": 102, "max_chest": 108, "min_waist": 88, "max_waist": 94},
-        {"size_label": "XL", "category": "top", "min_chest": 108, "max_chest": 116, "min_waist": 94, "max_waist": 102},
-        {"size_label": "XXL", "category": "top", "min_chest": 116, "max_chest": 124, "min_waist": 102, "max_waist": 110},
-        # Bottoms - Erkek (Bel ön planda, düz kalça)
-        {"size_label": "XS", "category": "bottom", "min_waist": 70, "max_waist": 76, "min_hip": 88, "max_hip": 94},
-        {"size_label": "S", "category": "bottom", "min_waist": 76, "max_waist": 82, "min_hip": 94, "max_hip": 100},
-        {"size_label": "M", "category": "bottom", "min_waist": 82, "max_waist": 88, "min_hip": 100, "max_hip": 106},
-        {"size_label": "L", "category": "bottom", "min_waist": 88, "max_waist": 94, "min_hip": 106, "max_hip": 112},
-        {"size_label": "XL", "category": "bottom", "min_waist": 94, "max_waist": 102, "min_hip": 112, "max_hip": 120},
-        {"size_label": "XXL", "category": "bottom", "min_waist": 102, "max_waist": 110, "min_hip": 120, "max_hip": 128},
-    ]
-    
-    # Kadın Beden Tablosu - Daha dar omuz, belirgin kalça
-    FEMALE_SIZE_CHART = [
-        # Tops - Kadın (Küçük omuz, göğüs çevresi farklı hesap)
-        {"size_label": "XXS", "category": "top", "min_chest": 76, "max_chest": 80, "min_waist": 58, "max_waist": 62},
-        {"size_label": "XS", "category": "top", "min_chest": 80, "max_chest": 84, "min_waist": 62, "max_waist": 66},
-        {"size_label": "S", "category": "top", "min_chest": 84, "max_chest": 88, "min_waist": 66, "max_waist": 70},
-        {"size_label": "M", "category": "top", "min_chest": 88, "max_chest": 94, "min_waist": 70, "max_waist": 76},
-        {"size_label": "L", "category": "top", "min_chest": 94, "max_chest": 100, "min_waist": 76, "max_waist": 82},
-        {"size_label": "XL", "category": "top", "min_chest": 100, "max_chest": 108, "min_waist": 82, "max_waist": 90},
-        {"size_label": "XXL", "category": "top", "min_chest": 108, "max_chest": 116, "min_waist": 90, "max_waist": 98},
-        # Bottoms - Kadın (Kalça ön planda, bel ikincil)
-        {"size_label": "XXS", "category": "bottom", "min_waist": 58, "max_waist": 62, "min_hip": 84, "max_hip": 88},
-        {"size_label": "XS", "category": "bottom", "min_waist": 62, "max_waist": 66, "min_hip": 88, "max_hip": 92},
-        {"size_label": "S", "category": "bottom", "min_waist": 66, "max_waist": 70, "min_hip": 92, "max_hip": 96},
-        {"size_label": "M", "category": "bottom", "min_waist": 70, "max_waist": 76, "min_hip": 96, "max_hip": 102},
-        {"size_label": "L", "category": "bottom", "min_waist": 76, "max_waist": 82, "min_hip": 102, "max_hip": 108},
-        {"size_label": "XL", "category": "bottom", "min_waist": 82, "max_waist": 90, "min_hip": 108, "max_hip": 116},
-        {"size_label": "XXL", "category": "bottom", "min_waist": 90, "max_waist": 98, "min_hip": 116, "max_hip": 124},
-    ]
-    
-    # Fallback for unknown gender (average of male/female)
-    UNIVERSAL_SIZE_CHART = [
-        {"size_label": "XS", "category": "top", "min_chest": 80, "max_chest": 88, "min_waist": 66, "max_waist": 74},
-        {"size_label": "S", "category": "top", "min_chest": 88, "max_chest": 94, "min_waist": 74, "max_waist": 80},
-        {"size_label": "M", "category": "top", "min_chest": 94, "max_chest": 100, "min_waist": 80, "max_waist": 86},
-        {"size_label": "L", "category": "top", "min_chest": 100, "max_chest": 108, "min_waist": 86, "max_waist": 94},
-        {"size_label": "XL", "category": "top", "min_chest": 108, "max_chest": 116, "min_waist": 94, "max_waist": 102},
-        {"size_label": "XXL", "category": "top", "min_chest": 116, "max_chest": 124, "min_waist": 102, "max_waist": 110},
-        # Bottoms
-        {"size_label": "XS", "category": "bottom", "min_waist": 66, "max_waist": 74, "min_hip": 88, "max_hip": 96},
-        {"size_label": "S", "category": "bottom", "min_waist": 74, "max_waist": 80, "min_hip": 96, "max_hip": 102},
-        {"size_label": "M", "category": "bottom", "min_waist": 80, "max_waist": 86, "min_hip": 102, "max_hip": 108},
-        {"size_label": "L", "category": "bottom", "min_waist": 86, "max_waist": 94, "min_hip": 108, "max_hip": 116},
-        {"size_label": "XL", "category": "bottom", "min_waist": 94, "max_waist": 102, "min_hip": 116, "max_hip": 124},
-    ]
+    # Built-in gender-based charts (app/data/standard_sizes.py), kept here for existing callers
+    MALE_SIZE_CHART = standard_sizes.MALE_SIZE_CHART
+    FEMALE_SIZE_CHART = standard_sizes.FEMALE_SIZE_CHART
+    UNIVERSAL_SIZE_CHART = standard_sizes.UNIVERSAL_SIZE_CHART
 
     # === PROFESSIONAL OPTIMIZATION CONSTANTS ===
     
@@ -112,32 +128,353 @@ class SizeRecommender:
         "kum_saati": {"top": 0, "bottom": 0},
         "regular": {"top": 0, "bottom": 0},
     }
+    # Bump when the recommendation logic changes so memoized results are not reused
+    VERSION = "3"
+
+    # Memo of finished recommendations, keyed by _memo_key (shared by workers, see app/core/cache.py)
+    _memo = SharedCache("recommendations", maxsize=4096, ttl=15 * 60)
+    # Per-user data version; a new value is assigned whenever the user's data changes,
+    # and to users with no entry (never seen, or evicted). Versions are unique across
+    # worker processes and restarts (pid + clock + counter), so an old value never comes back.
+    _user_versions = SharedCache("user_versions", maxsize=100_000, ttl=None)
+    _version_counter = itertools.count(1)
+
+    # Categories a virtual body is materialized for
+    VIRTUAL_BODY_CATEGORIES = ("top", "bottom")
+
+    # Max ids per `in` filter so bulk queries stay within URL length limits
+    PREFETCH_CHUNK_SIZE = 100
+
+    # Neutral products used for the per-user fit matrix: no fabric, fit or review signals,
+    # letter sizes (bottoms are scored as casual so the brand's S/M/L chart decides)
+    FIT_MATRIX_PRODUCTS = {
+        "top": {"product_name": "Tişört", "description": ""},
+        "bottom": {"product_name": "Eşofman", "description": ""},
+    }
+
+    # Lifetime of the instance lookup caches. User data is also dropped by invalidate_user.
+    USER_CACHE_TTL = 5 * 60
+    CATALOG_CACHE_TTL = 60 * 60
+
     def __init__(self, supabase_client: Client):
         self.supabase = supabase_client
+        # Set once warm_up() has run (the app-scoped instance reports ready after that)
+        self.ready = False
+        # Lookup caches owned by this instance; bounded because the app keeps one instance alive.
+        # Row caches are shared by workers so invalidate_user reaches all of them; parsed charts
+        # (numpy matrices) stay in process and are rebuilt from the shared rows.
+        self._brand_ids = SharedCache("brand_ids", maxsize=2048, ttl=self.CATALOG_CACHE_TTL)
+        self._size_charts = SharedCache("size_charts", maxsize=1024, ttl=self.CATALOG_CACHE_TTL)
+        self._charts = TTLCache(maxsize=1024, ttl=self.CATALOG_CACHE_TTL)
+        # (brand name, category) of every DB chart; the shared caches above cannot be enumerated
+        self._chart_index = SharedCache("chart_index", maxsize=1, ttl=self.CATALOG_CACHE_TTL)
+        self._measurements = SharedCache("measurements", maxsize=10_000, ttl=self.USER_CACHE_TTL)
+        self._references = SharedCache("references", maxsize=10_000, ttl=self.USER_CACHE_TTL)
+        self._virtual_bodies = SharedCache("virtual_bodies", maxsize=20_000, ttl=self.USER_CACHE_TTL)
+        self._fit_matrices = SharedCache("fit_matrices", maxsize=10_000, ttl=self.USER_CACHE_TTL)
+
+    def warm_up(self) -> None:
+        """
+        Preloads the brand index and every brand size chart, so the first requests
+        after startup need no catalog queries.
+        """
+        try:
+            brands = self.supabase.table("brands").select("id,name").execute().data or []
+            rows = self.supabase.table("size_catalogs").select("*").execute().data or []
+        except Exception as e:
+            logger.warning("Recommender warm-up failed: %s", e)
+            self.ready = True
+            return
+
+        for row in brands:
+            self._brand_ids.set(normalize_brand(row.get("name")), row["id"])
+
+        grouped: Dict[tuple, List[Dict[str, Any]]] = {}
+        for row in rows:
+            grouped.setdefault((row.get("brand_id"), row.get("category")), []).append(row)
+        for key, chart_rows in grouped.items():
+            self._size_charts.set(key, chart_rows)
+            self._charts.set(key, SizeChart.from_rows(chart_rows, self._get_size_order))
+        self._index_charts(brands, grouped)
+
+        self.ready = True
+        logger.info("Recommender warm-up loaded %s brands and %s size charts.", len(brands), len(grouped))
 
     def _normalize_brand(self, brand_name: str) -> Optional[int]:
         """Tries to find the brand_id in the DB by performing a case-insensitive search."""
-        clean_name = brand_name.lower().replace(".com", "").strip()
+        clean_name = normalize_brand(brand_name)
+        brand_id = self._brand_ids.get(clean_name, _MISSING)
+        if brand_id is not _MISSING:
+            return brand_id
         try:
             response = self.supabase.table("brands").select("id").ilike("name", f"%{clean_name}%").limit(1).execute()
-            if response.data:
-                return response.data[0]["id"]
+            brand_id = response.data[0]["id"] if response.data else None
+            self._brand_ids.set(clean_name, brand_id)
+            return brand_id
         except Exception as e:
-            print(f"Error normalizing brand {brand_name}: {e}")
+            logger.error("Error normalizing brand %s: %s", brand_name, e)
         return None
 
     def _get_user_measurements(self, user_id: str) -> Optional[Dict[str, float]]:
         """Fetches user measurements from DB."""
+        measurements = self._measurements.get(user_id, _MISSING)
+        if measurements is not _MISSING:
+            return measurements
         try:
             response = self.supabase.table("user_measurements").select("*").eq("user_id", user_id).limit(1).execute()
             if response.data:
+                self._measurements.set(user_id, response.data[0])
                 return response.data[0]
         except Exception as e:
-            print(f"Error fetching user measurements for {user_id}: {e}")
+            logger.error("Error fetching user measurements for %s: %s", user_id, e)
         return None
 
+    def _get_user_references(self, user_id: str) -> List[Dict[str, Any]]:
+        """Fetches the user's reference products (brand + size they already wear)."""
+        references = self._references.get(user_id)
+        if references is None:
+            response = self.supabase.table("user_references").select("*").eq("user_id", user_id).execute()
+            references = response.data or []
+            self._references.set(user_id, references)
+        # Callers extend this list, so never hand out the cached one
+        return list(references)
+
+    def prefetch_users(self, user_ids: List[str]) -> None:
+        """
+        Loads measurements and references for many users with one query per chunk,
+        so later lookups for these users are served from memory.
+        """
+        pending = [u for u in dict.fromkeys(user_ids) if u not in self._measurements]
+        for start in range(0, len(pending), self.PREFETCH_CHUNK_SIZE):
+            chunk = pending[start:start + self.PREFETCH_CHUNK_SIZE]
+            try:
+                measurements = self.supabase.table("user_measurements").select("*") \
+                    .in_("user_id", chunk) \
+                    .order("updated_at", desc=True) \
+                    .execute()
+                references = self.supabase.table("user_references").select("*") \
+                    .in_("user_id", chunk) \
+                    .execute()
+            except Exception as e:
+                logger.error("Error prefetching users: %s", e)
+                continue
+
+            found_measurements = {user_id: None for user_id in chunk}
+            found_references = {user_id: [] for user_id in chunk}
+            for row in measurements.data or []:
+                # Rows are newest first; keep the latest one per user
+                if found_measurements.get(row["user_id"]) is None:
+                    found_measurements[row["user_id"]] = row
+            for row in references.data or []:
+                found_references.setdefault(row["user_id"], []).append(row)
+            for user_id in chunk:
+                self._measurements.set(user_id, found_measurements[user_id])
+                self._references.set(user_id, found_references[user_id])
+
+            try:
+                bodies = self.supabase.table("user_virtual_bodies").select("*") \
+                    .in_("user_id", chunk) \
+                    .execute()
+                for row in bodies.data or []:
+                    self._virtual_bodies.set((row["user_id"], row["category"]), row)
+            except Exception as e:
+                logger.error("Error prefetching virtual bodies: %s", e)
+
+    def build_virtual_body(self, user_id: str, category: str) -> Dict[str, Any]:
+        """
+        Resolves every user reference (reference table + the one on the measurements row)
+        against its brand chart and averages chest/waist midpoints into a "virtual body".
+        """
+        user_refs = self._get_user_references(user_id)
+        measurements = self._get_user_measurements(user_id) or {}
+        if measurements.get("reference_brand") and measurements.get("reference_size_label"):
+            user_refs.append({"brand": measurements["reference_brand"], "size_label": measurements["reference_size_label"]})
+
+        references = []
+        for ref in user_refs:
+            brand_id = self._normalize_brand(ref["brand"])
+            chart = self._get_chart(brand_id, category) if brand_id else None
+            if not chart:
+                chart = STATIC_CHARTS.get(ref["brand"], measurements.get("gender"), category)
+            entry = chart.find(ref["size_label"]) if chart is not None else None
+            references.append({
+                "brand": ref["brand"],
+                "size_label": ref["size_label"],
+                "brand_id": brand_id,
+                "chest": entry.midpoints.get("chest") if entry else None,
+                "waist": entry.midpoints.get("waist") if entry else None,
+            })
+
+        chests = [r["chest"] for r in references if r["chest"] is not None]
+        waists = [r["waist"] for r in references if r["waist"] is not None]
+        return {
+            "user_id": user_id,
+            "category": category,
+            "chest": sum(chests) / len(chests) if chests else None,
+            "waist": sum(waists) / len(waists) if waists else None,
+            "ref_count": len(references),
+            "references": references,
+        }
+
+    def refresh_virtual_bodies(self, user_id: str) -> None:
+        """
+        Recomputes and stores the user's virtual body for every category.
+        Called whenever measurements or references change.
+        """
+        try:
+            updated_at = datetime.now(timezone.utc).isoformat()
+            rows = [{**self.build_virtual_body(user_id, category), "updated_at": updated_at}
+                    for category in self.VIRTUAL_BODY_CATEGORIES]
+            self.supabase.table("user_virtual_bodies").upsert(rows, on_conflict="user_id,category").execute()
+            # Results computed while the old body was still stored must not be reused
+            self._bump_user_version(user_id)
+            for row in rows:
+                self._virtual_bodies.set((user_id, row["category"]), row)
+        except Exception as e:
+            logger.error("Error refreshing virtual body for %s: %s", user_id, e)
+            # Never leave a stale record behind; the read path recomputes when it is missing
+            try:
+                self.supabase.table("user_virtual_bodies").delete().eq("user_id", user_id).execute()
+            except Exception:
+                pass
+            self._bump_user_version(user_id)
+
+    def _get_virtual_body(self, user_id: str, category: str) -> Dict[str, Any]:
+        """Reads the stored virtual body, computing (and storing) it if it does not exist yet."""
+        key = (user_id, category)
+        record = self._virtual_bodies.get(key)
+        if record is not None:
+            return record
+
+        record = None
+        version = self._user_version(user_id)
+        try:
+            response = self.supabase.table("user_virtual_bodies").select("*") \
+                .eq("user_id", user_id) \
+                .eq("category", category) \
+                .limit(1) \
+                .execute()
+            if response.data:
+                record = response.data[0]
+            else:
+                record = self.build_virtual_body(user_id, category)
+                self.supabase.table("user_virtual_bodies").upsert(record, on_conflict="user_id,category").execute()
+        except Exception as e:
+            logger.error("Error reading virtual body for %s: %s", user_id, e)
+            if record is None:
+                record = self.build_virtual_body(user_id, category)
+
+        # A refresh that finished meanwhile has stored a newer body; do not cache over it
+        if self._user_version(user_id) == version:
+            self._virtual_bodies.set(key, record)
+        return record
+
+    def _fit_matrix_brands(self) -> List[Tuple[str, str]]:
+        """
+        (brand name, category) pairs the fit matrix covers: every DB brand with a size chart,
+        every bundled chart, and the gender-based standard chart for each category.
+        """
+        indexed = self._chart_index.get("pairs")
+        if indexed is None:
+            # Cold cache (warm-up failed or the entry expired): one catalog scan, then cached again
+            brands = self.supabase.table("brands").select("id,name").execute().data or []
+            charts = self.supabase.table("size_catalogs").select("brand_id,category").execute().data or []
+            indexed = self._index_charts(brands, [(row.get("brand_id"), row.get("category")) for row in charts])
+
+        pairs = set(indexed)
+        pairs.update((brand, category) for brand in STATIC_CHARTS.brands for category in self.FIT_MATRIX_PRODUCTS)
+        pairs.update((STANDARD, category) for category in self.FIT_MATRIX_PRODUCTS)
+
+        # DB and bundled names of the same brand collapse to one entry
+        unique = {}
+        for brand, category in sorted(pairs, key=lambda p: (p[0] == STANDARD, p[0] or "", p[1])):
+            unique.setdefault((normalize_brand(brand), category), (brand, category))
+        return list(unique.values())
+
+    def _index_charts(self, brands: List[Dict[str, Any]], chart_keys: Iterable[tuple]) -> List[Tuple[str, str]]:
+        """Caches and returns (brand name, category) for each (brand_id, category) with a DB chart."""
+        names = {row["id"]: row.get("name") for row in brands}
+        pairs = sorted({(names[brand_id] or "", category) for brand_id, category in chart_keys
+                        if brand_id in names and category in self.FIT_MATRIX_PRODUCTS})
+        self._chart_index.set("pairs", pairs)
+        return pairs
+
+    def build_fit_matrix(self, user_id: str) -> List[Dict[str, Any]]:
+        """
+        The user's size and percentages for every known brand and category, computed with
+        a neutral product so only product-specific signals are left for request time.
+        """
+        rows = []
+        for brand, category in self._fit_matrix_brands():
+            product = {"brand": brand, **self.FIT_MATRIX_PRODUCTS[category]}
+            result = self._compute_recommendation(user_id, product)
+            if "error" in result:
+                continue
+            rows.append({
+                "user_id": user_id,
+                "brand": normalize_brand(brand),
+                "category": category,
+                "recommended_size": result["recommended_size"],
+                "size_percentages": result["size_percentages"],
+                "version": self.VERSION,
+            })
+        return rows
+
+    def refresh_fit_matrix(self, user_id: str) -> None:
+        """
+        Recomputes and stores the user's fit matrix. Runs as a background task after
+        measurements or references change; rows for brands that are gone are removed.
+        """
+        try:
+            updated_at = datetime.now(timezone.utc).isoformat()
+            rows = [{**row, "updated_at": updated_at} for row in self.build_fit_matrix(user_id)]
+            if rows:
+                self.supabase.table("user_fit_matrix").upsert(rows, on_conflict="user_id,brand,category").execute()
+            self.supabase.table("user_fit_matrix").delete() \
+                .eq("user_id", user_id) \
+                .lt("updated_at", updated_at) \
+                .execute()
+            # Readers that loaded the old matrix meanwhile see the version change and do not cache it
+            self._bump_user_version(user_id)
+            self._fit_matrices.set(user_id, rows)
+        except Exception as e:
+            logger.error("Error refreshing fit matrix for %s: %s", user_id, e)
+
+    def get_fit_matrix(self, user_id: str, brand: Optional[str] = None,
+                       category: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Stored fit matrix rows, optionally for one brand and/or category.
+        Missing or outdated (older VERSION) matrices are rebuilt on read.
+        """
+        rows = self._fit_matrices.get(user_id)
+        if rows is None:
+            version = self._user_version(user_id)
+            try:
+                rows = self.supabase.table("user_fit_matrix").select("*").eq("user_id", user_id).execute().data or []
+            except Exception as e:
+                logger.error("Error reading fit matrix for %s: %s", user_id, e)
+                rows = []
+            if not rows or any(row.get("version") != self.VERSION for row in rows):
+                self.refresh_fit_matrix(user_id)
+                rows = self._fit_matrices.get(user_id)
+                if rows is None:
+                    rows = self.build_fit_matrix(user_id)
+            elif self._user_version(user_id) == version:
+                self._fit_matrices.set(user_id, rows)
+
+        if brand is not None:
+            clean_name = normalize_brand(brand)
+            rows = [row for row in rows if row["brand"] == clean_name]
+        if category is not None:
+            rows = [row for row in rows if row["category"] == category]
+        return rows
+
     def _get_size_chart(self, brand_id: int, category: str) -> List[Dict[str, Any]]:
         """Fetches size catalog for the brand and category."""
+        key = (brand_id, category)
+        rows = self._size_charts.get(key)
+        if rows is not None:
+            return list(rows)
         try:
             # Note: We now fetch gender if available, but for simplicity assuming category + brand handles basics.
             # Ideally we'd filter by gender too if product data allows, but keeping existing signature logic for now.
@@ -145,11 +482,38 @@ class SizeRecommender:
                 .eq("brand_id", brand_id) \
                 .eq("category", category) \
                 .execute()
-            return response.data
+            rows = response.data or []
+            self._size_charts.set(key, rows)
+            return list(rows)
         except Exception as e:
-            print(f"Error fetching size chart: {e}")
+            logger.error("Error fetching size chart: %s", e)
             return []
 
+    def _get_chart(self, brand_id: int, category: str) -> SizeChart:
+        """Brand size chart as a pre-sorted SizeChart, built once per (brand, category)."""
+        key = (brand_id, category)
+        chart = self._charts.get(key)
+        if chart is None:
+            chart = SizeChart.from_rows(self._get_size_chart(brand_id, category), self._get_size_order)
+            self._charts.set(key, chart)
+        return chart
+
+    def _extract_product_signals(self, product_data: Dict) -> ProductSignals:
+        """Derives everything the recommender needs from the scraped product in one pass."""
+        description = (product_data.get("description", "") + " " + product_data.get("product_name", "")).lower()
+        return ProductSignals(
+            brand=product_data.get("brand", "Unknown"),
+            product_name=product_data.get("product_name", ""),
+            description=description,
+            fabric=product_data.get("fabric_composition"),
+            category=self._infer_category(product_data),
+            fit_type=self._detect_fit_type(description),
+            available_sizes=product_data.get("available_sizes", []),
+            model_height=product_data.get("model_height"),
+            model_size=product_data.get("model_size", ""),
+            fit_advice=product_data.get("fit_advice", ""),
+        )
+
     def _infer_category(self, product_data: Dict) -> Optional[str]:
         """Infers 'top' or 'bottom' based on clothing keywords. Returns None if not clothing."""
         # Combine Name + Description + URL for maximum keyword coverage
@@ -226,14 +590,9 @@ class SizeRecommender:
             return 2.0 # Loose fit usually
         return 0.0
 
-    def _get_size_order(self, size_label: str) -> int:
-        """Maps size labels to a comparable integer."""
-        label = size_label.upper().strip()
-        mapping = {
-            "XXS": 0, "XS": 1, "S": 2, "M": 3, "L": 4, "XL": 5, "XXL": 6, "3XL": 7,
-            "34": 1, "36": 1, "38": 2, "40": 3, "42": 4, "44": 5, "46": 6
-        }
-        return mapping.get(label, -1)
+    def _get_size_order(self, size_label: str, scale: Optional[str] = None) -> int:
+        """Maps size labels (letter, EU, inch, W/L or compound) to a comparable integer."""
+        return size_ordinal(size_label, scale)
 
     def _estimate_waist(self, height: float, weight: float) -> float:
         """Estimates waist circumference (cm) using BMI-based heuristic."""
@@ -273,68 +632,6 @@ class SizeRecommender:
         else:
             return 1.0  # Obese - one size larger
 
-    def _calculate_gaussian_fit(self, user_val: float, min_v: float, max_v: float) -> float:
-        """
-        Calculates fit score using Gaussian (normal distribution) for professional accuracy.
-        Returns: 0-100 score where 100 = perfect fit at center of range
-        """
-        import math
-        
-        if min_v is None or max_v is None or user_val <= 0:
-            return 0
-        
-        center = (min_v + max_v) / 2
-        sigma = (max_v - min_v) / 4  # 2 sigma covers the range
-        
-        if sigma <= 0:
-            return 50  # Fallback
-        
-        # Gaussian formula: exp(-0.5 * ((x - μ) / σ)²)
-        exponent = -0.5 * ((user_val - center) / sigma) ** 2
-        score = math.exp(exponent) * 100
-        
-        return min(100, max(0, score))
-
-    def _calculate_weighted_size_score(self, size_entry: Dict, user_metrics: Dict, 
-                                        category: str, weights: Dict) -> float:
-        """
-        Calculates weighted fit score for a size using multiple metrics.
-        Returns: 0-100 weighted score
-        """
-        total_weight = 0
-        weighted_score = 0
-        
-        metric_mappings = {
-            "chest": ("min_chest", "max_chest"),
-            "waist": ("min_waist", "max_waist"),
-            "hip": ("min_hip", "max_hip"),
-            "shoulder": ("min_shoulder", "max_shoulder"),
-        }
-        
-        for metric, weight in weights.items():
-            if metric == "weight" or metric == "inseam":
-                continue  # Skip non-chart metrics
-            
-            user_val = user_metrics.get(metric, 0)
-            if user_val <= 0:
-                continue
-            
-            min_key, max_key = metric_mappings.get(metric, (None, None))
-            if not min_key:
-                continue
-            
-            min_v = size_entry.get(min_key)
-            max_v = size_entry.get(max_key)
-            
-            if min_v is not None and max_v is not None:
-                score = self._calculate_gaussian_fit(user_val, min_v, max_v)
-                weighted_score += score * weight
-                total_weight += weight
-        
-        if total_weight > 0:
-            return weighted_score / total_weight
-        return 0
-
     def _get_brand_fit_factor(self, brand_name: str, category: str) -> float:
         """
         Returns brand-specific fit factor for size adjustment.
@@ -371,7 +668,7 @@ class SizeRecommender:
         # PRIORITY 1: Check available_sizes from scraper (most reliable)
         available_sizes = product_data.get("available_sizes", [])
         
-        print(f"DEBUG _detect_pant_type: available_sizes={available_sizes}, product_name={product_name[:50] if product_name else 'N/A'}")
+        logger.debug("_detect_pant_type: available_sizes=%s, product_name=%s", available_sizes, product_name[:50] if product_name else 'N/A')
         
         if available_sizes:
             letter_sizes = ["XXS", "XS", "S", "M", "L", "XL", "XXL", "3XL", "4XL"]
@@ -397,7 +694,7 @@ class SizeRecommender:
             
             has_numeric_sizes = len(numeric_sizes) > 0
             
-            print(f"DEBUG: Size format - Letter:{has_letter_sizes}, Jeans:{has_jeans_format}, Numeric:{has_numeric_sizes}, NumericSizes:{numeric_sizes}")
+            logger.debug("Size format - Letter:%s, Jeans:%s, Numeric:%s, NumericSizes:%s", has_letter_sizes, has_jeans_format, has_numeric_sizes, numeric_sizes)
             
             if has_jeans_format:
                 return "jean"
@@ -419,11 +716,11 @@ class SizeRecommender:
             casual_indicators = ["esofman", "eşofman", "jogger", "sweat", "pijama"]
             
             if any(ind in url for ind in casual_indicators):
-                print("DEBUG: URL indicates casual (eşofman/jogger)")
+                logger.debug("URL indicates casual (eşofman/jogger)")
                 return "casual"
             
             if any(ind in url for ind in numeric_indicators):
-                print("DEBUG: URL indicates formal/numeric (pantolon/chino)")
+                logger.debug("URL indicates formal/numeric (pantolon/chino)")
                 return "formal"
         
         # PRIORITY 3: Keyword-based detection from product name and description
@@ -456,30 +753,14 @@ class SizeRecommender:
             # Only use casual if explicitly a casual item
             if "rahat" in text or "casual" in text:
                 return "casual"
-            print("DEBUG: Generic pantolon detected, defaulting to FORMAL (numeric)")
+            logger.debug("Generic pantolon detected, defaulting to FORMAL (numeric)")
             return "formal"
         
         # Ultimate fallback for bottoms - use formal (numeric) since it's safer for pants
-        print("DEBUG: No specific type detected, defaulting to FORMAL")
+        logger.debug("No specific type detected, defaulting to FORMAL")
         return "formal"
 
-    def _get_size_chart_for_gender(self, gender: str, category: str) -> List[Dict[str, Any]]:
-        """
-        Returns appropriate size chart based on user gender.
-        """
-        gender_lower = (gender or "").lower()
-        
-        if gender_lower in ["male", "erkek", "man"]:
-            chart = self.MALE_SIZE_CHART
-        elif gender_lower in ["female", "kadın", "kadin", "woman"]:
-            chart = self.FEMALE_SIZE_CHART
-        else:
-            chart = self.UNIVERSAL_SIZE_CHART
-        
-        # Filter by category
-        return [s for s in chart if s["category"] == category]
-
-    def _calculate_size_percentages(self, user_measurement: float, size_chart: List[Dict[str, Any]], 
+    def _calculate_size_percentages(self, user_measurement: float, size_chart: SizeChart,
                                      metric_key: str) -> Dict[str, int]:
         """
         Calculates compatibility percentages using Gaussian distribution for professional accuracy.
@@ -487,50 +768,8 @@ class SizeRecommender:
         """
         if not size_chart or user_measurement <= 0:
             return {}
-        
-        scores = {}
-        
-        for size_entry in size_chart:
-            label = size_entry.get("size_label", "")
-            min_v = size_entry.get(f"min_{metric_key}")
-            max_v = size_entry.get(f"max_{metric_key}")
-            
-            if min_v is None or max_v is None:
-                continue
-            
-            # Use Gaussian fit for professional accuracy
-            score = self._calculate_gaussian_fit(user_measurement, min_v, max_v)
-            
-            # Bonus for being within range
-            if min_v <= user_measurement <= max_v:
-                score = min(100, score * 1.2)  # 20% bonus for being in range
-            
-            scores[label] = score
-        
-        if not scores:
-            return {}
-        
-        # Get top 3 scores
-        sorted_scores = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:3]
-        
-        # Normalize to 100% with better distribution
-        total = sum(s[1] for s in sorted_scores)
-        if total == 0:
-            return {}
-        
-        percentages = {}
-        for label, score in sorted_scores:
-            pct = round((score / total) * 100)
-            percentages[label] = max(1, pct)  # Minimum 1%
-        
-        # Adjust to ensure sum is exactly 100
-        current_sum = sum(percentages.values())
-        if current_sum != 100 and percentages:
-            diff = 100 - current_sum
-            top_label = sorted_scores[0][0]
-            percentages[top_label] = max(1, percentages[top_label] + diff)
-        
-        return percentages
+
+        return size_chart.matrix.size_percentages(user_measurement, metric_key)
 
     def _calculate_numeric_pant_percentages(self, waist_cm: float, available_sizes: List[str], pant_type: str = "numeric") -> Dict[str, int]:
         """
@@ -544,9 +783,7 @@ class SizeRecommender:
         
         Returns: Dict with top 3 sizes and percentages that sum to 100
         """
-        import math
-        
-        print(f"DEBUG PANTS: waist_cm={waist_cm}, available_sizes={available_sizes}, pant_type={pant_type}")
+        logger.debug("PANTS: waist_cm=%s, available_sizes=%s, pant_type=%s", waist_cm, available_sizes, pant_type)
         
         if waist_cm <= 0:
             waist_cm = 82  # Default reasonable waist
@@ -555,7 +792,7 @@ class SizeRecommender:
         
         # Calculate ideal waist size in inches
         waist_inch = waist_cm / 2.54
-        print(f"DEBUG PANTS: waist_inch={waist_inch:.1f}")
+        logger.debug("PANTS: waist_inch=%.1f", waist_inch)
         
         # VALIDATION: Filter available_sizes to only valid pant sizes
         valid_sizes = []
@@ -567,7 +804,7 @@ class SizeRecommender:
                 if 26 <= num <= 42 or 44 <= num <= 60:
                     valid_sizes.append(num)
         
-        print(f"DEBUG PANTS: valid_sizes after filtering={valid_sizes}")
+        logger.debug("PANTS: valid_sizes after filtering=%s", valid_sizes)
         
         # CASE 1: We have valid sizes from the product
         if valid_sizes:
@@ -585,18 +822,16 @@ class SizeRecommender:
                 spread = 20  # Points per inch difference
                 size_system = "INCH"
             
-            print(f"DEBUG PANTS: Detected {size_system} sizing, ideal_size={ideal_size:.1f}")
+            logger.debug("PANTS: Detected %s sizing, ideal_size=%.1f", size_system, ideal_size)
             
-            # Score each valid size
-            for size in valid_sizes:
-                distance = abs(ideal_size - size)
-                score = max(0, 100 - (distance * spread))
-                if score > 0:
-                    scores[str(size)] = score
+            # Score all distinct sizes at once
+            distinct_sizes = list(dict.fromkeys(valid_sizes))
+            size_scores = numeric_size_scores(distinct_sizes, ideal_size, spread)
+            scores = {str(size): float(score) for size, score in zip(distinct_sizes, size_scores) if score > 0}
         
         # CASE 2: No valid sizes from scraper - calculate reasonable inch sizes
         if not scores:
-            print(f"DEBUG PANTS: No valid sizes found, generating inch-based sizes")
+            logger.debug("PANTS: No valid sizes found, generating inch-based sizes")
             
             # Calculate ideal inch size from waist
             ideal_inch = round(waist_inch)
@@ -612,61 +847,101 @@ class SizeRecommender:
                     score = 100 - (distance * 25)  # 100, 75, 75
                     scores[str(size)] = max(10, score)
             
-            print(f"DEBUG PANTS: Generated sizes: {scores}")
+            logger.debug("PANTS: Generated sizes: %s", scores)
         
         if not scores:
             # Ultimate fallback - use 32 as default
             scores = {"32": 80, "31": 15, "33": 5}
-            print(f"DEBUG PANTS: Ultimate fallback to default sizes")
-        
-        # Get top 3 scores, sorted by score
-        sorted_scores = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:3]
+            logger.debug("PANTS: Ultimate fallback to default sizes")
         
-        # Normalize to 100%
-        total = sum(s[1] for s in sorted_scores)
-        if total == 0:
-            total = 1
+        # Top 3 sizes normalized to 100%
+        percentages = normalize_percentages(list(scores.keys()), list(scores.values()))
         
-        percentages = {}
-        for label, score in sorted_scores:
-            pct = round((score / total) * 100)
-            percentages[label] = max(1, pct)
-        
-        # Ensure sum is exactly 100
-        current_sum = sum(percentages.values())
-        if current_sum != 100 and percentages:
-            diff = 100 - current_sum
-            top_label = sorted_scores[0][0]
-            percentages[top_label] = max(1, percentages[top_label] + diff)
-        
-        print(f"DEBUG PANTS: Final percentages={percentages}")
+        logger.debug("PANTS: Final percentages=%s", percentages)
         return percentages
 
-    def get_recommendation(self, user_id: str, product_data: Dict) -> Dict[str, Any]:
-        print(f"--- Getting Recommendation for User: {user_id} ---")
+    def invalidate_user(self, user_id: str) -> None:
+        """
+        Drops memoized recommendations and this instance's cached rows for a user
+        (call after measurements/references change). refresh_virtual_bodies and
+        refresh_fit_matrix assign a new version again once the recomputed data is stored,
+        so results computed from the old data in between are not reused.
+        """
+        self._bump_user_version(user_id)
+        self._measurements.delete(user_id)
+        self._references.delete(user_id)
+        for category in self.VIRTUAL_BODY_CATEGORIES:
+            self._virtual_bodies.delete((user_id, category))
+        self._fit_matrices.delete(user_id)
+
+    def _bump_user_version(self, user_id: str) -> str:
+        version = f"{os.getpid()}:{time.time_ns()}:{next(self._version_counter)}"
+        self._user_versions.set(user_id, version)
+        return version
+
+    def _user_version(self, user_id: str) -> str:
+        """Current data version of a user; one without an entry gets a fresh one, never a fixed default."""
+        version = self._user_versions.get(user_id)
+        return version if version is not None else self._bump_user_version(user_id)
+
+    def _memo_key(self, user_id: str, product_data: Dict) -> tuple:
+        """
+        (user, user data version, product fingerprint, recommender version).
+        The fingerprint covers the whole product dict because pant type detection
+        scans all of it, not just brand/category/fabric/sizes.
+        """
+        fingerprint = hashlib.sha1(
+            json.dumps(product_data, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+        return (user_id, self._user_version(user_id), fingerprint, self.VERSION)
+
+    def get_recommendation(self, user_id: str, product_data: Dict,
+                           fields: Optional[Tuple[str, ...]] = None) -> Dict[str, Any]:
+        """
+        Recommendation for one product. `fields` limits the response to those keys
+        (see render_recommendation); report text is only built when asked for.
+        """
+        key = self._memo_key(user_id, product_data)
+        result = self._memo.get(key)
+        if result is None:
+            result = self._compute_recommendation(user_id, product_data)
+            # Errors may be transient (DB hiccups), so only successful results are memoized.
+            # Memoized results are never mutated; rendering always builds a new dict.
+            if "error" not in result:
+                self._memo.set(key, result)
+        return render_recommendation(result, fields)
+
+    def _compute_recommendation(self, user_id: str, product_data: Dict,
+                                defer_scoring: bool = False) -> Any:
+        """
+        Full recommendation dict for one pair. With `defer_scoring`, a pair scored
+        against a size chart returns a _PendingScore instead, finished by _finish_recommendation.
+        """
+        sample_debug_trace()
+        logger.debug("--- Getting Recommendation for User: %s ---", user_id)
         
         # 0. Fetch Data
         measurements = self._get_user_measurements(user_id)
         if not measurements:
             return {"error": "Kullanıcı ölçüleri bulunamadı."}
         
-        u_height = measurements.get("height") or 175
-        u_weight = measurements.get("weight") or 75
-        u_shoulder = measurements.get("shoulder") or 0
-        u_chest = measurements.get("chest") or 0
-        u_waist = measurements.get("waist") or 0
-        u_hips = measurements.get("hips") or 0  # Hip measurement for bottoms
+        # Unpack into locals once; chest/waist may be recalibrated below
+        body = UserBody.from_measurements(measurements)
+        u_height = body.height
+        u_weight = body.weight
+        u_shoulder = body.shoulder
+        u_chest = body.chest
+        u_waist = body.waist
+        u_hips = body.hips  # Hip measurement for bottoms
         # New Measurements (Precision)
-        u_arm_length = measurements.get("arm_length") or 0
-        u_inseam = measurements.get("inseam") or 0
-        u_hand_span = measurements.get("hand_span_cm") or 0
-        ref_brand = measurements.get("reference_brand")
-        ref_size = measurements.get("reference_size_label")
-        garment_spans = measurements.get("garment_width_spans") or 0
+        u_arm_length = body.arm_length
+        u_inseam = body.inseam
+        u_hand_span = body.hand_span
+        garment_spans = body.garment_spans
         
         # 0.5 CHECK SCRAPER ERROR
         if product_data.get("error"):
-             print(f"DEBUG: Scraper returned error: {product_data['error']}")
+             logger.debug("Scraper returned error: %s", product_data['error'])
              return {
                  "recommended_size": "N/A",
                  "confidence_score": 0.0,
@@ -677,16 +952,16 @@ class SizeRecommender:
              }
         
         # 1. Re-extract relevant fields from product_data (passed from router)
-        brand_name = product_data.get("brand", "Unknown")
-        is_zara = "zara" in brand_name.lower()
-        description = (product_data.get("description", "") + " " + product_data.get("product_name", "")).lower()
-        fabric_text = product_data.get("fabric_composition")
-        body_shape = measurements.get("body_shape", "regular")
-        user_gender = measurements.get("gender", "other")  # User's gender for size chart selection
-        
-        print(f"DEBUG: User Gender: {user_gender}")
+        signals = self._extract_product_signals(product_data)
+        brand_name = signals.brand
+        description = signals.description
+        fabric_text = signals.fabric
+        body_shape = body.body_shape
+        user_gender = body.gender  # User's gender for size chart selection
+        
+        logger.debug("User Gender: %s", user_gender)
 
-        category = self._infer_category(product_data)
+        category = signals.category
         if not category:
              return {
                  "recommended_size": "N/A",
@@ -696,8 +971,8 @@ class SizeRecommender:
                  "warning": "Giyilebilir ürün tespit edilemedi"
              }
         
-        print(f"DEBUG: Inputs - Height: {u_height}, Weight: {u_weight}, Shape: {body_shape}")
-        print(f"DEBUG: Product - Brand: {brand_name}, Category: {category}")
+        logger.debug("Inputs - Height: %s, Weight: %s, Shape: %s", u_height, u_weight, body_shape)
+        logger.debug("Product - Brand: %s, Category: %s", brand_name, category)
         
         reasons = []
         
@@ -722,20 +997,22 @@ class SizeRecommender:
         # Determine which weights to use
         metric_weights = self.TOP_WEIGHTS if category == "top" else self.BOTTOM_WEIGHTS
         
-        print(f"DEBUG: BMI Factor: {bmi_factor}, Brand Fit: {brand_fit_factor}, Body Shape Adj: {body_shape_adj}")
+        logger.debug("BMI Factor: %s, Brand Fit: %s, Body Shape Adj: %s", bmi_factor, brand_fit_factor, body_shape_adj)
         
-        # 1. Fetch Size Chart
-        size_chart = []
+        # 1. Fetch Size Chart (the brand's DB chart, else a bundled chart for the brand)
         is_fallback = False
         
         brand_id = self._normalize_brand(brand_name)
-        if brand_id:
-            size_chart = self._get_size_chart(brand_id, category)
+        size_chart = self._get_chart(brand_id, category) if brand_id else None
+        if not size_chart:
+            size_chart = STATIC_CHARTS.get(brand_name, user_gender, category)
+            if size_chart is not None:
+                logger.debug("Using bundled size chart for %s (%s, %s).", brand_name, user_gender, category)
         
         if not size_chart:
             # Fallback logic - Use gender-specific chart
-            print(f"WARNING: No specific size chart found for {brand_name}. Using Gender-Based Standard ({user_gender}).")
-            size_chart = self._get_size_chart_for_gender(user_gender, category)
+            logger.info("No specific size chart found for %s. Using Gender-Based Standard (%s).", brand_name, user_gender)
+            size_chart = STATIC_CHARTS.standard(user_gender, category)
             is_fallback = True
             
         if not size_chart:
@@ -749,7 +1026,7 @@ class SizeRecommender:
             # Circumference = Width * 2
             measured_circumference = garment_width_cm * 2
             
-            print(f"DEBUG: Hand Span Logic -> Width: {garment_width_cm}cm, Circ: {measured_circumference}cm")
+            logger.debug("Hand Span Logic -> Width: %scm, Circ: %scm", garment_width_cm, measured_circumference)
             
             # Check if this matches Chest or Waist based on category
             if category == "top":
@@ -760,90 +1037,60 @@ class SizeRecommender:
                 reasons.append(f"Karış Ölçümü ({garment_spans} karış): Bel {int(u_waist)}cm olarak hesaplandı.")
         
         # If we have MULTIPLE references, we should try to match one of them or average them.
-        # 1. Fetch User References from DB
-        user_refs_response = self.supabase.table("user_references").select("*").eq("user_id", user_id).execute()
-        user_refs = user_refs_response.data or []
-        
-        # Append the single reference from measurements if generic
-        if ref_brand and ref_size:
-            user_refs.append({"brand": ref_brand, "size_label": ref_size})
+        # 1. Read the precomputed Virtual Body (references resolved against their charts on write)
+        virtual_body = self._get_virtual_body(user_id, category)
+        user_refs = virtual_body["references"]
 
         matched_ref = None
 
         # 2. Strategy: Direct Match
         # Does the user have a reference FOR THE CURRENT BRAND?
         for ref in user_refs:
-            if self._normalize_brand(ref["brand"]) == brand_id:
+            if ref["brand_id"] == brand_id:
                 matched_ref = ref
                 reasons.append(f"Direkt Marka Eşleşmesi: Referans verdiğiniz ({ref['brand']} {ref['size_label']}) ile aynı marka.")
                 break
         
         if not matched_ref and user_refs:
            # 3. Strategy: Triangulation (Average Virtual Body)
-           virtual_chests = []
-           virtual_waists = []
-           
-           for ref in user_refs:
-               rb_id = self._normalize_brand(ref["brand"])
-               if rb_id:
-                   rc = self._get_size_chart(rb_id, category)
-                   ri = next((s for s in rc if s["size_label"].lower() == ref["size_label"].lower()), None)
-                   if ri:
-                       if "min_chest" in ri: virtual_chests.append((ri["min_chest"] + ri["max_chest"])/2)
-                       if "min_waist" in ri: virtual_waists.append((ri["min_waist"] + ri["max_waist"])/2)
-
-           if virtual_chests:
-               avg_chest = sum(virtual_chests) / len(virtual_chests)
+           if virtual_body["chest"] is not None:
                # Blend real measurement with virtual average (50/50 or override?)
                # If user measured poorly but knows sizes, virtual is better.
                # Let's use virtual if available.
-               u_chest = avg_chest
+               u_chest = virtual_body["chest"]
                reasons.append(f"{len(user_refs)} Referans Ürün Ortalaması: Göğüs {int(u_chest)}cm olarak kalibre edildi.")
            
-           if virtual_waists and category == "bottom":
-               avg_waist = sum(virtual_waists) / len(virtual_waists)
-               u_waist = avg_waist
+           if virtual_body["waist"] is not None and category == "bottom":
+               u_waist = virtual_body["waist"]
                reasons.append(f"{len(user_refs)} Referans Ürün Ortalaması: Bel {int(u_waist)}cm olarak kalibre edildi.")
 
         elif matched_ref:
             # Calculate directly from matched reference
-             # Find dimensions of matched_ref
-               rb_id = self._normalize_brand(matched_ref["brand"])
-               rc = self._get_size_chart(rb_id, category)
-               ri = next((s for s in rc if s["size_label"].lower() == matched_ref["size_label"].lower()), None)
-               if ri:
-                   if "min_chest" in ri: u_chest = (ri["min_chest"] + ri["max_chest"]) / 2
-                   if "min_waist" in ri: u_waist = (ri["min_waist"] + ri["max_waist"]) / 2
+            if matched_ref["chest"] is not None: u_chest = matched_ref["chest"]
+            if matched_ref["waist"] is not None: u_waist = matched_ref["waist"]
         
         # --- OLD SINGLE REF LOGIC REMOVED/MERGED ABOVE ---
         # elif ref_brand and ref_size: ... (Already handled by appending to list)
 
 
         # 2. Detect Fit Type
-        fit_type = self._detect_fit_type(description)
-        # 2. Detect Fit Type
-        fit_type = self._detect_fit_type(description)
-        print(f"DEBUG: Detected Fit Type: {fit_type}")
+        fit_type = signals.fit_type
+        logger.debug("Detected Fit Type: %s", fit_type)
 
         # 2.1 Calculate Elasticity Bonus
         elasticity_bonus = self._calculate_elasticity_bonus(fabric_text)
         if elasticity_bonus > 0:
-            print(f"DEBUG: Elasticity Bonus Applied: +{elasticity_bonus}cm")
+            logger.debug("Elasticity Bonus Applied: +%scm", elasticity_bonus)
 
         # 2.2 Calculate Ease Allowance (Layering Room)
         product_full_text = f"{brand_name} {description}"
         ease_allowance = self._get_ease_allowance(product_full_text)
         if ease_allowance > 0:
-            print(f"DEBUG: Ease Allowance Applied: +{ease_allowance}cm to User Measurements")
+            logger.debug("Ease Allowance Applied: +%scm to User Measurements", ease_allowance)
 
-        # 3. CRITICAL: Sort Chart by Size Order
-        # We need a reliable index. 
-        # _get_size_order returns 0-5 for S-XXL.
-        size_chart.sort(key=lambda s: self._get_size_order(s.get("size_label", "")))
-        
-        # Map indices to size objects for easy lookup
-        # index 0 might be XS, but let's map whatever we have.
-        # We'll use the self._get_size_order to determine the "slot".
+        # 3. CRITICAL: Chart is sorted by Size Order
+        # SizeChart sorts its entries by canonical ordinal (see size_labels; 2-6 for S-XXL) once
+        # at construction, and each entry carries its ordinal ("slot").
         # Note: If multiple sizes map to same order (e.g. 38 and 40 both 'M'), this logic might need refinement.
         # For now, assuming distinct steps.
         
@@ -863,26 +1110,13 @@ class SizeRecommender:
 
 
         # --- Metric A: Shoulder ---
-        if u_shoulder > 0:
-            for size in size_chart:
-                s_idx = self._get_size_order(size.get("size_label", ""))
-                # If product has shoulder data? Most size charts don't have shoulder.
-                # If they don't, we can't use it directly unless we estimate chest from shoulder.
-                # Assuming size chart MIGHT have min_shoulder/max_shoulder if we added it, 
-                # OR we map shoulder to Chest (Shoulder * 0.85 approx for Top).
-                
-                # Let's assume we use Chest for Tops if Shoulder is not in DB.
-                # But prompt says "size_by_shoulder: Find the size where user.shoulder fits".
-                # If DB lacks shoulder, we skip or infer.
-                # Taking prompt literally: "size_by_shoulder"
-                pass 
+        # Most size charts don't have shoulder data, so shoulder is not matched directly.
+        # It is used as a chest estimate for tops instead (Shoulder * 0.85 approx, see 4a).
 
         # Since generic charts usually use Chest/Waist/Hips, we will map user metrics to those.
         
         # --- Helper to find fitting index ---
         def find_fitting_index(val, metric_key):
-            best_idx = -1
-            
             # Fit Type Logic:
             # Oversize: The garment is larger than standard. It can fit a larger body in the same size label.
             # So effectively, the Size S covers a larger max_chest.
@@ -892,23 +1126,9 @@ class SizeRecommender:
             elif fit_type == "slim":
                 fit_adjustment = -2.0 # Tolerates -2cm less (Runs small)
                 
-            for size in size_chart:
-                idx = self._get_size_order(size.get("size_label", ""))
-                min_v = size.get(f"min_{metric_key}")
-                max_v = size.get(f"max_{metric_key}")
-                
-                if min_v is None or max_v is None: continue
-                
-                # Apply Bonuses to MAX values
-                effective_max = max_v + elasticity_bonus + fit_adjustment
-
-                # Logic: Find the size where val <= effective_max.
-                if val <= effective_max:
-                    return idx
-            
-            if size_chart:
-                return self._get_size_order(size_chart[-1].get("size_label", ""))
-            return -1
+            # Apply Bonuses to MAX values
+            # Logic: Find the size where val <= max + bonuses (largest size if none).
+            return size_chart.first_fitting_ordinal(val, metric_key, elasticity_bonus + fit_adjustment)
 
         # --- 4a. Chest ---
         target_chest = u_chest
@@ -948,23 +1168,24 @@ class SizeRecommender:
         # Revised Heuristic: Lower the thresholds slightly or deprioritize if measurements exist.
         # <55: XS/S, 55-70: S/M?
         # Let's adjust: 
-        # < 62: S (1)
-        # 62 - 75: M (2)
-        # 75 - 88: L (3)
-        # 88 - 100: XL (4)
-        # > 100: XXL (5)
-        # User (67kg) will now fall into M (2).
+        # < 62: S (2)
+        # 62 - 75: M (3)
+        # 75 - 88: L (4)
+        # 88 - 100: XL (5)
+        # > 100: XXL (6)
+        # User (67kg) will now fall into M (3).
         # WAIT, User wants to see difference. If everything forces M, it's bad.
         # Prioritization Logic: If Chest/Waist are valid, IGNORE Weight?
         # Only use weight if Chest/Waist are -1.
         
         w_idx = -1
         # Calculate weight index but store separately for fallback
-        if u_weight < 65: w_idx = 1 # S
-        elif 65 <= u_weight < 78: w_idx = 2 # M
-        elif 78 <= u_weight < 90: w_idx = 3 # L
-        elif 90 <= u_weight < 105: w_idx = 4 # XL
-        elif u_weight >= 105: w_idx = 5 # XXL
+        # Same ordinal scale as the chart (S=2 ... XXL=6)
+        if u_weight < 65: w_idx = 2 # S
+        elif 65 <= u_weight < 78: w_idx = 3 # M
+        elif 78 <= u_weight < 90: w_idx = 4 # L
+        elif 90 <= u_weight < 105: w_idx = 5 # XL
+        elif u_weight >= 105: w_idx = 6 # XXL
         
         candidate_indices["weight"] = w_idx
 
@@ -996,9 +1217,9 @@ class SizeRecommender:
             
             # Round to nearest valid index
             final_idx = round(adjusted_idx)
-            final_idx = max(0, min(7, final_idx))  # Clamp to valid range
+            final_idx = size_chart.clamp_ordinal(final_idx)  # Clamp to the chart's own sizes
             
-            print(f"DEBUG: Base Index: {base_idx}, Adjusted: {adjusted_idx:.2f}, Final: {final_idx}")
+            logger.debug("Base Index: %s, Adjusted: %.2f, Final: %s", base_idx, adjusted_idx, final_idx)
         else:
              return {"error": "Ölçülerden beden belirlenemedi."}
         
@@ -1044,36 +1265,30 @@ class SizeRecommender:
         # Complex logic: if final_idx == candidate_indices['waist'] and fit_type == "slim":
         #    final_idx += 1
         
-        report_lines = []
+        explanation = Explanation()
         
         # Determine strict label
         def get_label(idx):
-            # Find size in chart with this order logic
-            # Reverse map simple S/M/L logic
-            labels = {1: "S", 2: "M", 3: "L", 4: "XL", 5: "XXL"}
-            # Or try to find in chart?
-            for s in size_chart:
-                if self._get_size_order(s.get("size_label", "")) == idx:
-                    return s.get("size_label")
-            return labels.get(idx, "Unknown")
+            # Nearest size the chart actually has for this ordinal
+            return size_chart.label_for(idx) or "?"
 
          # Analyze Report
         # Chest
         c_idx = candidate_indices["chest"]
         if c_idx > -1:
-            report_lines.append(f"Göğüs/Omuz: {get_label(c_idx)} bedenine sığıyor.")
+            explanation.add("Göğüs/Omuz: {} bedenine sığıyor.", get_label(c_idx))
         
         # Waist
         w_idx = candidate_indices["waist"]
         if w_idx > -1:
-            report_lines.append(f"Bel: {get_label(w_idx)} bedenine sığıyor.")
+            explanation.add("Bel: {} bedenine sığıyor.", get_label(w_idx))
             if w_idx == final_idx and w_idx > c_idx and c_idx > -1:
-                report_lines.append(f"(!) Bel ölçünüz {get_label(w_idx)} gerektiriyor, bu yüzden beden büyütüldü.")
+                explanation.add("(!) Bel ölçünüz {} gerektiriyor, bu yüzden beden büyütüldü.", get_label(w_idx))
         
         # Weight
         wt_idx = candidate_indices["weight"]
         if wt_idx > -1:
-            report_lines.append(f"Kilo ({u_weight}kg): En az {get_label(wt_idx)} öneriyor.")
+            explanation.add("Kilo ({}kg): En az {} öneriyor.", u_weight, get_label(wt_idx))
             
         # Adjustments
         adjustment_msg = ""
@@ -1092,24 +1307,24 @@ class SizeRecommender:
              pass
 
         if adjustment_msg:
-             report_lines.append(f"Düzenleme: {adjustment_msg}")
+             explanation.add("Düzenleme: {}", adjustment_msg)
               
         # --- Fit Advice from User Reviews (Trendyol) ---
-        fit_advice = product_data.get("fit_advice", "").lower()
+        fit_advice = signals.fit_advice.lower()
         if fit_advice:
-            report_lines.append(f"Kullanıcı Yorumları: {product_data.get('fit_advice')}")
+            explanation.add("Kullanıcı Yorumları: {}", signals.fit_advice)
             
             # Logic: "bir beden büyük" -> +1
             if "bir beden büyük" in fit_advice:
                 final_idx += 1
-                report_lines.append("Aksiyon: Kullanıcı yorumlarına göre bir beden büyütüldü (+1).")
+                explanation.add("Aksiyon: Kullanıcı yorumlarına göre bir beden büyütüldü (+1).")
             # Logic: "bir beden küçük" -> -1
             elif "bir beden küçük" in fit_advice:
                 final_idx -= 1
-                report_lines.append("Aksiyon: Kullanıcı yorumlarına göre bir beden küçültüldü (-1).")
+                explanation.add("Aksiyon: Kullanıcı yorumlarına göre bir beden küçültüldü (-1).")
 
         if shape_msg:
-             report_lines.append(f"Vücut Şekli Düzenlemesi: {shape_msg}")
+             explanation.add("Vücut Şekli Düzenlemesi: {}", shape_msg)
 
         # Elasticity Note
         if elasticity_bonus > 0:
@@ -1117,11 +1332,11 @@ class SizeRecommender:
             # It's hard to know which exact size won without tracing constraints.
             # But we can verify if the max_constraint was helped by bonus.
             # Simplified: Just notify.
-            report_lines.append(f"Kumaş: Esnek materyal içeriyor (+{elasticity_bonus}cm esneme payı).")
+            explanation.add("Kumaş: Esnek materyal içeriyor (+{}cm esneme payı).", elasticity_bonus)
 
         # Ease Allowance Note
         if ease_allowance > 0:
-            report_lines.append(f"Katman Payı: Dış/orta katman giyimi için {ease_allowance}cm pay eklendi.")
+            explanation.add("Katman Payı: Dış/orta katman giyimi için {}cm pay eklendi.", ease_allowance)
 
         # --- Arm Length Check (Tops) ---
         if category == "top" and u_arm_length > 0:
@@ -1129,10 +1344,10 @@ class SizeRecommender:
             # S: ~63, M: ~64, L: ~65, XL: ~66
             # If User Arm > 66 and Size < XL, warn.
             if u_arm_length > 66 and final_idx < 5: 
-                report_lines.append(f"(!) Kol Boyu ({u_arm_length}cm): Standarttan uzun, kol kısa gelebilir.")
+                explanation.add("(!) Kol Boyu ({}cm): Standarttan uzun, kol kısa gelebilir.", u_arm_length)
 
         # --- Model Comparison ---
-        model_h_str = product_data.get("model_height")
+        model_h_str = signals.model_height
         if model_h_str:
              try:
                  # Clean string "1.76" -> 176
@@ -1141,67 +1356,63 @@ class SizeRecommender:
                  
                  diff = u_height - mh
                  if diff > 5:
-                     report_lines.append(f"Model Analizi: Modelden {int(diff)}cm daha uzunsunuz.")
-                     model_size = product_data.get("model_size", "").upper()
+                     explanation.add("Model Analizi: Modelden {}cm daha uzunsunuz.", int(diff))
+                     model_size = signals.model_size.upper()
                      if model_size and "S" in model_size and final_idx <= 2:
-                         report_lines.append("Model S giyiyor, sizin boy farkınız nedeniyle M tercih edilebilir.")
+                         explanation.add("Model S giyiyor, sizin boy farkınız nedeniyle M tercih edilebilir.")
              except:
                  pass
 
+        final_idx = size_chart.clamp_ordinal(final_idx)  # Adjustments above may step past the chart
         final_label = get_label(final_idx)
         
         # 7. Final Confidence
         # User requested 100% confidence always.
         confidence = 1.0
         
-        detailed_report = "\n".join(report_lines)
-        fit_message = f"{final_label} Beden Öneriyoruz."
-        
         # --- Specific Pant Recommendation (User Request) ---
         # Using new pant type detection for appropriate size format
         if category == "bottom":
             pant_type = self._detect_pant_type(product_data)
-            print(f"DEBUG: Detected Pant Type: {pant_type}")
+            logger.debug("Detected Pant Type: %s", pant_type)
             
             # Calculate base measurements - CLAMP to valid pant size range
             raw_w_inch = round(target_waist / 2.54) if target_waist > 0 else 32
             w_inch = max(28, min(40, raw_w_inch))  # Clamp to 28-40 (valid jean sizes)
-            print(f"DEBUG PANTS: target_waist={target_waist}cm, raw_w_inch={raw_w_inch}, w_inch={w_inch}")
+            logger.debug("PANTS: target_waist=%scm, raw_w_inch=%s, w_inch=%s", target_waist, raw_w_inch, w_inch)
             
             # --- SHORT: Şort/Etek - S/M/L format, leg length irrelevant ---
             if pant_type == "short":
-                report_lines.append(f"Kısa Giysi Tespit Edildi: Bacak boyu bu ürün için önemsiz.")
-                report_lines.append(f"Bel Hesabı: {target_waist:.1f}cm")
+                explanation.step("Kısa Giysi Tespit Edildi: Bacak boyu bu ürün için önemsiz.")
+                explanation.step("Bel Hesabı: {:.1f}cm", target_waist)
                 if u_hips > 0:
-                    report_lines.append(f"Kalça Hesabı: {u_hips:.1f}cm")
-                fit_message = f"{final_label} Beden Öneriyoruz"
-                detailed_report += f"\n\nÖzel Tavsiye: Şort/Etek için sadece bel{' ve kalça' if u_hips > 0 else ''} ölçünüze göre {final_label} beden önerilmektedir."
+                    explanation.step("Kalça Hesabı: {:.1f}cm", u_hips)
+                explanation.advise("Özel Tavsiye: Şort/Etek için sadece bel{} ölçünüze göre {} beden önerilmektedir.", " ve kalça" if u_hips > 0 else "", final_label)
             
             # --- CASUAL: Eşofman/Jogger - S/M/L format ---
             elif pant_type == "casual":
-                report_lines.append(f"Günlük/Rahat Giyim Tespit Edildi: S/M/L formatı kullanılıyor.")
-                report_lines.append(f"Bel Hesabı: {target_waist:.1f}cm")
-                fit_message = f"{final_label} Beden Öneriyoruz"
-                detailed_report += f"\n\nÖzel Tavsiye: Eşofman/jogger için {final_label} beden önerilmektedir."
+                explanation.step("Günlük/Rahat Giyim Tespit Edildi: S/M/L formatı kullanılıyor.")
+                explanation.step("Bel Hesabı: {:.1f}cm", target_waist)
+                explanation.advise("Özel Tavsiye: Eşofman/jogger için {} beden önerilmektedir.", final_label)
             
             # --- JEAN: Denim/Jeans - W/L format (W32/L32) ---
             elif pant_type == "jean":
                 # Get available sizes from product
-                available_sizes = product_data.get("available_sizes", [])
+                available_sizes = signals.available_sizes
                 
                 # Calculate Inseam (Leg Length)
                 if u_inseam > 0:
                     leg_len_cm = u_inseam
                     l_inch = round(leg_len_cm / 2.54)
-                    report_lines.append(f"İç Bacak: {u_inseam}cm verisi kullanıldı -> L{l_inch}")
+                    explanation.step("İç Bacak: {}cm verisi kullanıldı -> L{}", u_inseam, l_inch)
                 else:
                     # Heuristic: Inseam ~ Height * 0.45 
                     leg_len_cm = u_height * 0.45
                     l_inch = round(leg_len_cm / 2.54)
-                    report_lines.append(f"İç Bacak (Tahmini): Boy {u_height}cm * 0.45 -> L{l_inch}")
+                    explanation.step("İç Bacak (Tahmini): Boy {}cm * 0.45 -> L{}", u_height, l_inch)
                 
                 if u_hips > 0:
-                    report_lines.append(f"Kalça: {u_hips:.1f}cm kontrol edildi.")
+                    explanation.step("Kalça: {:.1f}cm kontrol edildi.", u_hips)
                 
                 # Use actual available sizes if we have them
                 if available_sizes:
@@ -1211,24 +1422,21 @@ class SizeRecommender:
                         waist_inch = target_waist / 2.54
                         best_size = min(numeric_sizes, key=lambda s: abs(s - waist_inch))
                         final_label = str(best_size)
-                        report_lines.append(f"Jean Hesabı: Bel {target_waist:.1f}cm -> {best_size} (mevcut bedenlerden seçildi)")
-                        fit_message = f"{best_size} Beden Öneriyoruz"
-                        detailed_report += f"\n\nÖzel Tavsiye: Mevcut bedenler: {numeric_sizes}. Bel ölçünüze en uygun beden: {best_size}"
+                        explanation.step("Jean Hesabı: Bel {:.1f}cm -> {} (mevcut bedenlerden seçildi)", target_waist, best_size)
+                        explanation.advise("Özel Tavsiye: Mevcut bedenler: {}. Bel ölçünüze en uygun beden: {}", numeric_sizes, best_size)
                     else:
-                        report_lines.append(f"Jean Hesabı: Bel {target_waist:.1f}cm -> W{w_inch}")
+                        explanation.step("Jean Hesabı: Bel {:.1f}cm -> W{}", target_waist, w_inch)
                         final_label = str(w_inch)
-                        fit_message = f"W{w_inch}/L{l_inch} Beden Öneriyoruz"
-                        detailed_report += f"\n\nÖzel Tavsiye: Jean bedeniniz W{w_inch}/L{l_inch} olarak hesaplanmıştır."
+                        explanation.advise("Özel Tavsiye: Jean bedeniniz W{}/L{} olarak hesaplanmıştır.", w_inch, l_inch)
                 else:
-                    report_lines.append(f"Jean Hesabı: Bel {target_waist:.1f}cm -> W{w_inch}, Bacak -> L{l_inch}")
+                    explanation.step("Jean Hesabı: Bel {:.1f}cm -> W{}, Bacak -> L{}", target_waist, w_inch, l_inch)
                     final_label = str(w_inch)
-                    fit_message = f"W{w_inch}/L{l_inch} Beden Öneriyoruz"
-                    detailed_report += f"\n\nÖzel Tavsiye: Jean bedeniniz W{w_inch}/L{l_inch} olarak hesaplanmıştır. (Bel: {w_inch} inch, Bacak: {l_inch} inch)"
+                    explanation.advise("Özel Tavsiye: Jean bedeniniz W{0}/L{1} olarak hesaplanmıştır. (Bel: {0} inch, Bacak: {1} inch)", w_inch, l_inch)
             
             # --- FORMAL: Numeric pants (30, 31, 32 or EU 46, 48, 50) ---
             elif pant_type == "formal":
                 # CRITICAL: Use available_sizes from product to recommend correct format
-                available_sizes = product_data.get("available_sizes", [])
+                available_sizes = signals.available_sizes
                 
                 # Extract and VALIDATE numeric sizes
                 valid_sizes = []
@@ -1239,7 +1447,7 @@ class SizeRecommender:
                         if 26 <= num <= 42 or 44 <= num <= 60:
                             valid_sizes.append(num)
                 
-                print(f"DEBUG FORMAL: available_sizes={available_sizes}, valid_sizes={valid_sizes}")
+                logger.debug("FORMAL: available_sizes=%s, valid_sizes=%s", available_sizes, valid_sizes)
                 
                 # Calculate waist in inches
                 waist_inch = target_waist / 2.54
@@ -1252,53 +1460,46 @@ class SizeRecommender:
                         # EU size format (44, 46, 48, 50)
                         ideal_eu = round((target_waist / 2) + 6)
                         best_size = min(valid_sizes, key=lambda s: abs(s - ideal_eu))
-                        report_lines.append(f"Pantolon (EU): Bel {target_waist:.1f}cm -> EU {ideal_eu}")
-                        report_lines.append(f"Mevcut bedenler: {sorted(valid_sizes)}")
-                        report_lines.append(f"En uygun beden: EU {best_size}")
+                        explanation.step("Pantolon (EU): Bel {:.1f}cm -> EU {}", target_waist, ideal_eu)
+                        explanation.step("Mevcut bedenler: {}", sorted(valid_sizes))
+                        explanation.step("En uygun beden: EU {}", best_size)
                     else:
                         # Inch-based sizes (28, 29, 30, 31, 32...)
                         best_size = min(valid_sizes, key=lambda s: abs(s - waist_inch))
-                        report_lines.append(f"Pantolon (Inch): Bel {target_waist:.1f}cm = {waist_inch:.1f} inch")
-                        report_lines.append(f"Mevcut bedenler: {sorted(valid_sizes)}")
-                        report_lines.append(f"En uygun beden: {best_size}")
+                        explanation.step("Pantolon (Inch): Bel {:.1f}cm = {:.1f} inch", target_waist, waist_inch)
+                        explanation.step("Mevcut bedenler: {}", sorted(valid_sizes))
+                        explanation.step("En uygun beden: {}", best_size)
                     
                     final_label = str(best_size)
-                    fit_message = f"{best_size} Beden Öneriyoruz"
-                    detailed_report += f"\n\nÖzel Tavsiye: Mevcut bedenler ({sorted(valid_sizes)}) içinden bel ölçünüze ({target_waist:.1f}cm) en uygun beden: {best_size}"
+                    explanation.advise("Özel Tavsiye: Mevcut bedenler ({}) içinden bel ölçünüze ({:.1f}cm) en uygun beden: {}", sorted(valid_sizes), target_waist, best_size)
                 else:
                     # FALLBACK: Calculate inch-based size (most common on Trendyol)
                     # Waist inch, clamped to valid range
                     ideal_inch = round(waist_inch)
                     ideal_inch = max(28, min(40, ideal_inch))  # Clamp to 28-40
                     
-                    report_lines.append(f"Pantolon Hesabı: Bel {target_waist:.1f}cm = {waist_inch:.1f} inch")
-                    report_lines.append(f"Önerilen beden: {ideal_inch} (tahmini)")
+                    explanation.step("Pantolon Hesabı: Bel {:.1f}cm = {:.1f} inch", target_waist, waist_inch)
+                    explanation.step("Önerilen beden: {} (tahmini)", ideal_inch)
                     final_label = str(ideal_inch)
-                    fit_message = f"{ideal_inch} Beden Öneriyoruz"
-                    detailed_report += f"\n\nÖzel Tavsiye: Bel ölçünüze ({target_waist:.1f}cm) göre {ideal_inch} beden önerilmektedir."
+                    explanation.advise("Özel Tavsiye: Bel ölçünüze ({:.1f}cm) göre {} beden önerilmektedir.", target_waist, ideal_inch)
                 
                 # Calculate leg length for reference
                 if u_inseam > 0:
-                    report_lines.append(f"İç Bacak: {u_inseam}cm")
+                    explanation.step("İç Bacak: {}cm", u_inseam)
                 else:
                     leg_len_cm = u_height * 0.45
-                    report_lines.append(f"İç Bacak (Tahmini): {leg_len_cm:.1f}cm")
+                    explanation.step("İç Bacak (Tahmini): {:.1f}cm", leg_len_cm)
                 
                 if u_hips > 0:
-                    report_lines.append(f"Kalça: {u_hips:.1f}cm kontrol edildi.")
+                    explanation.step("Kalça: {:.1f}cm kontrol edildi.", u_hips)
 
         
         if is_fallback:
-            report_lines.append("Not: Markaya özel tablo bulunamadığı için genel beden tablosu (Universal) kullanıldı.")
-            fit_message += " (Genel Beden)."
-            
-        if elasticity_bonus > 0:
-             fit_message += " (Esnek Kumaş)."
-        elif adjustment_msg:
-             fit_message += " (Kalıba Göre Ayarlandı)." # Short summary
+            explanation.step("Not: Markaya özel tablo bulunamadığı için genel beden tablosu (Universal) kullanıldı.")
 
-        print(f"DEBUG: Final Decision: {final_label} based on Index {final_idx}")
-        print(f"DEBUG: Report: {detailed_report}")
+        logger.debug("Final Decision: %s based on Index %s", final_label, final_idx)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Report: %s", explanation.render_report())
 
         # Calculate size compatibility percentages
         primary_metric = target_chest if category == "top" else target_waist
@@ -1306,11 +1507,18 @@ class SizeRecommender:
         
         # For pants with numeric sizes, use the actual available sizes
         if category == "bottom" and pant_type in ["jean", "formal"]:
-            available_sizes = product_data.get("available_sizes", [])
+            available_sizes = signals.available_sizes
             size_percentages = self._calculate_numeric_pant_percentages(target_waist, available_sizes, pant_type)
+        elif defer_scoring and size_chart and primary_metric > 0:
+            return _PendingScore(size_chart, metric_key, primary_metric, final_label, adjustment_msg, explanation)
         else:
             size_percentages = self._calculate_size_percentages(primary_metric, size_chart, metric_key)
-        
+
+        return self._finish_recommendation(final_label, size_percentages, adjustment_msg, explanation)
+
+    def _finish_recommendation(self, final_label: str, size_percentages: Dict[str, int],
+                               adjustment_msg: str, explanation: Explanation) -> Dict[str, Any]:
+        """Aligns the percentages with the chosen size and builds the result dict."""
         # If no percentages calculated, create default based on final label
         if not size_percentages:
             size_percentages = {final_label: 90}
@@ -1324,12 +1532,12 @@ class SizeRecommender:
         else:
             top_pct_label = None
             
-        print(f"DEBUG: Consistency Check -> Recommended: '{final_label}', TopMatch: '{top_pct_label}'")
-        print(f"DEBUG: Percentages Before: {size_percentages}")
+        logger.debug("Consistency Check -> Recommended: '%s', TopMatch: '%s'", final_label, top_pct_label)
+        logger.debug("Percentages Before: %s", size_percentages)
         
         # Compare stripped strings to be safe
         if top_pct_label and str(top_pct_label).strip().lower() != str(final_label).strip().lower():
-            print(f"DEBUG: Consistency Check Triggered. Re-aligning percentages to {final_label}...")
+            logger.debug("Consistency Check Triggered. Re-aligning percentages to %s...", final_label)
             
             # Create a synthetic distribution centered on final_label
             new_percentages = {}
@@ -1374,43 +1582,69 @@ class SizeRecommender:
                 new_percentages["?"] = 4
                 
             size_percentages = new_percentages
-            print(f"DEBUG: New Enforced Percentages: {size_percentages}")
-        
-        # Update fit message to include percentages
-        top_size = list(size_percentages.keys())[0] if size_percentages else final_label
-        top_pct = size_percentages.get(top_size, 100)
-        fit_message = f"{top_size} beden için %{top_pct} uyumlusunuz"
+            logger.debug("New Enforced Percentages: %s", size_percentages)
         
-        # Add secondary sizes to message if available
-        if len(size_percentages) > 1:
-            secondary_info = ", ".join([f"{s}: %{p}" for s, p in list(size_percentages.items())[1:]])
-            fit_message += f" ({secondary_info})"
-
-        # Generate fit preference suggestion (Tam/Bol)
+        # Fit preference suggestion (Tam/Bol); fit_message is rendered from the percentages on demand
+        top_size = list(size_percentages.keys())[0]
         size_order = ["XXS", "XS", "S", "M", "L", "XL", "XXL", "3XL"]
         try:
             current_idx = size_order.index(top_size.upper())
             if current_idx < len(size_order) - 1:
-                next_size = size_order[current_idx + 1]
-                fit_suggestion = f"\n\n💡 Giyim Tercihi: Tam oturan istiyorsanız {top_size}, daha rahat/bol istiyorsanız {next_size} bedenini tercih edebilirsiniz."
-                detailed_report += fit_suggestion
+                explanation.preference = (top_size, size_order[current_idx + 1])
         except (ValueError, IndexError):
             # For numeric sizes (jeans, formal pants), add numeric suggestion
             try:
                 numeric_size = int(top_size)
-                next_numeric = numeric_size + 1
-                fit_suggestion = f"\n\n💡 Giyim Tercihi: Tam oturan istiyorsanız {numeric_size}, daha rahat/bol istiyorsanız {next_numeric} bedenini tercih edebilirsiniz."
-                detailed_report += fit_suggestion
+                explanation.preference = (numeric_size, numeric_size + 1)
             except ValueError:
                 pass
 
-        print(f"DEBUG: Size Percentages: {size_percentages}")
+        logger.debug("Size Percentages: %s", size_percentages)
 
         return {
             "recommended_size": final_label,
             "size_percentages": size_percentages,  # NEW: Replaces confidence_score
-            "fit_message": fit_message,
-            "detailed_report": detailed_report,
-            "warning": adjustment_msg
+            "warning": adjustment_msg,
+            "explanation": explanation,
         }
 
+    def get_recommendations_batch(self, pairs: List[Tuple[str, Dict]],
+                                  fields: Optional[Tuple[str, ...]] = None) -> List[Dict[str, Any]]:
+        """
+        Recommends sizes for many (user_id, product_data) pairs.
+        Users are prefetched in bulk and brand/chart lookups are shared across pairs,
+        so each user, brand and chart is loaded once. Chart percentages are scored in
+        one vectorized call per chart and metric. Results keep input order.
+        """
+        keys = [self._memo_key(user_id, product_data) for user_id, product_data in pairs]
+        results: List[Any] = [self._memo.get(key) for key in keys]
+
+        # Memoized pairs need no data at all; only prefetch users with a cache miss
+        computed = [i for i, result in enumerate(results) if result is None]
+        self.prefetch_users([pairs[i][0] for i in computed])
+
+        groups: Dict[Tuple[int, str], List[int]] = {}
+        for i in computed:
+            user_id, product_data = pairs[i]
+            try:
+                result = self._compute_recommendation(user_id, product_data, defer_scoring=True)
+            except Exception as e:
+                logger.error("Batch recommendation error for %s: %s", user_id, e)
+                result = {"error": str(e)}
+            if isinstance(result, _PendingScore):
+                groups.setdefault((id(result.chart), result.metric), []).append(i)
+            results[i] = result
+
+        for indices in groups.values():
+            first = results[indices[0]]
+            scored = first.chart.matrix.bulk_size_percentages([results[i].value for i in indices], first.metric)
+            for i, size_percentages in zip(indices, scored):
+                pending = results[i]
+                results[i] = self._finish_recommendation(
+                    pending.final_label, size_percentages, pending.warning, pending.explanation)
+
+        for i in computed:
+            # Same rule as get_recommendation: only successful results are memoized
+            if "error" not in results[i]:
+                self._memo.set(keys[i], results[i])
+        return [render_recommendation(result, fields) for result in results]
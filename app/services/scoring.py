@@ -0,0 +1,158 @@
+from typing import Dict, List, Optional, Sequence, Any
+import numpy as np
+
+
+class ChartMatrix:
+    """
+    Size chart packed into a contiguous array for vectorized scoring.
+
+    `bounds` has shape (sizes, metrics, 2) where the last axis is (min, max).
+    Missing ranges are stored as NaN and never contribute to a score.
+    """
+
+    IN_RANGE_BONUS = 1.2  # 20% bonus for being inside the range (same as the scalar version)
+
+    def __init__(self, labels: Sequence[str], metrics: Sequence[str], bounds: np.ndarray):
+        self.labels = list(labels)
+        self.metrics = tuple(metrics)
+        self.metric_index = {m: i for i, m in enumerate(self.metrics)}
+        self.bounds = np.ascontiguousarray(bounds, dtype=np.float64)
+
+        mins = self.bounds[..., 0]
+        maxs = self.bounds[..., 1]
+        self.valid = ~(np.isnan(mins) | np.isnan(maxs))
+        self.centers = (mins + maxs) / 2
+        self.sigmas = (maxs - mins) / 4  # 2 sigma covers the range
+
+        # Percentages are keyed by label: a repeated label keeps its first position
+        # but takes the score of its last row (dict assignment semantics).
+        first_pos: Dict[str, int] = {}
+        last_row: Dict[str, int] = {}
+        for i, label in enumerate(self.labels):
+            first_pos.setdefault(label, i)
+            last_row[label] = i
+        self._unique_labels = sorted(first_pos, key=first_pos.get)
+        self._unique_rows = np.array([last_row[l] for l in self._unique_labels], dtype=np.intp)
+
+    @classmethod
+    def from_rows(cls, rows: List[Dict[str, Any]], metrics: Optional[Sequence[str]] = None) -> "ChartMatrix":
+        """Builds a matrix from size chart rows (`min_<metric>` / `max_<metric>` keys)."""
+        if metrics is None:
+            found = []
+            for row in rows:
+                for key in row:
+                    if key.startswith("min_") and key[4:] not in found:
+                        found.append(key[4:])
+            metrics = found
+
+        bounds = np.full((len(rows), len(metrics), 2), np.nan)
+        for i, row in enumerate(rows):
+            for j, metric in enumerate(metrics):
+                min_v = row.get(f"min_{metric}")
+                max_v = row.get(f"max_{metric}")
+                if min_v is not None and max_v is not None:
+                    bounds[i, j, 0] = min_v
+                    bounds[i, j, 1] = max_v
+
+        return cls([row.get("size_label", "") for row in rows], metrics, bounds)
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def gaussian_fit(self, values) -> np.ndarray:
+        """
+        Gaussian fit score (0-100) of user values against every size and metric.
+
+        `values` has shape (..., metrics); the result has shape (..., sizes, metrics).
+        Non-positive user values and missing ranges score 0, degenerate ranges score 50.
+        """
+        x = np.asarray(values, dtype=np.float64)[..., np.newaxis, :]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            z = (x - self.centers) / self.sigmas
+            scores = np.exp(-0.5 * z * z) * 100
+
+        scores = np.where(self.sigmas <= 0, 50.0, scores)
+        scores = np.where(self.valid & (x > 0), scores, 0.0)
+        return np.clip(scores, 0, 100)
+
+    def metric_scores(self, value: float, metric: str) -> np.ndarray:
+        """
+        Per-size score for a single metric with the in-range bonus applied.
+        Sizes without the metric are NaN.
+        """
+        j = self.metric_index.get(metric)
+        if j is None:
+            return np.full(len(self), np.nan)
+
+        column = np.zeros(len(self.metrics))
+        column[j] = value
+        scores = self.gaussian_fit(column)[:, j]
+
+        mins = self.bounds[:, j, 0]
+        maxs = self.bounds[:, j, 1]
+        in_range = (mins <= value) & (value <= maxs)
+        scores = np.where(in_range, np.minimum(100, scores * self.IN_RANGE_BONUS), scores)
+        return np.where(self.valid[:, j], scores, np.nan)
+
+    def size_percentages(self, value: float, metric: str, top_n: int = 3) -> Dict[str, int]:
+        """Top `top_n` sizes for one measurement as integer percentages summing to 100."""
+        if len(self) == 0 or value <= 0:
+            return {}
+        scores = self.metric_scores(value, metric)[self._unique_rows]
+        keep = ~np.isnan(scores)
+        labels = [l for l, k in zip(self._unique_labels, keep) if k]
+        return normalize_percentages(labels, scores[keep], top_n)
+
+    def bulk_size_percentages(self, values, metric: str, top_n: int = 3) -> List[Dict[str, int]]:
+        """`size_percentages` for many users' values of the same metric in one pass."""
+        values = np.asarray(values, dtype=np.float64)
+        j = self.metric_index.get(metric)
+        if j is None or len(self) == 0:
+            return [{} for _ in values]
+
+        columns = np.zeros((len(values), len(self.metrics)))
+        columns[:, j] = values
+        scores = self.gaussian_fit(columns)[:, :, j]
+
+        mins = self.bounds[:, j, 0]
+        maxs = self.bounds[:, j, 1]
+        in_range = (mins <= values[:, np.newaxis]) & (values[:, np.newaxis] <= maxs)
+        scores = np.where(in_range, np.minimum(100, scores * self.IN_RANGE_BONUS), scores)
+        scores = scores[:, self._unique_rows]
+
+        keep = self.valid[self._unique_rows, j]
+        labels = [l for l, k in zip(self._unique_labels, keep) if k]
+        results = []
+        for value, row in zip(values, scores[:, keep]):
+            results.append(normalize_percentages(labels, row, top_n) if value > 0 else {})
+        return results
+
+
+def normalize_percentages(labels: Sequence[str], scores, top_n: int = 3) -> Dict[str, int]:
+    """
+    Keeps the `top_n` best scores and normalizes them to integer percentages summing to 100.
+    Ties keep input order; every kept size gets at least 1%.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    if scores.size == 0:
+        return {}
+
+    order = np.argsort(-scores, kind="stable")[:top_n]
+    top = scores[order]
+    total = top.sum()
+    if total == 0:
+        return {}
+
+    pcts = np.maximum(1, np.round(top / total * 100)).astype(int)
+    diff = 100 - int(pcts.sum())
+    if diff:
+        pcts[0] = max(1, pcts[0] + diff)
+
+    return {labels[i]: int(p) for i, p in zip(order, pcts)}
+
+
+def numeric_size_scores(sizes: Sequence[int], ideal: float, spread: float) -> np.ndarray:
+    """Linear falloff score (0-100) of numeric sizes around an ideal size."""
+    sizes = np.asarray(sizes, dtype=np.float64)
+    return np.maximum(0, 100 - np.abs(ideal - sizes) * spread)
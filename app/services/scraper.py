@@ -1,14 +1,112 @@
 import re
 import json
 import asyncio
+import logging
 import random
+from contextlib import asynccontextmanager
 from typing import Dict, Optional
-from playwright.async_api import async_playwright
-from bs4 import BeautifulSoup
+from app.core.cache import SharedCache
+from app.core.logging import sample_debug_trace
+
+logger = logging.getLogger(__name__)
 
 class ProductScraper:
     # Concurrency Control: Limit to 1 concurrent browser to prevent OOM
     _semaphore = asyncio.Semaphore(1)
+    # Scraped products keyed by requested URL (shared across instances)
+    _cache = SharedCache("scraped_products", maxsize=512, ttl=30 * 60)
+
+    # STEALTH: Advanced Browser Launch Configuration
+    LAUNCH_ARGS = [
+        "--disable-blink-features=AutomationControlled",
+        "--no-sandbox",
+        "--disable-setuid-sandbox",
+        "--disable-dev-shm-usage", # CRITICAL for Docker integration
+        "--disable-infobars",
+        "--window-position=-2400,-2400", # Hide window off-screen
+        "--ignore-certificate-errors",
+        "--ignore-ssl-errors",
+        "--disable-accelerated-2d-canvas",
+        "--disable-gpu",
+    ]
+
+    # STEALTH: Real User-Agent and Viewport
+    CONTEXT_OPTIONS = {
+        # Modern User-Agent (P&B Sensitive)
+        "user_agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+        "locale": "tr-TR;q=0.9,en-US;q=0.8,en;q=0.7", # Localized
+        "viewport": {"width": 1920, "height": 1080},
+        "device_scale_factor": 1,
+        "has_touch": False,
+        "is_mobile": False,
+        "bypass_csp": True,
+    }
+
+    def __init__(self, persistent: bool = False):
+        # Persistent scrapers (the app-scoped one) keep one browser alive between scrapes;
+        # otherwise every scrape launches and closes its own browser.
+        self.persistent = persistent
+        self._playwright = None
+        self._browser = None
+        self._browser_lock = asyncio.Lock()
+
+    async def start(self) -> None:
+        """Launches the shared browser up front (persistent scrapers only)."""
+        if self.persistent:
+            await self._get_browser()
+
+    async def close(self) -> None:
+        async with self._browser_lock:
+            try:
+                if self._browser:
+                    await self._browser.close()
+                if self._playwright:
+                    await self._playwright.stop()
+            except Exception as e:
+                logger.error("Error closing browser: %s", e)
+            self._browser = None
+            self._playwright = None
+
+    @property
+    def browser_connected(self) -> bool:
+        return self._browser is not None and self._browser.is_connected()
+
+    async def _get_browser(self):
+        async with self._browser_lock:
+            # Relaunch if the browser crashed or was never started
+            if self._browser is None or not self._browser.is_connected():
+                if self._playwright is None:
+                    # Imported on first launch so instances that never scrape don't pay for Playwright
+                    from playwright.async_api import async_playwright
+                    self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(
+                    headless=True, # Must be True for Render/Production
+                    args=self.LAUNCH_ARGS,
+                )
+            return self._browser
+
+    @asynccontextmanager
+    async def _new_context(self):
+        """A fresh browser context per scrape (cookies/storage are never shared between scrapes)."""
+        if self.persistent:
+            browser = await self._get_browser()
+            context = await browser.new_context(**self.CONTEXT_OPTIONS)
+            try:
+                yield context
+            finally:
+                try:
+                    await context.close()
+                except Exception:
+                    pass
+        else:
+            from playwright.async_api import async_playwright
+            async with async_playwright() as p:
+                browser = await p.chromium.launch(headless=True, args=self.LAUNCH_ARGS)
+                try:
+                    yield await browser.new_context(**self.CONTEXT_OPTIONS)
+                finally:
+                    await browser.close()
+
     @staticmethod
     def _detect_brand(url: str) -> str:
         try:
@@ -54,10 +152,26 @@ class ProductScraper:
             with urllib.request.urlopen(req, timeout=10) as response:
                 return response.geturl()
         except Exception as e:
-            print(f"Short link resolution failed for {url}: {e}")
+            logger.warning("Short link resolution failed for %s: %s", url, e)
             return url
 
+    def get_cached(self, url: str) -> Optional[Dict[str, str]]:
+        """Returns a previously scraped product for this URL, if still fresh."""
+        cached = self._cache.get(url)
+        return dict(cached) if cached is not None else None
+
     async def scrape_product(self, url: str) -> Dict[str, str]:
+        cached = self.get_cached(url)
+        if cached is not None:
+            return cached
+
+        data = await self._scrape_product_limited(url)
+        # Only cache clean results so blocked/failed pages are retried next time
+        if not data.get("error"):
+            self._cache.set(url, dict(data))
+        return data
+
+    async def _scrape_product_limited(self, url: str) -> Dict[str, str]:
         # Wrapper to enforce concurrency limit
         async with self._semaphore:
             # Pre-resolve short links (ty.gl, tyml.gl)
@@ -73,40 +187,11 @@ class ProductScraper:
 
     async def _scrape_product_impl(self, url: str) -> Dict[str, str]:
         brand = self._detect_brand(url)
-        print(f"--- Scraping URL: {url} (Brand: {brand}) ---")
+        sample_debug_trace()
+        logger.info("--- Scraping URL: %s (Brand: %s) ---", url, brand)
         
-        browser = None
         try:
-            async with async_playwright() as p:
-                # STEALTH: Advanced Browser Launch Configuration
-                browser = await p.chromium.launch(
-                    headless=True, # Must be True for Render/Production
-                    args=[
-                        "--disable-blink-features=AutomationControlled",
-                        "--no-sandbox",
-                        "--disable-setuid-sandbox",
-                        "--disable-dev-shm-usage", # CRITICAL for Docker integration
-                        "--disable-infobars",
-                        "--window-position=-2400,-2400", # Hide window off-screen
-                        "--ignore-certificate-errors",
-                        "--ignore-ssl-errors",
-                        "--disable-accelerated-2d-canvas",
-                        "--disable-gpu",
-                    ]
-                )
-                
-                # STEALTH: Real User-Agent and Viewport
-                context = await browser.new_context(
-                    # Modern User-Agent (P&B Sensitive)
-                    user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                    locale="tr-TR;q=0.9,en-US;q=0.8,en;q=0.7", # Localized
-                    viewport={"width": 1920, "height": 1080},
-                    device_scale_factor=1,
-                    has_touch=False,
-                    is_mobile=False,
-                    bypass_csp=True
-                )
-                
+            async with self._new_context() as context:
                 # STEALTH: Manual Injection of Evasion Scripts (Replacing playwright-stealth)
                 await context.add_init_script("""
                     // Override navigator.webdriver
@@ -183,7 +268,7 @@ class ProductScraper:
                     # CAPTURE FINAL URL (Crucial for short links like ty.gl)
                     data["product_url"] = page.url 
                 except Exception as e:
-                    print(f"Navigation Timeout/Error: {e}")
+                    logger.warning("Navigation Timeout/Error: %s", e)
                     # Try to capture URL even if timeout occurred (might have redirected)
                     try: 
                         if page.url != "about:blank":
@@ -202,7 +287,7 @@ class ProductScraper:
                 
                 # ANTI-BOT DETECTION
                 if "Access Denied" in content or "Access to this page has been denied" in content:
-                    print("Anti-Bot Detected: Access Denied")
+                    logger.warning("Anti-Bot Detected: Access Denied")
                     # Fallback: Try to glean info from URL if blocked
                     # Use resolved URL if available
                     final_url = data.get("product_url", url)
@@ -224,14 +309,15 @@ class ProductScraper:
                 try:
                     await page.wait_for_selector("h1", timeout=5000)
                 except:
-                    print("Timeout waiting for h1, proceeding with DOM content.")
+                    logger.debug("Timeout waiting for h1, proceeding with DOM content.")
 
+                from bs4 import BeautifulSoup
                 soup = BeautifulSoup(content, 'html.parser')
-                print(f"Page Title: {soup.title.string if soup.title else 'No Title'}")
+                logger.debug("Page Title: %s", soup.title.string if soup.title else 'No Title')
 
                 # 1. JSON-LD
                 json_ld_tags = soup.find_all("script", type="application/ld+json")
-                print(f"Found {len(json_ld_tags)} JSON-LD tags")
+                logger.debug("Found %s JSON-LD tags", len(json_ld_tags))
                 for tag in json_ld_tags:
                     try:
                         structured_data = json.loads(tag.string)
@@ -243,7 +329,7 @@ class ProductScraper:
                     except json.JSONDecodeError:
                         continue
                 
-                print(f"After JSON-LD: {data}")
+                logger.debug("After JSON-LD: %s", data)
 
                 # 2. Meta Tags Fallback
                 self._extract_meta(soup, data)
@@ -266,7 +352,7 @@ class ProductScraper:
                 # 6. Extract Model Info
                 self._extract_model_info(soup, data)
                 
-                print(f"Final Data: {data}")
+                logger.debug("Final Data: %s", data)
                 
                 # SANITIZATION: Ensure no field is a list/dict, enabling safe JSON consumption
                 for k, v in data.items():
@@ -320,7 +406,7 @@ class ProductScraper:
                 return data
 
         except Exception as e:
-            print(f"Error scraping {url}: {e}")
+            logger.error("Error scraping %s: %s", url, e)
             
             # Fallback: Extract from URL
             try:
@@ -346,9 +432,6 @@ class ProductScraper:
                 "description": "", 
                 "price": ""
             }
-        finally:
-            if browser:
-                await browser.close()
 
     def _extract_image_url(self, img_entry, data):
         if isinstance(img_entry, str):
@@ -442,7 +525,7 @@ class ProductScraper:
                 break
         
         if extracted_brand:
-            print(f"DEBUG: Overriding Brand '{data['brand']}' -> '{extracted_brand}'")
+            logger.debug("Overriding Brand '%s' -> '%s'", data['brand'], extracted_brand)
             data["brand"] = extracted_brand
 
         if not data["product_name"]:
@@ -502,7 +585,7 @@ class ProductScraper:
                     if size_text and len(size_text) <= 10:  # Reasonable size label length
                         size_options.append(size_text.upper().strip())
                 if size_options:
-                    print(f"DEBUG: Found sizes via CSS selector '{sel}': {size_options}")
+                    logger.debug("Found sizes via CSS selector '%s': %s", sel, size_options)
                     break
         
         # Fallback: Search for size-related JSON in scripts
@@ -528,14 +611,14 @@ class ProductScraper:
                                     valid_sizes.append(m)
                             if valid_sizes:
                                 size_options = list(set(valid_sizes))
-                                print(f"DEBUG: Found sizes via script JSON: {size_options}")
+                                logger.debug("Found sizes via script JSON: %s", size_options)
                                 break
         
         if size_options:
             # Remove duplicates while preserving order
             size_options = list(dict.fromkeys(size_options))
             data["available_sizes"] = size_options
-            print(f"DEBUG: Extracted Trendyol sizes: {size_options}")
+            logger.debug("Extracted Trendyol sizes: %s", size_options)
 
     def _scrape_pullandbear_specific(self, soup, data):
         # Pull & Bear Specific Selectors
@@ -566,7 +649,7 @@ class ProductScraper:
                              data["image_url"] = src
                              break
         except Exception as e:
-            print(f"Error in P&B specific scraper: {e}")
+            logger.error("Error in P&B specific scraper: %s", e)
             # Do not crash the whole scraping flow
             pass
 
@@ -681,7 +764,7 @@ class ProductScraper:
         
         if best_img:
             data["image_url"] = best_img
-            print(f"Fallback Image Found (Score {max_score}): {best_img}")
+            logger.debug("Fallback Image Found (Score %s): %s", max_score, best_img)
 
     def _extract_fabric_composition(self, soup, data):
         """
@@ -796,4 +879,4 @@ class ProductScraper:
         if size_match:
              data["model_size"] = size_match.group(1)
 
-        print(f"Model Info Extraction: Height={data.get('model_height')}, Size={data.get('model_size')}")
+        logger.debug("Model Info Extraction: Height=%s, Size=%s", data.get('model_height'), data.get('model_size'))
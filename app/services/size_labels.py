@@ -0,0 +1,155 @@
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterable, List, Optional
+
+# Canonical size ordinals shared by every chart (same scale the recommender's index logic uses).
+LETTER_ORDINALS = {
+    "XXS": 0, "XS": 1, "S": 2, "M": 3, "L": 4, "XL": 5,
+    "XXL": 6, "2XL": 6, "XXXL": 7, "3XL": 7, "XXXXL": 8, "4XL": 8,
+}
+
+# EU letter-equivalents (Zara/H&M women's tops & bottoms: 34=XS, 36=S, 38=M, 40-42=L, 44=XL, 46=XXL)
+EU_ORDINALS = {32: 0, 34: 1, 36: 2, 38: 3, 40: 4, 42: 4, 44: 5, 46: 6, 48: 7, 50: 8}
+
+# Without chart context, bare numbers in this range are read as waist inches (28, 30, 32 ...),
+# larger ones as EU sizes. Within a chart the choice is made once for all labels (chart_scale).
+MIN_INCH_SIZE, MAX_INCH_SIZE = 26, 33
+# Smallest adult EU size; a chart with a bare number below it is an inch chart
+MIN_EU_SIZE = 32
+
+INCH, EU = "inch", "eu"
+
+_LETTER_RE = re.compile(r"\b(XXXXL|XXXL|XXL|XXS|XL|XS|[2-4]XL|S|M|L)\b")
+_WL_RE = re.compile(r"\bW\s*(\d{2})(?:\s*[/ ]\s*L\s*(\d{2}))?\b")
+_PAIR_RE = re.compile(r"\b(\d{2})\s*/\s*(\d{2})\b")
+_INCH_RE = re.compile(r"\bUS\s*(\d{2})\b|\b(\d{2})(?:\s*-\s*\d{2})?\s*(?:\"|''|INCH\b)")
+_EU_RE = re.compile(r"\b(?:EU\s*)?(\d{2})(?:\s*-\s*(\d{2}))?\b")
+_NUMBER_RE = re.compile(r"\b\d{2}\b")
+
+
+@dataclass(frozen=True, slots=True)
+class SizeLabel:
+    """A size label broken into its parts. Missing parts are None; `ordinal` is -1 if unknown."""
+    raw: str
+    letter: Optional[str]
+    eu: Optional[int]
+    waist_inch: Optional[int]
+    length_inch: Optional[int]
+    ordinal: int
+
+    @property
+    def key(self) -> str:
+        """Canonical key: the letter size if there is one, else the raw label (upper-cased)."""
+        return self.letter or self.raw.strip().upper()
+
+
+def _normalize(label: str) -> str:
+    return (label or "").upper().replace("”", '"').replace("″", '"').strip()
+
+
+def _inch_ordinal(inch: int) -> int:
+    # 28" = XS, 29-30" = S, 31-32" = M, 33-34" = L, 35-36" = XL, 37-38" = XXL ...
+    return max(0, min(8, (inch - 25) // 2))
+
+
+def _is_eu_pair(first: int, second: int) -> bool:
+    # "38/40" is two adjacent EU sizes; W/L pairs ("32/34", "34/32") rarely step by exactly 2 from an even waist
+    return first % 2 == 0 and second == first + 2 and first >= MIN_EU_SIZE
+
+
+def chart_scale(labels: Iterable[str]) -> Optional[str]:
+    """
+    Whether the bare numbers of a chart ("28", "34", "38/40") are waist inches (INCH) or
+    EU sizes (EU), decided once from all of its labels: EU sizes are even and start at 32,
+    so any smaller or odd number, or a slash pair that is not two adjacent EU sizes, makes
+    it an inch chart. Labels that say what they are ("W34", "EU 38", '32"', "M") are not
+    considered. None if the chart has no bare numbers.
+    """
+    numbers: List[int] = []
+    inch = False
+    for label in labels:
+        text = _normalize(label)
+        if _LETTER_RE.search(text) or _WL_RE.search(text) or _INCH_RE.search(text) or "EU" in text:
+            continue
+        pair = _PAIR_RE.search(text)
+        if pair:
+            first, second = int(pair.group(1)), int(pair.group(2))
+            inch = inch or not _is_eu_pair(first, second)
+            numbers.append(first)
+        else:
+            # Kids' age/month ranges ("12-18 Ay") are not on either scale
+            numbers.extend(n for n in map(int, _NUMBER_RE.findall(text)) if n >= MIN_INCH_SIZE)
+    if not numbers:
+        return None
+    if inch or min(numbers) < MIN_EU_SIZE or any(n % 2 for n in numbers):
+        return INCH
+    return EU
+
+
+@lru_cache(maxsize=4096)
+def parse_size_label(label: str, scale: Optional[str] = None) -> SizeLabel:
+    """
+    Parses letter ("M", "2XL"), EU ("EU 38", "40-42", "38/40"), inch ('32"', "US 30"), W/L
+    ("W32/L34", "32/34") and compound labels ("S (36)", "L (40-42)", 'EU 48 (32")').
+    `scale` (INCH or EU, see chart_scale) says how bare numbers of the label's chart are read;
+    without it, 26-33 are inches and larger numbers EU sizes.
+    The ordinal prefers the letter, then the waist inch, then the EU size.
+    """
+    text = _normalize(label)
+
+    letter = None
+    match = _LETTER_RE.search(text)
+    if match:
+        letter = match.group(1)
+        letter = {"2XL": "XXL", "3XL": "XXXL", "4XL": "XXXXL"}.get(letter, letter)
+
+    waist_inch = length_inch = None
+    remaining = text
+    match = _WL_RE.search(text)
+    if match:
+        waist_inch = int(match.group(1))
+        length_inch = int(match.group(2)) if match.group(2) else None
+        remaining = _WL_RE.sub(" ", remaining)
+    else:
+        match = _PAIR_RE.search(text)
+        if match:
+            first, second = int(match.group(1)), int(match.group(2))
+            if scale == INCH or (scale is None and not (_is_eu_pair(first, second) and first > MAX_INCH_SIZE)):
+                waist_inch, length_inch = first, second
+                remaining = _PAIR_RE.sub(" ", remaining)
+            # otherwise an EU pair: the first size is read below
+        if waist_inch is None:
+            match = _INCH_RE.search(text)
+            if match:
+                waist_inch = int(match.group(1) or match.group(2))
+
+    eu = None
+    # Numbers already consumed as inches are not EU sizes
+    remaining = _INCH_RE.sub(" ", remaining)
+    match = _EU_RE.search(remaining)
+    if match:
+        number = int(match.group(1))
+        bare_inch = scale == INCH or (scale is None and number <= MAX_INCH_SIZE)
+        if number < MIN_INCH_SIZE:
+            pass  # kids' age/month ranges ("12-18 Ay") are not on this scale
+        elif waist_inch is None and not letter and "EU" not in remaining and bare_inch:
+            waist_inch = number
+        else:
+            eu = number
+
+    if letter:
+        ordinal = LETTER_ORDINALS[letter]
+    elif waist_inch is not None:
+        ordinal = _inch_ordinal(waist_inch)
+    elif eu is not None:
+        ordinal = EU_ORDINALS.get(eu, -1)
+    else:
+        ordinal = -1
+
+    return SizeLabel(label or "", letter, eu, waist_inch, length_inch, ordinal)
+
+
+def size_ordinal(label: str, scale: Optional[str] = None) -> int:
+    """Canonical ordinal of a size label (-1 if it cannot be parsed); `scale` as in parse_size_label."""
+    return parse_size_label(label, scale).ordinal
@@ -0,0 +1,429 @@
+import argparse
+import ast
+import contextlib
+import copy
+import os
+import random
+import statistics
+import sys
+import time
+
+# Usage: python scripts/benchmark_recommender.py [--users 300] [--seed 42] [--source standard ...]
+#
+# Offline benchmark + accuracy harness for SizeRecommender. No database or network is used:
+# a small in-memory stand-in for the Supabase client serves synthetic users and size charts.
+# Synthetic users are sampled inside a known size of a known chart, so every recommendation
+# can be compared against an expected size.
+# Before the benchmark, the size label parser is checked against LABEL_CASES / CHART_ORDER_CASES
+# (exit status 1 if any case fails).
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.data import zara_sizes  # noqa: E402
+from app.services.recommendation import SizeRecommender  # noqa: E402
+from app.models.sizing import SizeChart  # noqa: E402
+from app.services.size_labels import EU, INCH, chart_scale, parse_size_label  # noqa: E402
+
+GENDERS = ("male", "female")
+CATEGORIES = ("top", "bottom")
+BODY_SHAPES = (None, "regular", "rectangle", "triangle", "inverted_triangle", "apple", "hourglass")
+
+# One representative product per category. The bottom is a jogger so the chart label
+# (not the numeric pant logic) is what gets recommended.
+PRODUCTS = {
+    "top": {"product_name": "Basic T-Shirt", "description": "Regular fit pamuklu tişört",
+            "fabric_composition": "100% Pamuk", "available_sizes": []},
+    "bottom": {"product_name": "Jogger Eşofman Altı", "description": "Rahat kesim",
+               "fabric_composition": "100% Pamuk", "available_sizes": []},
+}
+
+
+# --- In-memory Supabase stand-in ---------------------------------------------------------
+
+class _Response:
+    def __init__(self, data):
+        self.data = data
+
+
+class _Query:
+    def __init__(self, db, table):
+        self.db = db
+        self.table = table
+        self.filters = []
+        self.order_by = None
+        self.max_rows = None
+        self.op = "select"
+        self.payload = None
+        self.on_conflict = None
+
+    def select(self, *args, **kwargs):
+        return self
+
+    def eq(self, key, value):
+        self.filters.append(lambda row: row.get(key) == value)
+        return self
+
+    def in_(self, key, values):
+        values = set(values)
+        self.filters.append(lambda row: row.get(key) in values)
+        return self
+
+    def ilike(self, key, pattern):
+        needle = pattern.strip("%").lower()
+        self.filters.append(lambda row: needle in str(row.get(key, "")).lower())
+        return self
+
+    def order(self, key, desc=False):
+        self.order_by = (key, desc)
+        return self
+
+    def limit(self, n):
+        self.max_rows = n
+        return self
+
+    def upsert(self, payload, on_conflict=None):
+        self.op, self.payload, self.on_conflict = "upsert", payload, on_conflict
+        return self
+
+    def insert(self, payload):
+        self.op, self.payload = "insert", payload
+        return self
+
+    def delete(self):
+        self.op = "delete"
+        return self
+
+    def execute(self):
+        rows = self.db.tables.setdefault(self.table, [])
+        if self.op in ("insert", "upsert"):
+            payload = self.payload if isinstance(self.payload, list) else [self.payload]
+            keys = (self.on_conflict or "").split(",") if self.op == "upsert" else []
+            for item in payload:
+                existing = [r for r in rows if keys and all(r.get(k) == item.get(k) for k in keys)]
+                if existing:
+                    existing[0].update(item)
+                else:
+                    rows.append(dict(item))
+            return _Response(payload)
+
+        selected = [r for r in rows if all(f(r) for f in self.filters)]
+        if self.op == "delete":
+            self.db.tables[self.table] = [r for r in rows if r not in selected]
+            return _Response(selected)
+        if self.order_by:
+            key, desc = self.order_by
+            selected.sort(key=lambda r: str(r.get(key) or ""), reverse=desc)
+        if self.max_rows is not None:
+            selected = selected[:self.max_rows]
+        return _Response(copy.deepcopy(selected))
+
+
+class StubSupabase:
+    def __init__(self, tables):
+        self.tables = tables
+
+    def table(self, name):
+        return _Query(self, name)
+
+
+# --- Chart sources -----------------------------------------------------------------------
+
+def _seed_rows(path):
+    """
+    Reads the `data` payload and brand name out of a seed script without running it
+    (the scripts connect to Supabase at import time) and converts items the same way they do.
+    """
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+
+    brand, items = None, []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) \
+                and node.func.id == "get_or_create_brand" and node.args \
+                and isinstance(node.args[0], ast.Constant):
+            brand = node.args[0].value
+        elif isinstance(node, ast.Assign) and any(isinstance(t, ast.Name) and t.id == "data" for t in node.targets):
+            if isinstance(node.value, ast.List):
+                items.extend(ast.literal_eval(node.value))
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) \
+                and node.func.attr == "append" and isinstance(node.func.value, ast.Name) \
+                and node.func.value.id == "data":
+            items.append(ast.literal_eval(node.args[0]))
+
+    rows = []
+    for item in items:
+        row = {"category": item["cat"], "size_label": item["label"], "gender": item["gender"]}
+        for key in ("min_chest", "max_chest", "min_waist", "max_waist", "min_hips", "max_hips"):
+            if item.get(key) is not None:
+                row[key] = item[key]
+        if item["cat"] == "top" and item.get("min_chest"):
+            row["min_shoulder"] = round(item["min_chest"] / 0.85, 2)
+            row["max_shoulder"] = round(item["max_chest"] / 0.85, 2)
+        rows.append(row)
+    return brand, rows
+
+
+def _tag(rows, gender, category):
+    return [dict(row, gender=gender, category=category) for row in rows]
+
+
+def load_sources():
+    """
+    source name -> (brand name used in products, rows stored in size_catalogs, {(gender, category): expected chart}).
+    An empty row list means the brand is unknown and the recommender falls back to its built-in charts.
+    """
+    sources = {}
+
+    standard = {}
+    for gender in GENDERS:
+        for category in CATEGORIES:
+            chart = SizeRecommender.MALE_SIZE_CHART if gender == "male" else SizeRecommender.FEMALE_SIZE_CHART
+            standard[(gender, category)] = [r for r in chart if r["category"] == category]
+    sources["standard"] = ("Koton", [], standard)
+
+    static_rows = (
+        _tag(zara_sizes.ZARA_MEN_TOPS, "male", "top") + _tag(zara_sizes.ZARA_MEN_BOTTOMS, "male", "bottom")
+        + _tag(zara_sizes.ZARA_WOMEN_TOPS, "female", "top") + _tag(zara_sizes.ZARA_WOMEN_BOTTOMS, "female", "bottom")
+    )
+    sources["zara_static"] = ("Zara", static_rows, None)
+
+    scripts_dir = os.path.join(ROOT, "scripts")
+    for name in sorted(os.listdir(scripts_dir)):
+        if name.startswith("seed_") and name.endswith(".py"):
+            brand, rows = _seed_rows(os.path.join(scripts_dir, name))
+            if brand and rows:
+                sources[name[:-3]] = (brand, rows, None)
+
+    # Expected charts for DB-backed sources are the rows of the user's own gender
+    for name, (brand, rows, expected) in list(sources.items()):
+        if expected is None:
+            expected = {(g, c): [r for r in rows if r["gender"] == g and r["category"] == c]
+                        for g in GENDERS for c in CATEGORIES}
+            sources[name] = (brand, rows, expected)
+    return sources
+
+
+# --- Synthetic population ----------------------------------------------------------------
+
+def _sample_in(rnd, row, metric):
+    lo, hi = row.get(f"min_{metric}"), row.get(f"max_{metric}")
+    if lo is None or hi is None:
+        return None
+    # Open-ended catch-all ranges (0-81, 105-200) are clamped to a realistic band
+    if lo <= 0:
+        lo = hi - 6
+    if hi >= 150:
+        hi = lo + 6
+    # Stay in the inner 60% so the expected size is unambiguous
+    pad = (hi - lo) * 0.2
+    return round(rnd.uniform(lo + pad, hi - pad), 1)
+
+
+def make_population(rnd, n, expected_charts, references_brand):
+    """Returns (user rows, reference rows, cases) where a case is (user_id, gender, category, expected index)."""
+    users, references, cases = [], [], []
+    for i in range(n):
+        gender = rnd.choice(GENDERS)
+        category = rnd.choice(CATEGORIES)
+        chart = expected_charts.get((gender, category)) or []
+        if not chart:
+            continue
+        idx = rnd.randrange(len(chart))
+        row = chart[idx]
+
+        chest = _sample_in(rnd, row, "chest")
+        waist = _sample_in(rnd, row, "waist")
+        hips = _sample_in(rnd, row, "hips") or _sample_in(rnd, row, "hip")
+
+        # Height/weight loosely follow the size so weight-based guards stay plausible
+        base_h, base_w = (172, 68) if gender == "male" else (160, 54)
+        step = idx / max(1, len(chart) - 1)
+        height = round(rnd.gauss(base_h + 8 * step, 5))
+        weight = round(rnd.gauss(base_w + 30 * step, 4))
+
+        user_id = f"bench-{i}"
+        users.append({
+            "user_id": user_id,
+            "gender": gender,
+            "height": height,
+            "weight": weight,
+            "chest": chest or 0,
+            "waist": waist or 0,
+            "hips": hips or 0,
+            "body_shape": rnd.choice(BODY_SHAPES),
+            "updated_at": "2024-01-01T00:00:00+00:00",
+        })
+        if references_brand and rnd.random() < 0.2:
+            references.append({"user_id": user_id, "brand": references_brand, "size_label": row["size_label"]})
+        cases.append((user_id, gender, category, idx))
+    return users, references, cases
+
+
+# --- Size label parser cases -------------------------------------------------------------
+
+# (label, chart scale, expected (letter, eu, waist_inch, length_inch, ordinal))
+LABEL_CASES = [
+    ("M", None, ("M", None, None, None, 3)),
+    ("2XL", None, ("XXL", None, None, None, 6)),
+    ("S (36)", None, ("S", 36, None, None, 2)),
+    ("L (40-42)", None, ("L", 40, None, None, 4)),
+    ("EU 38", None, (None, 38, None, None, 3)),
+    ('EU 48 (32")', None, (None, 48, 32, None, 3)),
+    ("US 30", None, (None, None, 30, None, 2)),
+    ("W32/L34", None, (None, None, 32, 34, 3)),
+    ("W34", None, (None, None, 34, None, 4)),
+    ("32/34", None, (None, None, 32, 34, 3)),
+    ("34/32", None, (None, None, 34, 32, 4)),
+    ("12-18 Ay", None, (None, None, None, None, -1)),
+    # Without chart context bare numbers from 34 up are EU sizes ...
+    ("34", None, (None, 34, None, None, 1)),
+    ("38/40", None, (None, 38, None, None, 3)),
+    # ... in an inch chart they are waist inches, in line with "W34"
+    ("34", INCH, (None, None, 34, None, 4)),
+    ("38", INCH, (None, None, 38, None, 6)),
+    ("36/34", INCH, (None, None, 36, 34, 5)),
+    # ... and in an EU chart "32" and "34/36" are EU sizes
+    ("32", EU, (None, 32, None, None, 0)),
+    ("34/36", EU, (None, 34, None, None, 1)),
+]
+
+# (labels, expected chart scale, expected order after SizeChart sorting)
+CHART_ORDER_CASES = [
+    (["38", "28", "36", "30", "34", "32"], INCH, ["28", "30", "32", "34", "36", "38"]),
+    (["33", "29", "31", "35"], INCH, ["29", "31", "33", "35"]),
+    (["30/32", "36/34", "32/32", "34/32"], INCH, ["30/32", "32/32", "34/32", "36/34"]),
+    (["44", "34", "38", "36", "40", "46"], EU, ["34", "36", "38", "40", "44", "46"]),
+    (["38/40", "34/36", "42/44"], EU, ["34/36", "38/40", "42/44"]),
+    (["XL", "S", "M", "L"], None, ["S", "M", "L", "XL"]),
+]
+
+
+def check_label_parsing():
+    """Failures of LABEL_CASES / CHART_ORDER_CASES, as printable lines."""
+    failures = []
+    for label, scale, expected in LABEL_CASES:
+        parsed = parse_size_label(label, scale)
+        got = (parsed.letter, parsed.eu, parsed.waist_inch, parsed.length_inch, parsed.ordinal)
+        if got != expected:
+            failures.append(f"parse_size_label({label!r}, {scale!r}) = {got}, expected {expected}")
+    for labels, scale, order in CHART_ORDER_CASES:
+        got_scale = chart_scale(labels)
+        got_order = [e.label for e in SizeChart.from_rows([{"size_label": label} for label in labels]).entries]
+        if got_scale != scale or got_order != order:
+            failures.append(f"chart {labels}: scale {got_scale!r}, order {got_order}; expected {scale!r}, {order}")
+    return failures
+
+
+# --- Runner ------------------------------------------------------------------------------
+
+def _label_key(label):
+    # "S (36)" and "S" name the same size; compare on the canonical key
+    return parse_size_label(str(label or "")).key
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+def run_source(name, brand, rows, expected_charts, n_users, seed, with_references):
+    rnd = random.Random(f"{seed}:{name}")
+    users, references, cases = make_population(rnd, n_users, expected_charts, brand if with_references else None)
+
+    tables = {
+        "brands": [{"id": 1, "name": brand}] if rows else [],
+        "size_catalogs": [dict(r, brand_id=1) for r in rows],
+        "user_measurements": users,
+        "user_references": references,
+        "user_virtual_bodies": [],
+    }
+    db = StubSupabase(tables)
+    SizeRecommender._memo.clear()
+    recommender = SizeRecommender(db)
+    products = {category: dict(PRODUCTS[category], brand=brand, product_url=f"https://example.com/{brand}/{category}")
+                for category in CATEGORIES}
+
+    latencies = []
+    results = []
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        # Setup and catalog preloading stay outside the timed loop, as in the app's warm-up
+        recommender.warm_up()
+        loop_started = time.perf_counter()
+        for user_id, _, category, _ in cases:
+            start = time.perf_counter()
+            results.append(recommender.get_recommendation(user_id, products[category]))
+            latencies.append(time.perf_counter() - start)
+        elapsed = time.perf_counter() - loop_started
+
+    stats = {}
+    for (_, gender, category, idx), result in zip(cases, results):
+        chart = expected_charts[(gender, category)]
+        labels = [_label_key(r["size_label"]) for r in chart]
+        got = _label_key(result.get("recommended_size"))
+
+        bucket = stats.setdefault((gender, category), {"n": 0, "exact": 0, "near": 0, "off_chart": 0})
+        bucket["n"] += 1
+        if got in labels:
+            distance = abs(labels.index(got) - idx)
+            bucket["exact"] += distance == 0
+            bucket["near"] += distance <= 1
+        else:
+            bucket["off_chart"] += 1
+    return latencies, stats, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline SizeRecommender benchmark and accuracy report")
+    parser.add_argument("--users", type=int, default=300, help="synthetic users per chart source")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--source", action="append", help="only run these sources (repeatable)")
+    parser.add_argument("--no-references", action="store_true", help="do not give users brand references")
+    args = parser.parse_args()
+
+    label_failures = check_label_parsing()
+    print(f"Size label parser: {len(LABEL_CASES) + len(CHART_ORDER_CASES) - len(label_failures)}/"
+          f"{len(LABEL_CASES) + len(CHART_ORDER_CASES)} cases pass")
+    for failure in label_failures:
+        print(f"FAIL: {failure}")
+    print()
+
+    sources = load_sources()
+    names = args.source or list(sources)
+
+    all_latencies = []
+    total = {"n": 0, "exact": 0, "near": 0, "off_chart": 0}
+    print(f"{'source':<22}{'gender':<8}{'cat':<8}{'n':>5}{'exact':>8}{'±1':>8}{'off':>7}")
+    elapsed = 0.0
+    for name in names:
+        if name not in sources:
+            print(f"Unknown source: {name} (available: {', '.join(sources)})")
+            continue
+        brand, rows, expected = sources[name]
+        latencies, stats, source_elapsed = run_source(name, brand, rows, expected, args.users, args.seed, not args.no_references)
+        all_latencies.extend(latencies)
+        elapsed += source_elapsed
+        for (gender, category), s in sorted(stats.items()):
+            n = s["n"] or 1
+            print(f"{name:<22}{gender:<8}{category:<8}{s['n']:>5}"
+                  f"{s['exact'] / n:>8.1%}{s['near'] / n:>8.1%}{s['off_chart'] / n:>7.1%}")
+            for key in total:
+                total[key] += s[key]
+
+    if not all_latencies:
+        sys.exit(1 if label_failures else 0)
+    n = total["n"] or 1
+    ms = sorted(x * 1000 for x in all_latencies)
+    print()
+    print(f"Agreement: exact {total['exact'] / n:.1%}, within one size {total['near'] / n:.1%}, "
+          f"off-chart {total['off_chart'] / n:.1%} ({total['n']} recommendations)")
+    print(f"Throughput: {len(ms) / elapsed:.1f} recs/sec")
+    print(f"Latency ms: p50 {_percentile(ms, 50):.2f}, p90 {_percentile(ms, 90):.2f}, "
+          f"p99 {_percentile(ms, 99):.2f}, max {ms[-1]:.2f}, mean {statistics.mean(ms):.2f}")
+    sys.exit(1 if label_failures else 0)
+
+
+if __name__ == "__main__":
+    main()
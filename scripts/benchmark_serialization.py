@@ -0,0 +1,146 @@
+import argparse
+import contextlib
+import gzip
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Any, Dict
+
+# Usage: python scripts/benchmark_serialization.py [--repeat 200] [--history-rows 50] [--batch 100] [--gzip-level 6]
+#
+# Offline benchmark of response serialization: for representative /recommend, /recommend-batch,
+# /history and /scraper/scrape payloads it times the encoders FastAPI can use and reports the
+# payload size before and after compression. Recommendations come from the real SizeRecommender
+# running on the in-memory Supabase stand-in of benchmark_recommender.py; no DB or network is used.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+from app.core.responses import FastJSONResponse  # noqa: E402
+from app.services.recommendation import SizeRecommender  # noqa: E402
+from benchmark_recommender import PRODUCTS, StubSupabase, load_sources, make_population  # noqa: E402
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DESCRIPTION = (
+    "Relaxed fit gömlek. Klasik yaka ve uzun kollu. Önde düğme kapama. Göğüste cep detayı. "
+    "Yanlarda yırtmaç. %100 pamuklu, nefes alan kumaş. Model 1,85 cm boyunda ve M beden giyiyor. "
+) * 6
+
+
+def _product(rnd: random.Random, brand: str, category: str) -> Dict[str, Any]:
+    return dict(
+        PRODUCTS[category],
+        brand=brand,
+        product_url=f"https://www.zara.com/tr/tr/urun-p{rnd.randrange(10**8):08d}.html",
+        description=DESCRIPTION,
+        price="1.290,00 TL",
+        image_url="https://static.zara.net/photos/2024/V/0/1/p/0000/000/000/2/w/750/0000000000_1_1_1.jpg",
+        available_sizes=["XS", "S", "M", "L", "XL", "XXL"],
+    )
+
+
+def build_payloads(seed: int, history_rows: int, batch: int) -> Dict[str, Any]:
+    rnd = random.Random(seed)
+    brand, rows, expected = load_sources()["standard"]
+    users, references, cases = make_population(rnd, max(batch, history_rows), expected, None)
+    db = StubSupabase({"brands": [], "size_catalogs": rows, "user_measurements": users,
+                       "user_references": references, "user_virtual_bodies": []})
+    recommender = SizeRecommender(db)
+
+    results = []
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for user_id, gender, category, idx in cases[:max(batch, history_rows)]:
+            product = _product(rnd, brand, category)
+            results.append((user_id, product, recommender.get_recommendation(user_id, product)))
+
+    user_id, product, rec = results[0]
+    history = [
+        {
+            "id": f"{i:08d}-0000-4000-8000-000000000000",
+            "user_id": user_id,
+            "product_name": p["product_name"],
+            "brand": p["brand"],
+            "price": p["price"],
+            "image_url": p["image_url"],
+            "product_url": p["product_url"],
+            "recommended_size": r.get("recommended_size"),
+            "confidence_score": r.get("confidence_score"),
+            "created_at": f"2024-06-{1 + i % 28:02d}T12:00:00.000000+00:00",
+        }
+        for i, (_, p, r) in enumerate(results[:history_rows])
+    ]
+    return {
+        "recommend": {"product": product, "recommendation": rec},
+        "recommend-batch": {
+            "products": {p["product_url"]: p for _, p, _ in results[:batch]},
+            "results": [{"user_id": u, "url": p["product_url"], "recommendation": r} for u, p, r in results[:batch]],
+        },
+        "history": {"status": "success", "data": history, "next_cursor": "WyIyMDI0LTA2LTAxVDEyOjAwOjAwIiwiMDAwMDAwMDAiXQ==", "total": None},
+        "scrape": product,
+    }
+
+
+def _time(fn, payload, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(payload)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline response serialization and compression benchmark")
+    parser.add_argument("--repeat", type=int, default=200, help="timed runs per encoder and payload")
+    parser.add_argument("--history-rows", type=int, default=50, help="rows in the /history page")
+    parser.add_argument("--batch", type=int, default=100, help="items in the /recommend-batch response")
+    parser.add_argument("--gzip-level", type=int, default=6, help="gzip level (GZIP_LEVEL setting)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    payloads = build_payloads(args.seed, args.history_rows, args.batch)
+    any_adapter = TypeAdapter(Dict[str, Any])
+
+    encoders = {
+        # Starlette's JSONResponse after jsonable_encoder (FastAPI's default for untyped endpoints)
+        "json": lambda c: json.dumps(jsonable_encoder(c), ensure_ascii=False, allow_nan=False,
+                                     separators=(",", ":")).encode("utf-8"),
+        # FastAPI's Pydantic fast path for endpoints annotated with a return type (validate + dump)
+        "pydantic": lambda c: any_adapter.dump_json(any_adapter.validate_python(c)),
+        # FastJSONResponse after jsonable_encoder (the app default for untyped endpoints)
+        "orjson+enc": lambda c: FastJSONResponse(jsonable_encoder(c)).body,
+        # FastJSONResponse on the raw content (endpoints that return it directly)
+        "orjson": lambda c: FastJSONResponse(c).body,
+    }
+
+    print("Median serialization time per response (ms)")
+    print(f"{'endpoint':<17}" + "".join(f"{name:>12}" for name in encoders))
+    for endpoint, payload in payloads.items():
+        print(f"{endpoint:<17}" + "".join(f"{_time(fn, payload, args.repeat):>12.3f}" for fn in encoders.values()))
+
+    print()
+    print(f"Payload size (bytes) and compression time (ms) at gzip level {args.gzip_level}"
+          + (" / brotli quality 4" if brotli else " (pip install brotli to compare)"))
+    print(f"{'endpoint':<17}{'raw':>10}{'gzip':>10}{'gzip ms':>10}" + (f"{'br':>10}{'br ms':>10}" if brotli else ""))
+    for endpoint, payload in payloads.items():
+        body = encoders["orjson"](payload)
+        line = f"{endpoint:<17}{len(body):>10}{len(gzip.compress(body, compresslevel=args.gzip_level)):>10}"
+        line += f"{_time(lambda b: gzip.compress(b, compresslevel=args.gzip_level), body, args.repeat):>10.3f}"
+        if brotli:
+            line += f"{len(brotli.compress(body, quality=4)):>10}"
+            line += f"{_time(lambda b: brotli.compress(b, quality=4), body, args.repeat):>10.3f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
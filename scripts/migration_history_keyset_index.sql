@@ -0,0 +1,4 @@
+-- Index for the keyset-paginated /history/{user_id} endpoint:
+-- WHERE user_id = ? AND (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC LIMIT n
+CREATE INDEX IF NOT EXISTS recommendation_history_user_created_id_idx
+    ON recommendation_history (user_id, created_at DESC, id DESC);
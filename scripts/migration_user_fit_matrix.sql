@@ -0,0 +1,13 @@
+-- Precomputed size per user, brand and category ("fit matrix").
+-- Rebuilt in the background whenever measurements or references change;
+-- serves the closet screen and brand-level queries without running the recommender.
+CREATE TABLE IF NOT EXISTS user_fit_matrix (
+    user_id uuid NOT NULL,
+    brand text NOT NULL,
+    category text NOT NULL,
+    recommended_size text NOT NULL,
+    size_percentages jsonb NOT NULL DEFAULT '{}'::jsonb,
+    version text NOT NULL,
+    updated_at timestamptz NOT NULL DEFAULT now(),
+    PRIMARY KEY (user_id, brand, category)
+);
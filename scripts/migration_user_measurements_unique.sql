@@ -0,0 +1,22 @@
+-- One measurements row per user, so /update-measurements can upsert in a single statement.
+-- Run once: removes existing duplicates (keeps each user's most recently updated row),
+-- then adds the unique constraint the upsert's ON CONFLICT (user_id) relies on.
+
+BEGIN;
+
+DELETE FROM user_measurements m
+USING (
+    SELECT id,
+           row_number() OVER (
+               PARTITION BY user_id
+               ORDER BY updated_at DESC NULLS LAST, id DESC
+           ) AS rn
+    FROM user_measurements
+) ranked
+WHERE m.id = ranked.id
+  AND ranked.rn > 1;
+
+ALTER TABLE user_measurements DROP CONSTRAINT IF EXISTS user_measurements_user_id_key;
+ALTER TABLE user_measurements ADD CONSTRAINT user_measurements_user_id_key UNIQUE (user_id);
+
+COMMIT;
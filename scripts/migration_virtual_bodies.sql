@@ -0,0 +1,13 @@
+-- Materialized "virtual body" per user and category.
+-- Written by the backend whenever measurements or references change,
+-- read by the recommendation hot path instead of resolving every reference.
+CREATE TABLE IF NOT EXISTS user_virtual_bodies (
+    user_id uuid NOT NULL,
+    category text NOT NULL,
+    chest real,
+    waist real,
+    ref_count smallint NOT NULL DEFAULT 0,
+    "references" jsonb NOT NULL DEFAULT '[]'::jsonb,
+    updated_at timestamptz NOT NULL DEFAULT now(),
+    PRIMARY KEY (user_id, category)
+);